@@ -0,0 +1,48 @@
+"""Composite indexes on the follow graph
+
+Revision ID: 7c41e2b9d0a3
+Revises: 13d2068684ab
+Create Date: 2026-10-18 10:12:37.418215
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41e2b9d0a3'
+down_revision = '13d2068684ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently so follows keep being written during the migration
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_UserFollow_user_id_target_user_id',
+            'UserFollow',
+            ['user_id', 'target_user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_UserFollow_target_user_id_user_id',
+            'UserFollow',
+            ['target_user_id', 'user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_UserFollow_target_user_id_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_UserFollow_user_id_target_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
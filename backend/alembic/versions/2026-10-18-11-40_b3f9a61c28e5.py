@@ -0,0 +1,169 @@
+"""Unique follows, covering follower index and user foreign keys
+
+Revision ID: b3f9a61c28e5
+Revises: 7c41e2b9d0a3
+Create Date: 2026-10-18 11:40:05.702318
+
+"""
+from alembic import op
+from sqlalchemy.exc import IntegrityError
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f9a61c28e5'
+down_revision = '7c41e2b9d0a3'
+branch_labels = None
+depends_on = None
+
+UNIQUE_INDEX_ATTEMPTS = 5
+# The counters of the users who kept a duplicate are recomputed
+DEDUPE_FOLLOWS = """
+    WITH duplicates AS (
+        DELETE FROM "UserFollow" AS follow
+        USING "UserFollow" AS kept
+        WHERE follow.user_id = kept.user_id
+        AND follow.target_user_id = kept.target_user_id
+        AND follow.id > kept.id
+        RETURNING follow.user_id, follow.target_user_id
+    ), affected AS (
+        SELECT user_id AS id FROM duplicates
+        UNION
+        SELECT target_user_id FROM duplicates
+    )
+    UPDATE "User" SET
+        following_count = (
+            SELECT count(*) FROM "UserFollow"
+            WHERE "UserFollow".user_id = "User".id
+        ) - (
+            SELECT count(*) FROM duplicates
+            WHERE duplicates.user_id = "User".id
+        ),
+        follower_count = (
+            SELECT count(*) FROM "UserFollow"
+            WHERE "UserFollow".target_user_id = "User".id
+        ) - (
+            SELECT count(*) FROM duplicates
+            WHERE duplicates.target_user_id = "User".id
+        )
+    WHERE "User".id IN (SELECT id FROM affected)
+    """
+
+
+def upgrade():
+    # Orphans would fail the foreign keys
+    op.execute(
+        """
+        DELETE FROM "UserFollow" AS follow
+        WHERE NOT EXISTS (
+            SELECT 1 FROM "User" WHERE "User".id = follow.user_id
+        ) OR NOT EXISTS (
+            SELECT 1 FROM "User" WHERE "User".id = follow.target_user_id
+        )
+        """
+    )
+    op.create_foreign_key(
+        'UserFollow_user_id_fkey',
+        'UserFollow',
+        'User',
+        ['user_id'],
+        ['id'],
+        ondelete='CASCADE',
+    )
+    op.create_foreign_key(
+        'UserFollow_target_user_id_fkey',
+        'UserFollow',
+        'User',
+        ['target_user_id'],
+        ['id'],
+        ondelete='CASCADE',
+    )
+
+    # Built concurrently so follows keep being written during the migration,
+    # duplicates are removed right before the unique index build
+    with op.get_context().autocommit_block():
+        _create_unique_follow_index()
+        op.drop_index(
+            'ix_UserFollow_user_id_target_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            'ALTER INDEX "ix_UserFollow_user_id_target_user_id_unique" '
+            'RENAME TO "ix_UserFollow_user_id_target_user_id"'
+        )
+        op.create_index(
+            'ix_UserFollow_target_user_id_user_id_covering',
+            'UserFollow',
+            ['target_user_id', 'user_id'],
+            unique=False,
+            postgresql_include=['is_mutual'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_UserFollow_target_user_id_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            'ALTER INDEX "ix_UserFollow_target_user_id_user_id_covering" '
+            'RENAME TO "ix_UserFollow_target_user_id_user_id"'
+        )
+
+
+def _create_unique_follow_index():
+    """
+    Follows duplicated after the dedupe fail the build and leave an INVALID
+    index behind, it is dropped and the build retried after a new dedupe
+    """
+    for attempt in range(1, UNIQUE_INDEX_ATTEMPTS + 1):
+        op.execute(
+            'DROP INDEX CONCURRENTLY IF EXISTS '
+            '"ix_UserFollow_user_id_target_user_id_unique"'
+        )
+        op.execute(DEDUPE_FOLLOWS)
+        try:
+            op.create_index(
+                'ix_UserFollow_user_id_target_user_id_unique',
+                'UserFollow',
+                ['user_id', 'target_user_id'],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+            return
+        except IntegrityError:
+            if attempt == UNIQUE_INDEX_ATTEMPTS:
+                raise
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_UserFollow_target_user_id_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_UserFollow_target_user_id_user_id',
+            'UserFollow',
+            ['target_user_id', 'user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_UserFollow_user_id_target_user_id',
+            table_name='UserFollow',
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_UserFollow_user_id_target_user_id',
+            'UserFollow',
+            ['user_id', 'target_user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint(
+        'UserFollow_target_user_id_fkey', 'UserFollow', type_='foreignkey'
+    )
+    op.drop_constraint(
+        'UserFollow_user_id_fkey', 'UserFollow', type_='foreignkey'
+    )
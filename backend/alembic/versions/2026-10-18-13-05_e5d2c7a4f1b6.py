@@ -0,0 +1,50 @@
+"""Generated full_name column with a trigram index
+
+Revision ID: e5d2c7a4f1b6
+Revises: b3f9a61c28e5
+Create Date: 2026-10-18 13:05:48.119034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d2c7a4f1b6'
+down_revision = 'b3f9a61c28e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # A stored generated column rewrites the table once
+    op.add_column(
+        'User',
+        sa.Column(
+            'full_name',
+            sa.String(),
+            sa.Computed("first_name || ' ' || last_name", persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_User_full_name_trgm',
+            'User',
+            ['full_name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'full_name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_User_full_name_trgm',
+            table_name='User',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('User', 'full_name')
@@ -0,0 +1,28 @@
+"""Zero follow counters left NULL by bulk user creation
+
+Revision ID: a8c3e1f07d42
+Revises: e5d2c7a4f1b6
+Create Date: 2026-10-18 15:20:11.402517
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c3e1f07d42'
+down_revision = 'e5d2c7a4f1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'UPDATE "User" SET '
+        "follower_count = coalesce(follower_count, 0), "
+        "following_count = coalesce(following_count, 0) "
+        "WHERE follower_count IS NULL OR following_count IS NULL"
+    )
+
+
+def downgrade():
+    pass
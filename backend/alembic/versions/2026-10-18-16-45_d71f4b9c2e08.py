@@ -0,0 +1,32 @@
+"""Applied follower count flushes
+
+Revision ID: d71f4b9c2e08
+Revises: a8c3e1f07d42
+Create Date: 2026-10-18 16:45:52.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'd71f4b9c2e08'
+down_revision = 'a8c3e1f07d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'FollowerCountFlush',
+        sa.Column(
+            'id', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False
+        ),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('FollowerCountFlush')
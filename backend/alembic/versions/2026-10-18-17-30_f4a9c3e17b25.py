@@ -0,0 +1,35 @@
+"""Outbox of the search index changes
+
+Revision ID: f4a9c3e17b25
+Revises: d71f4b9c2e08
+Create Date: 2026-10-18 17:30:44.906213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a9c3e17b25'
+down_revision = 'd71f4b9c2e08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'SearchChange',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'entity',
+            sqlmodel.sql.sqltypes.AutoString(length=16),
+            nullable=False,
+        ),
+        sa.Column('entity_id', sa.Uuid(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('SearchChange')
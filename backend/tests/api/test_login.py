@@ -2,7 +2,10 @@ import pytest
 from httpx import AsyncClient
 from typing import AsyncGenerator
 from travel_ai_backend.app.main import app
-from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.core.config import (
+    TokenValidationModeEnum,
+    settings,
+)
 
 url = "http://fastapi.localhost/api/v1"
 
@@ -68,3 +71,46 @@ class TestPostLogin:
             assert response.status_code == expected_status
             if expected_response is not None:
                 assert response.json() == expected_response
+
+
+@pytest.mark.asyncio
+async def test_new_tokens_are_valid_after_password_change(
+    test_client, monkeypatch
+):
+    monkeypatch.setattr(
+        settings, "TOKEN_VALIDATION_MODE", TokenValidationModeEnum.revocation
+    )
+    passwords = [settings.FIRST_SUPERUSER_PASSWORD, "new-password-123"]
+    async for client in test_client:
+        response = await client.post(
+            "/login",
+            json={
+                "email": settings.FIRST_SUPERUSER_EMAIL,
+                "password": passwords[0],
+            },
+        )
+        access_token = response.json()["data"]["access_token"]
+        # Changed and then restored, every step uses the latest token
+        for current_password, new_password in [passwords, passwords[::-1]]:
+            response = await client.post(
+                "/login/change_password",
+                json={
+                    "current_password": current_password,
+                    "new_password": new_password,
+                },
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            assert response.status_code == 200
+            old_access_token = access_token
+            access_token = response.json()["data"]["access_token"]
+
+            response = await client.get(
+                "/user",
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            assert response.status_code == 200
+            response = await client.get(
+                "/user",
+                headers={"Authorization": f"Bearer {old_access_token}"},
+            )
+            assert response.status_code == 403
@@ -0,0 +1,22 @@
+from uuid import uuid4
+
+from travel_ai_backend.app.utils.bloom_filter import BloomFilter
+
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.is_full
+
+
+def test_false_positive_rate_is_bounded():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for _ in range(1000):
+        bloom.add(uuid4().hex)
+    false_positives = sum(
+        bloom.might_contain(uuid4().hex) for _ in range(10_000)
+    )
+    assert false_positives < 300
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+import pytest
+
+from travel_ai_backend.app.utils.cursor import (
+    coerce_cursor_values,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), uuid4()]
+    cursor = encode_cursor(values, backwards=True)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (values, True)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "W10", "eyJ2Ijp7fX0"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "values", [["2024-05-01", uuid4()], [datetime.now(), "id"], [True, 1]]
+)
+def test_cursor_values_of_the_wrong_type_raise_value_error(values):
+    with pytest.raises(ValueError):
+        coerce_cursor_values(values, [datetime, UUID])
+
+
+def test_cursor_values_are_coerced():
+    assert coerce_cursor_values([1, "x"], [float, None]) == [1.0, "x"]
+
+
+def test_cursor_of_a_row_with_null_order_value():
+    row_id = uuid4()
+    values, backwards = decode_cursor(encode_cursor([None, row_id]))
+    assert coerce_cursor_values(values, [datetime, UUID]) == [None, row_id]
+    assert backwards is False
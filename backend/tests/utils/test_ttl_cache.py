@@ -0,0 +1,36 @@
+import time
+
+from travel_ai_backend.app.utils.ttl_cache import TTLCache
+
+
+def test_get_returns_value_before_expiration():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.get("missing", "default") == "default"
+
+
+def test_entries_expire():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("key", "value")
+    time.sleep(0.02)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_pop_removes_entry():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
@@ -0,0 +1,47 @@
+import base64
+
+import numpy as np
+import pytest
+
+from travel_ai_backend.app.utils.vector_codec import (
+    decode_vectors,
+    encode_vector,
+    to_vector,
+)
+
+
+def test_binary_payload_is_decoded_without_copy():
+    vectors = np.arange(12, dtype="<f4").reshape(3, 4)
+    payload = vectors.tobytes()
+    decoded = decode_vectors(payload, 4)
+    assert np.array_equal(decoded, vectors)
+    assert not decoded.flags.owndata
+    assert not decoded.flags.writeable
+
+
+def test_base64_round_trip():
+    vector = np.array([0.5, -1.25, 3.0, 1e-3], dtype=np.float32)
+    encoded = encode_vector(vector, as_base64=True)
+    assert base64.b64decode(encoded) == vector.astype("<f4").tobytes()
+    assert np.array_equal(to_vector(encoded, 4), vector)
+    assert np.array_equal(to_vector(vector.tolist(), 4), vector)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [1.0, 2.0, 3.0],
+        [[1.0, 2.0], [3.0, 4.0]],
+        [1.0, float("nan"), 3.0, 4.0],
+        "not base64!",
+        base64.b64encode(b"\0" * 12).decode(),
+    ],
+)
+def test_invalid_vectors_are_rejected(value):
+    with pytest.raises(ValueError):
+        to_vector(value, 4)
+
+
+def test_partial_rows_are_rejected():
+    with pytest.raises(ValueError):
+        decode_vectors(b"\0" * 18, 4)
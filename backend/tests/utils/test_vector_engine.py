@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from travel_ai_backend.app.utils.vector_engine import VectorEngine
+
+
+def _exact_neighbors(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+@pytest.mark.parametrize("quantized", [False, True])
+def test_brute_force_search_matches_exact_cosine(quantized):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    query = rng.normal(size=16).astype(np.float32)
+    engine = VectorEngine.build("cosine", vectors, quantized=quantized)
+    rows, scores = engine.search(engine.prepare(query), 5)
+    assert list(rows) == _exact_neighbors(vectors, query, 5)
+    assert np.all(np.diff(scores) <= 0)
+    assert np.all((scores >= 0) & (scores <= 1))
+
+
+def test_ivf_search_finds_nearest_cluster():
+    rng = np.random.default_rng(2)
+    centers = rng.normal(size=(8, 16)) * 10
+    vectors = (
+        np.repeat(centers, 100, axis=0) + rng.normal(size=(800, 16))
+    ).astype(np.float32)
+    engine = VectorEngine.build("l2_norm", vectors, n_lists=8)
+    rows, _ = engine.search(engine.prepare(centers[3]), 10, n_probes=2)
+    assert len(rows) == 10
+    assert all(300 <= row < 400 for row in rows)
+
+
+def test_replaced_rows_are_skipped():
+    vectors = np.eye(4, dtype=np.float32)
+    engine = VectorEngine.build("dot_product", vectors)
+    engine.live[0] = False
+    rows, _ = engine.search(engine.prepare(vectors[0]), 4)
+    assert 0 not in rows
+    assert len(rows) == 3
+
+
+def test_snapshot_round_trip(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+    engine = VectorEngine.build("cosine", vectors, quantized=True, n_lists=4)
+    engine.save(str(tmp_path))
+    loaded = VectorEngine.load(str(tmp_path))
+    query = engine.prepare(vectors[7])
+    assert isinstance(loaded.vectors, np.memmap)
+    assert list(loaded.search(query, 3, 4)[0]) == list(
+        engine.search(query, 3, 4)[0]
+    )
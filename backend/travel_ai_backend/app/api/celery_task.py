@@ -6,9 +6,22 @@ from uuid import UUID
 from celery import Task
 
 from travel_ai_backend.app.crud.hero_crud import hero
+from travel_ai_backend.app.crud.user_crud import user
+from travel_ai_backend.app.api.deps import ElasticsearchClient
 from travel_ai_backend.app.core.celery import celery
-from travel_ai_backend.app.db.session import SessionLocal
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.db.session import RedisClient, SessionLocal
 from travel_ai_backend.app.models.hero_model import Hero
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
+from travel_ai_backend.app.utils.embedding import (
+    EmbeddingPipeline,
+    load_embedding_model,
+)
+from travel_ai_backend.app.utils.follow_counter import flush_follower_counts
+from travel_ai_backend.app.utils.ingestion import run_ingestion_job
+from travel_ai_backend.app.utils.report_export_job import run_export_job
+from travel_ai_backend.app.utils.search_index import reindex
+from travel_ai_backend.app.utils.search_sync import sync_search_index
 
 # from travel_ai_backend.app.schemas.role_schema import (
 #     IRoleCreate,
@@ -70,6 +83,43 @@ def predict_transformers_pipeline(self, prompt: str):
     return result
 
 
+class EmbeddingModelTask(Task):
+    """
+    Loads the embedding model on the first task and keeps it for the
+    following ones, like PredictTransformersPipelineTask
+    """
+
+    abstract = True
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+
+    def __call__(self, *args, **kwargs):
+        if self.model is None:
+            logging.info("Loading embedding model...")
+            self.model = load_embedding_model()
+            logging.info("Embedding model loaded")
+        return self.run(*args, **kwargs)
+
+
+@celery.task(
+    bind=True,
+    base=EmbeddingModelTask,
+    name="tasks.embed_texts",
+    ignore_result=True,
+)
+def embed_texts(self) -> tuple[int, int]:
+    pipeline = EmbeddingPipeline(
+        RedisClient.get_instance(),
+        ElasticsearchClient.get_instance(),
+        self.model,
+    )
+    return asyncio.get_event_loop().run_until_complete(
+        pipeline.run(settings.EMBEDDING_MAX_RUN_TIME)
+    )
+
+
 @celery.task(name="tasks.increment")
 def increment(value: int) -> int:
     time.sleep(4)
@@ -90,3 +140,83 @@ def print_hero(hero_id: UUID) -> None:
         get_hero(hero_id=hero_id)
     )
     return hero.id
+
+
+@celery.task(
+    name="tasks.export_report",
+    time_limit=settings.REPORT_EXPORT_JOB_TIMEOUT,
+)
+def export_report(job_id: str) -> None:
+    asyncio.get_event_loop().run_until_complete(
+        run_export_job(RedisClient.get_instance(), job_id)
+    )
+
+
+@celery.task(
+    name="tasks.ingest_file",
+    time_limit=settings.INGESTION_JOB_TIMEOUT,
+)
+def ingest_file(job_id: str) -> None:
+    asyncio.get_event_loop().run_until_complete(
+        run_ingestion_job(RedisClient.get_instance(), job_id)
+    )
+
+
+async def flush_follow_counters_async() -> int:
+    async with SessionLocal() as session:
+        return await flush_follower_counts(
+            RedisClient.get_instance(), session
+        )
+
+
+@celery.task(name="tasks.flush_follow_counters", ignore_result=True)
+def flush_follow_counters() -> int:
+    return asyncio.get_event_loop().run_until_complete(
+        flush_follow_counters_async()
+    )
+
+
+async def remove_user_async(user_id: UUID) -> None:
+    async with SessionLocal() as session:
+        await user.remove(
+            id=user_id,
+            batch_size=settings.USER_REMOVE_BATCH_SIZE,
+            db_session=session,
+        )
+
+
+@celery.task(name="tasks.remove_user")
+def remove_user(user_id: str) -> None:
+    asyncio.get_event_loop().run_until_complete(
+        remove_user_async(UUID(user_id))
+    )
+
+
+async def sync_search_index_async() -> int:
+    async with SessionLocal() as session:
+        return await sync_search_index(
+            RedisClient.get_instance(),
+            ElasticsearchClient.get_instance(),
+            session,
+        )
+
+
+@celery.task(name="tasks.sync_search_index", ignore_result=True)
+def sync_search_index_task() -> int:
+    return asyncio.get_event_loop().run_until_complete(
+        sync_search_index_async()
+    )
+
+
+async def reindex_search_async(entity: SearchEntityEnum) -> tuple[int, int]:
+    async with SessionLocal() as session:
+        return await reindex(
+            ElasticsearchClient.get_instance(), entity, session
+        )
+
+
+@celery.task(name="tasks.reindex_search")
+def reindex_search(entity: str) -> tuple[int, int]:
+    return asyncio.get_event_loop().run_until_complete(
+        reindex_search_async(SearchEntityEnum(entity))
+    )
@@ -1,7 +1,6 @@
 from collections.abc import AsyncGenerator
 from typing import Callable
 
-import redis.asyncio as aioredis
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -15,14 +14,17 @@ from travel_ai_backend.app.crud.user_crud import user
 from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.core.security import decode_token
 from travel_ai_backend.app.db.session import (  # , ElasticSearchSession
+    RedisClient,
     SessionLocal,
     SessionLocalCelery,
     SessionLocalElasticSearch,
 )
 from travel_ai_backend.app.models.user_model import User
-from travel_ai_backend.app.schemas.common_schema import IMetaGeneral, TokenType
+from travel_ai_backend.app.schemas.common_schema import IMetaGeneral
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.minio_client import MinioClient
-from travel_ai_backend.app.utils.token import get_valid_tokens
+from travel_ai_backend.app.utils.principal_cache import get_principal
+from travel_ai_backend.app.utils.token import is_valid_token
 
 request_count = Counter("http_requests_total", "Total number of requests")
 request_latency = Histogram(
@@ -48,13 +50,7 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 async def get_redis_client() -> Redis:
-    redis = await aioredis.from_url(
-        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
-        max_connections=10,
-        encoding="utf8",
-        decode_responses=True,
-    )
-    return redis
+    return RedisClient.get_instance()
 
 
 class ElasticsearchClient:
@@ -94,11 +90,13 @@ async def get_general_meta() -> IMetaGeneral:
     return IMetaGeneral(roles=current_roles)
 
 
-def get_current_user(required_roles: list[str] = None) -> Callable[[], User]:
-    async def current_user(
+def get_current_principal(
+    required_roles: list[str] = None,
+) -> Callable[[], IUserPrincipal]:
+    async def current_principal(
         access_token: str = Depends(reusable_oauth2),
         redis_client: Redis = Depends(get_redis_client),
-    ) -> User:
+    ) -> IUserPrincipal:
         try:
             payload = decode_token(access_token)
         except ExpiredSignatureError:
@@ -118,25 +116,26 @@ def get_current_user(required_roles: list[str] = None) -> Callable[[], User]:
             )
 
         user_id = payload["sub"]
-        valid_access_tokens = await get_valid_tokens(
-            redis_client, user_id, TokenType.ACCESS
-        )
-        if valid_access_tokens and access_token not in valid_access_tokens:
+        if not await is_valid_token(redis_client, payload, access_token):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Could not validate credentials",
             )
-        user_obj: User = await user.get(id=user_id)
-        if not user_obj:
+        principal = await get_principal(
+            redis_client,
+            user_id,
+            loader=lambda id: user.get_principal(id=id),
+        )
+        if not principal:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if not user_obj.is_active:
+        if not principal.is_active:
             raise HTTPException(status_code=400, detail="Inactive user")
 
         if required_roles:
             is_valid_role = False
             for role in required_roles:
-                if role == user_obj.role.name:
+                if role == principal.role_name:
                     is_valid_role = True
 
             if not is_valid_role:
@@ -145,16 +144,29 @@ def get_current_user(required_roles: list[str] = None) -> Callable[[], User]:
                     detail=f"""Role "{required_roles}" is required for this action""",
                 )
 
+        return principal
+
+    return current_principal
+
+
+def get_current_user(required_roles: list[str] = None) -> Callable[[], User]:
+    """
+    Same checks as `get_current_principal` but also loads the whole User,
+    use it only when the handler needs more than the id and the role
+    """
+
+    async def current_user(
+        principal: IUserPrincipal = Depends(
+            get_current_principal(required_roles)
+        ),
+    ) -> User:
+        user_obj: User = await user.get(id=principal.id)
+        if not user_obj:
+            raise HTTPException(status_code=404, detail="User not found")
         return user_obj
 
     return current_user
 
 
 def minio_auth() -> MinioClient:
-    minio_client = MinioClient(
-        access_key=settings.MINIO_ROOT_USER,
-        secret_key=settings.MINIO_ROOT_PASSWORD,
-        bucket_name=settings.MINIO_BUCKET,
-        minio_url=settings.MINIO_URL,
-    )
-    return minio_client
+    return MinioClient.get_instance()
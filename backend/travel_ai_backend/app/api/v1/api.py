@@ -5,6 +5,7 @@ from travel_ai_backend.app.api.v1.endpoints import (
     elastic,
     group,
     hero,
+    ingestion,
     login,
     natural_language,
     periodic_tasks,
@@ -25,6 +26,9 @@ api_router.include_router(hero.router, prefix="/hero", tags=["hero"])
 api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
 api_router.include_router(weather.router, prefix="/weather", tags=["weather"])
 api_router.include_router(report.router, prefix="/report", tags=["report"])
+api_router.include_router(
+    ingestion.router, prefix="/ingestion", tags=["ingestion"]
+)
 api_router.include_router(
     natural_language.router,
     prefix="/natural_language",
@@ -1,88 +1,292 @@
-from elasticsearch import AsyncElasticsearch
-from fastapi import APIRouter, Depends, Response
-from fastapi_pagination import Params
+from typing import Annotated
 
-from travel_ai_backend.app.api.deps import get_elasticsearch_client
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from fastapi import APIRouter, Body, Depends, Query, Request, status
+from redis.asyncio import Redis
+
+from travel_ai_backend.app.api.deps import (
+    get_elasticsearch_client,
+    get_redis_client,
+)
+from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.schemas.response_schema import (
-    IGetResponsePaginated,
+    IGetResponseBase,
     IPostResponseBase,
     create_response,
 )
 from travel_ai_backend.app.schemas.text_vector_schema import (
+    IRefreshPolicyEnum,
+    ITextEmbeddingCreate,
+    ITextEmbeddingQueuedRead,
     ITextVectorBaseRead,
+    ITextVectorBatchSearchRead,
+    ITextVectorBulkRead,
     ITextVectorCreate,
     ITextVectorSearch,
     ITextVectorSearchRead,
+    IVectorFormatEnum,
+    VECTOR_LEN,
+)
+from travel_ai_backend.app.utils.embedding import queue_texts
+from travel_ai_backend.app.utils.exceptions import (
+    InvalidVectorPayloadException,
+    SearchBackendException,
+)
+from travel_ai_backend.app.utils.local_vector_index import local_vector_index
+from travel_ai_backend.app.utils.vector_bulk import (
+    VectorBulkLoader,
+    iter_binary_items,
+    iter_items,
+    iter_ndjson_items,
+    vector_action,
+)
+from travel_ai_backend.app.utils.vector_codec import (
+    OCTET_STREAM,
+    VECTOR_DTYPE,
+    decode_vectors,
+    encode_vector,
+)
+from travel_ai_backend.app.utils.vector_search import (
+    msearch_neighbors,
+    search_neighbors as search_vector_neighbors,
 )
 
 router = APIRouter()
 
 
+def check_octet_stream(request: Request) -> None:
+    # A JSON body posted by mistake would be read as float32 values
+    content_type = request.headers.get("content-type", OCTET_STREAM)
+    if content_type.split(";")[0].strip().lower() != OCTET_STREAM:
+        raise InvalidVectorPayloadException(
+            f"The content type must be {OCTET_STREAM}"
+        )
+
+
 @router.post("/add_vector")
 async def add_vector(
     text_vector: ITextVectorCreate,
+    vector_format: IVectorFormatEnum = Query(default=IVectorFormatEnum.json),
     es: AsyncElasticsearch = Depends(get_elasticsearch_client),
 ) -> IPostResponseBase[ITextVectorBaseRead]:
+    action = vector_action(text_vector)
     try:
         item = await es.index(
-            index="text_vectors",
-            body={"text": "sdsdas", "vector": text_vector.vector},
+            index=action["_index"],
+            id=action.get("_id"),
+            document=action["_source"],
         )
-        print(f"{item['_id']=}")
-        return create_response(
-            data=ITextVectorBaseRead(
-                index=item["_index"], id=item["_id"], vector=text_vector.vector
+    except (ApiError, TransportError) as e:
+        raise SearchBackendException(e)
+    return create_response(
+        data=ITextVectorBaseRead(
+            index=item["_index"],
+            id=item["_id"],
+            text=text_vector.text,
+            vector=encode_vector(
+                text_vector.vector, vector_format == IVectorFormatEnum.base64
             ),
-            message="Вектор добавлен успешно",
-        )
-    except Exception as e:
-        print()
-        return Response(f"Internal server error. Error: {e}", status_code=500)
+        ),
+        message="Вектор добавлен успешно",
+    )
+
+
+@router.post("/add_vectors")
+async def add_vectors(
+    text_vectors: Annotated[
+        list[ITextVectorCreate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    chunk_size: int = Query(
+        default=settings.ELASTIC_BULK_CHUNK_SIZE,
+        ge=1,
+        le=settings.BULK_MAX_ITEMS,
+    ),
+    concurrency: int = Query(
+        default=settings.ELASTIC_BULK_CONCURRENCY,
+        ge=1,
+        le=settings.ELASTIC_BULK_MAX_CONCURRENCY,
+    ),
+    refresh: IRefreshPolicyEnum = Query(default=IRefreshPolicyEnum.false),
+    es: AsyncElasticsearch = Depends(get_elasticsearch_client),
+) -> IPostResponseBase[ITextVectorBulkRead]:
+    """
+    Indexes several vectors with the bulk API and returns the result of
+    every item, in request order
+    """
+    loader = VectorBulkLoader(es, chunk_size, concurrency, refresh)
+    result = await loader.load(iter_items(text_vectors))
+    return create_response(data=result, message="Vectors indexed")
+
+
+@router.post("/add_vectors/ndjson")
+async def add_vectors_ndjson(
+    request: Request,
+    chunk_size: int = Query(
+        default=settings.ELASTIC_BULK_CHUNK_SIZE,
+        ge=1,
+        le=settings.BULK_MAX_ITEMS,
+    ),
+    concurrency: int = Query(
+        default=settings.ELASTIC_BULK_CONCURRENCY,
+        ge=1,
+        le=settings.ELASTIC_BULK_MAX_CONCURRENCY,
+    ),
+    refresh: IRefreshPolicyEnum = Query(default=IRefreshPolicyEnum.false),
+    es: AsyncElasticsearch = Depends(get_elasticsearch_client),
+) -> IPostResponseBase[ITextVectorBulkRead]:
+    """
+    Indexes an application/x-ndjson body with one vector per line while
+    it is being uploaded. Only the failed lines are returned, up to
+    ELASTIC_BULK_MAX_REPORTED_ERRORS.
+    """
+    loader = VectorBulkLoader(
+        es, chunk_size, concurrency, refresh, report_all=False
+    )
+    result = await loader.load(iter_ndjson_items(request.stream()))
+    return create_response(data=result, message="Vectors indexed")
+
+
+@router.post("/add_vectors/binary")
+async def add_vectors_binary(
+    request: Request,
+    chunk_size: int = Query(
+        default=settings.ELASTIC_BULK_CHUNK_SIZE,
+        ge=1,
+        le=settings.BULK_MAX_ITEMS,
+    ),
+    concurrency: int = Query(
+        default=settings.ELASTIC_BULK_CONCURRENCY,
+        ge=1,
+        le=settings.ELASTIC_BULK_MAX_CONCURRENCY,
+    ),
+    refresh: IRefreshPolicyEnum = Query(default=IRefreshPolicyEnum.false),
+    es: AsyncElasticsearch = Depends(get_elasticsearch_client),
+) -> IPostResponseBase[ITextVectorBulkRead]:
+    """
+    Indexes an application/octet-stream body of concatenated little-endian
+    float32 vectors while it is being uploaded. Ids are generated by
+    Elasticsearch and only the failed vectors are returned.
+    """
+    check_octet_stream(request)
+    loader = VectorBulkLoader(
+        es, chunk_size, concurrency, refresh, report_all=False
+    )
+    result = await loader.load(iter_binary_items(request.stream(), VECTOR_LEN))
+    return create_response(data=result, message="Vectors indexed")
+
+
+@router.post("/embed_texts", status_code=status.HTTP_202_ACCEPTED)
+async def embed_texts(
+    documents: Annotated[
+        list[ITextEmbeddingCreate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    redis_client: Redis = Depends(get_redis_client),
+) -> IPostResponseBase[ITextEmbeddingQueuedRead]:
+    """
+    Queues texts whose vectors are computed by the Celery workers in
+    batches and then indexed. A text reusing an id replaces the stored
+    vector once it is processed.
+    """
+    queued = await queue_texts(redis_client, documents)
+    return create_response(
+        data=ITextEmbeddingQueuedRead(
+            index=settings.ELASTIC_VECTOR_INDEX, queued=queued
+        ),
+        message="Texts queued",
+    )
 
 
 @router.post("/search_neighbors")
 async def search_neighbors(
     text_vector: ITextVectorSearch,
+    vector_format: IVectorFormatEnum = Query(default=IVectorFormatEnum.json),
     es: AsyncElasticsearch = Depends(get_elasticsearch_client),
-) -> IGetResponsePaginated[ITextVectorSearchRead]:
-    index_name = "text_vectors"
-    query = {
-        "query": {
-            # "script_score": {
-            #     "query": {"match_all": {}},
-            #     "script": {
-            #         "source": "cosineSimilarity(params.vector, 'vector') + 1.0",
-            #         "params": {"vector": text_vector.vector},
-            #     },
-            # }
-            "knn": {
-                "field": "vector",
-                "query_vector": text_vector.vector,
-                "k": text_vector.k,
-            }
-        }
-    }
-    count_elem = await es.count(index=index_name)
-    result = await es.search(index=index_name, body=query, size=text_vector.k)
-    
-    # todo: Проверить случай, когда элементов не найдено
-    response = []
-    for v in result["hits"]["hits"]:
-        response.append(
-            ITextVectorSearchRead(
-                id=v["_id"],
-                index=v["_index"],
-                score=v["_score"],
-                vector=v["_source"]["vector"],
+) -> IGetResponseBase[list[ITextVectorSearchRead]]:
+    """
+    Gets the approximate k nearest neighbors of a vector, optionally
+    restricted to documents with the given metadata values. Unfiltered
+    searches are answered by the local vector index when it is enabled.
+    """
+    neighbors = await local_vector_index.search(text_vector)
+    if neighbors is None:
+        try:
+            neighbors = await search_vector_neighbors(
+                es, text_vector, vector_format
             )
-        )
+        except (ApiError, TransportError) as e:
+            raise SearchBackendException(e)
+    return create_response(data=neighbors, message="Search Results")
+
 
-    # params_dict = {"size": 5, "page": 1}
-    params = Params()
-    params.page = 1
-    params.size = count_elem["count"]
-    response = IGetResponsePaginated.create(
-        response, total=len(response), params=params
+@router.post("/search_neighbors/batch")
+async def search_neighbors_batch(
+    text_vectors: Annotated[
+        list[ITextVectorSearch],
+        Body(
+            min_length=1, max_length=settings.ELASTIC_VECTOR_MAX_BATCH_QUERIES
+        ),
+    ],
+    vector_format: IVectorFormatEnum = Query(default=IVectorFormatEnum.json),
+    es: AsyncElasticsearch = Depends(get_elasticsearch_client),
+) -> IGetResponseBase[list[ITextVectorBatchSearchRead]]:
+    """
+    Gets the neighbors of several vectors with one _msearch request,
+    in the order of the queries. A query that fails has an error and a
+    status instead of neighbors.
+    """
+    try:
+        results = await msearch_neighbors(es, text_vectors, vector_format)
+    except (ApiError, TransportError) as e:
+        raise SearchBackendException(e)
+    return create_response(data=results, message="Search Results")
+
+
+@router.post("/search_neighbors/binary")
+async def search_neighbors_binary(
+    request: Request,
+    k: int = Query(default=10, ge=1, le=settings.ELASTIC_VECTOR_MAX_K),
+    num_candidates: int | None = Query(
+        default=None, le=settings.ELASTIC_VECTOR_MAX_NUM_CANDIDATES
+    ),
+    include_vector: bool = False,
+    vector_format: IVectorFormatEnum = Query(default=IVectorFormatEnum.json),
+    es: AsyncElasticsearch = Depends(get_elasticsearch_client),
+) -> IGetResponseBase[list[ITextVectorBatchSearchRead]]:
+    """
+    Gets the neighbors of every vector of an application/octet-stream
+    body of concatenated little-endian float32 vectors, like
+    /search_neighbors/batch. The body is checked as a single matrix.
+    """
+    check_octet_stream(request)
+    body = await request.body()
+    max_size = (
+        settings.ELASTIC_VECTOR_MAX_BATCH_QUERIES
+        * VECTOR_LEN
+        * VECTOR_DTYPE.itemsize
     )
-    print(f"!!!!!! {response}")
-    return create_response(data=response, message="Search Results")
+    if not body or len(body) > max_size:
+        raise InvalidVectorPayloadException(
+            f"The body must hold 1 to "
+            f"{settings.ELASTIC_VECTOR_MAX_BATCH_QUERIES} vectors"
+        )
+    try:
+        vectors = decode_vectors(body, VECTOR_LEN)
+        # The options are validated once and shared by every query
+        query = ITextVectorSearch(
+            vector=vectors[0],
+            k=k,
+            num_candidates=num_candidates,
+            include_vector=include_vector,
+        )
+    except ValueError as e:
+        raise InvalidVectorPayloadException(str(e))
+    text_vectors = [
+        query.model_copy(update={"vector": vector}) for vector in vectors
+    ]
+    try:
+        results = await msearch_neighbors(es, text_vectors, vector_format)
+    except (ApiError, TransportError) as e:
+        raise SearchBackendException(e)
+    return create_response(data=results, message="Search Results")
@@ -22,6 +22,7 @@ from travel_ai_backend.app.schemas.response_schema import (
     create_response,
 )
 from travel_ai_backend.app.schemas.role_schema import IRoleEnum
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.exceptions import (
     IdNotFoundException,
     NameExistException,
@@ -33,7 +34,7 @@ router = APIRouter()
 @router.get("")
 async def get_groups(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IGroupRead]:
     """
     Gets a paginated list of groups
@@ -45,7 +46,7 @@ async def get_groups(
 @router.get("/{group_id}")
 async def get_group_by_id(
     group_id: UUID,
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponseBase[IGroupReadWithUsers]:
     """
     Gets a group by its id
@@ -60,8 +61,8 @@ async def get_group_by_id(
 @router.post("")
 async def create_group(
     obj_in: IGroupCreate,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -86,8 +87,8 @@ async def create_group(
 async def update_group(
     obj_in: IGroupUpdate,
     current_group: Group = Depends(group_deps.get_group_by_id),
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -109,8 +110,8 @@ async def update_group(
 async def add_user_into_a_group(
     user: User = Depends(user_deps.is_valid_user),
     obj_in: Group = Depends(group_deps.get_group_by_id),
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -1,34 +1,44 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from elasticsearch import AsyncElasticsearch
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from fastapi_pagination import Params
 
 from travel_ai_backend.app.crud.hero_crud import hero
 from travel_ai_backend.app.api import deps
 from travel_ai_backend.app.api.celery_task import print_hero
 from travel_ai_backend.app.core.authz import is_authorized
+from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.models.hero_model import Hero
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.common_schema import IOrderEnum
 from travel_ai_backend.app.schemas.hero_schema import (
+    IHeroBulkUpdate,
     IHeroCreate,
     IHeroRead,
     IHeroReadWithTeam,
     IHeroUpdate,
+    IHeroUpsert,
 )
 from travel_ai_backend.app.schemas.response_schema import (
+    CursorParams,
     IDeleteResponseBase,
     IGetResponseBase,
+    IGetResponseCursor,
     IGetResponsePaginated,
     IPostResponseBase,
     IPutResponseBase,
     create_response,
 )
 from travel_ai_backend.app.schemas.role_schema import IRoleEnum
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.exceptions import (
     IdNotFoundException,
     NameNotFoundException,
 )
+from travel_ai_backend.app.utils.search_index import order_by_ids, search_ids
 
 router = APIRouter()
 
@@ -36,7 +46,7 @@ router = APIRouter()
 @router.get("")
 async def get_hero_list(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IHeroReadWithTeam]:
     """
     Gets a paginated list of heroes
@@ -45,6 +55,24 @@ async def get_hero_list(
     return create_response(data=heroes)
 
 
+@router.get("/cursor")
+async def get_hero_list_by_cursor(
+    order: IOrderEnum | None = Query(
+        default=IOrderEnum.ascendent,
+        description="It is optional. Default is ascendent",
+    ),
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+) -> IGetResponseCursor[IHeroReadWithTeam]:
+    """
+    Gets a cursor paginated list of heroes ordered by created at datetime
+    """
+    heroes = await hero.get_multi_cursor(
+        params=params, order_by="created_at", order=order
+    )
+    return create_response(data=heroes)
+
+
 @router.get("/get_by_created_at")
 async def get_hero_list_order_by_created_at(
     order: IOrderEnum | None = Query(
@@ -52,7 +80,7 @@ async def get_hero_list_order_by_created_at(
         description="It is optional. Default is ascendent",
     ),
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IHeroReadWithTeam]:
     """
     Gets a paginated list of heroes ordered by created at datetime
@@ -66,7 +94,7 @@ async def get_hero_list_order_by_created_at(
 @router.get("/get_by_id/{hero_id}")
 async def get_hero_by_id(
     hero_id: UUID,
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponseBase[IHeroReadWithTeam]:
     """
     Gets a hero by its id
@@ -82,12 +110,21 @@ async def get_hero_by_id(
 @router.get("/get_by_name/{hero_name}")
 async def get_hero_by_name(
     hero_name: str,
-    current_user: User = Depends(deps.get_current_user()),
+    limit: int = Query(default=20, ge=1, le=settings.SEARCH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    es: AsyncElasticsearch = Depends(deps.get_elasticsearch_client),
 ) -> IGetResponseBase[list[IHeroReadWithTeam]]:
     """
-    Gets a hero by his/her name
+    Gets the heroes best matching a name, tolerating typos and partial
+    words
     """
-    heroes = await hero.get_heroe_by_name(name=hero_name)
+    hero_ids = await search_ids(es, SearchEntityEnum.heroes, hero_name, limit)
+    if hero_ids is None:
+        heroes = await hero.get_heroe_by_name(name=hero_name, limit=limit)
+    else:
+        heroes = order_by_ids(
+            await hero.get_by_ids(list_ids=hero_ids), hero_ids
+        )
     if not heroes:
         raise NameNotFoundException(Hero, hero_name)
 
@@ -97,8 +134,8 @@ async def get_hero_by_name(
 @router.post("")
 async def create_hero(
     obj_in: IHeroCreate,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -114,6 +151,117 @@ async def create_hero(
     return create_response(data=heroe)
 
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_heroes(
+    objs_in: Annotated[
+        list[IHeroCreate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IPostResponseBase[list[IHeroRead]]:
+    """
+    Creates several heroes at once
+
+    Required roles:
+    - admin
+    - manager
+    """
+    heroes = await hero.create_many(
+        objs_in=objs_in, created_by_id=current_user.id
+    )
+    return create_response(data=heroes)
+
+
+@router.put("/bulk")
+async def update_heroes(
+    objs_in: Annotated[
+        list[IHeroBulkUpdate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: User = Depends(
+        deps.get_current_user(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IPutResponseBase[list[IHeroRead]]:
+    """
+    Updates several heroes at once by their ids
+
+    Required roles:
+    - admin
+    - manager
+    """
+    current_heroes = await hero.get_by_ids(
+        list_ids=[obj_in.id for obj_in in objs_in]
+    )
+    current_heroes = {
+        current_hero.id: current_hero for current_hero in current_heroes
+    }
+    for obj_in in objs_in:
+        current_hero = current_heroes.get(obj_in.id)
+        if not current_hero:
+            raise IdNotFoundException(Hero, obj_in.id)
+        if not is_authorized(current_user, "read", current_hero):
+            raise HTTPException(
+                status_code=403,
+                detail="You are not Authorized to update this heroe because you did not created it",
+            )
+
+    heroes = await hero.update_many(
+        objs_new=[obj_in.model_dump(exclude_unset=True) for obj_in in objs_in]
+    )
+    return create_response(data=heroes)
+
+
+@router.put("/bulk/upsert")
+async def upsert_heroes(
+    objs_in: Annotated[
+        list[IHeroUpsert],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+) -> IPutResponseBase[list[IHeroRead]]:
+    """
+    Creates the heroes without id or with an unknown id and updates the rest
+
+    Required roles:
+    - admin
+    """
+    heroes = await hero.upsert_many(
+        objs_in=[obj_in.model_dump(exclude_none=True) for obj_in in objs_in],
+        created_by_id=current_user.id,
+    )
+    return create_response(data=heroes)
+
+
+@router.delete("/bulk")
+async def remove_heroes(
+    hero_ids: Annotated[
+        list[UUID], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IDeleteResponseBase[list[IHeroRead]]:
+    """
+    Deletes several heroes at once by their ids, unknown ids are ignored
+
+    Required roles:
+    - admin
+    - manager
+    """
+    heroes = await hero.delete_many(ids=hero_ids)
+    return create_response(data=heroes)
+
+
 @router.put("/{hero_id}")
 async def update_hero(
     hero_id: UUID,
@@ -149,8 +297,8 @@ async def update_hero(
 @router.delete("/{hero_id}")
 async def remove_hero(
     hero_id: UUID,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -0,0 +1,131 @@
+from asyncer import asyncify
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    UploadFile,
+    status,
+)
+from redis.asyncio import Redis
+
+from travel_ai_backend.app.api import deps
+from travel_ai_backend.app.api.celery_task import ingest_file
+from travel_ai_backend.app.schemas.ingestion_schema import (
+    IIngestionFromStorage,
+    IIngestionRead,
+    IngestionEntityEnum,
+    IngestionFormatEnum,
+)
+from travel_ai_backend.app.schemas.response_schema import (
+    IGetResponseBase,
+    IPostResponseBase,
+    create_response,
+)
+from travel_ai_backend.app.schemas.role_schema import IRoleEnum
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
+from travel_ai_backend.app.utils.ingestion import (
+    MEDIA_TYPES,
+    create_ingestion_job,
+    get_ingestion_job,
+)
+from travel_ai_backend.app.utils.minio_client import MinioClient
+
+router = APIRouter()
+
+
+@router.post("/{entity}/upload", status_code=status.HTTP_202_ACCEPTED)
+async def upload_ingestion_file(
+    entity: IngestionEntityEnum,
+    file_format: IngestionFormatEnum = Form(IngestionFormatEnum.csv),
+    source_file: UploadFile = File(...),
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+    minio_client: MinioClient = Depends(deps.minio_auth),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IPostResponseBase[IIngestionRead]:
+    """
+    Uploads a csv or ndjson file to object storage and loads its rows in
+    the background
+
+    Required roles:
+    - admin
+    """
+    # The upload is streamed from the spooled file, not read in memory
+    data_file = await minio_client.put_object_async(
+        file_data=source_file.file,
+        file_name=f"_{entity.value}.{file_format.value}",
+        content_type=MEDIA_TYPES[file_format],
+    )
+    job_id = await create_ingestion_job(
+        redis_client,
+        entity,
+        file_format,
+        data_file.file_name,
+        current_user.id,
+    )
+    ingest_file.delay(job_id)
+    job = await get_ingestion_job(redis_client, job_id)
+    return create_response(data=job, message="Ingestion job created")
+
+
+@router.post("/{entity}", status_code=status.HTTP_202_ACCEPTED)
+async def create_ingestion(
+    entity: IngestionEntityEnum,
+    ingestion_in: IIngestionFromStorage,
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+    minio_client: MinioClient = Depends(deps.minio_auth),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IPostResponseBase[IIngestionRead]:
+    """
+    Loads the rows of a csv or ndjson file already in object storage in the
+    background
+
+    Required roles:
+    - admin
+    """
+    exists = await asyncify(minio_client.check_file_name_exists)(
+        minio_client.bucket_name, ingestion_in.object_name
+    )
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unable to find the object {ingestion_in.object_name}.",
+        )
+    job_id = await create_ingestion_job(
+        redis_client,
+        entity,
+        ingestion_in.file_format,
+        ingestion_in.object_name,
+        current_user.id,
+    )
+    ingest_file.delay(job_id)
+    job = await get_ingestion_job(redis_client, job_id)
+    return create_response(data=job, message="Ingestion job created")
+
+
+@router.get("/job/{job_id}")
+async def get_ingestion(
+    job_id: str,
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[IIngestionRead]:
+    """
+    Gets the progress, throughput and rejected rows of an ingestion job
+
+    Required roles:
+    - admin
+    """
+    job = await get_ingestion_job(redis_client, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unable to find the ingestion job with id {job_id}.",
+        )
+    return create_response(data=job)
@@ -13,8 +13,8 @@ from travel_ai_backend.app.core import security
 from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.core.security import (
     decode_token,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
 )
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.common_schema import IMetaGeneral, TokenType
@@ -30,7 +30,9 @@ from travel_ai_backend.app.schemas.token_schema import (
 from travel_ai_backend.app.utils.token import (
     add_token_to_redis,
     delete_tokens,
-    get_valid_tokens,
+    has_valid_tokens,
+    invalidate_token,
+    is_valid_token,
 )
 
 router = APIRouter()
@@ -71,10 +73,7 @@ async def login(
         refresh_token=refresh_token,
         user=obj_user,
     )
-    valid_access_tokens = await get_valid_tokens(
-        redis_client, obj_user.id, TokenType.ACCESS
-    )
-    if valid_access_tokens:
+    if await has_valid_tokens(redis_client, obj_user.id, TokenType.ACCESS):
         await add_token_to_redis(
             redis_client,
             obj_user,
@@ -82,10 +81,7 @@ async def login(
             TokenType.ACCESS,
             settings.ACCESS_TOKEN_EXPIRE_MINUTES,
         )
-    valid_refresh_tokens = await get_valid_tokens(
-        redis_client, obj_user.id, TokenType.REFRESH
-    )
-    if valid_refresh_tokens:
+    if await has_valid_tokens(redis_client, obj_user.id, TokenType.REFRESH):
         await add_token_to_redis(
             redis_client,
             obj_user,
@@ -112,21 +108,28 @@ async def change_password(
     Change password
     """
 
-    if not verify_password(current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Invalid Current Password")
 
-    if verify_password(new_password, current_user.hashed_password):
+    # current_password matches the stored hash, no need to verify it again
+    if new_password == current_password:
         raise HTTPException(
             status_code=400,
             detail="New Password should be different that the current one",
         )
 
-    new_hashed_password = get_password_hash(new_password)
+    new_hashed_password = await get_password_hash_async(new_password)
     await user.update(
         obj_current=current_user,
         obj_new={"hashed_password": new_hashed_password},
     )
 
+    # Revoked first, the revocation covers every token issued before it
+    await delete_tokens(redis_client, current_user, TokenType.ACCESS)
+    await delete_tokens(redis_client, current_user, TokenType.REFRESH)
+
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
@@ -146,8 +149,6 @@ async def change_password(
         user=current_user,
     )
 
-    await delete_tokens(redis_client, current_user, TokenType.ACCESS)
-    await delete_tokens(redis_client, current_user, TokenType.REFRESH)
     await add_token_to_redis(
         redis_client,
         current_user,
@@ -194,12 +195,8 @@ async def get_new_access_token(
 
     if payload["type"] == "refresh":
         user_id = payload["sub"]
-        valid_refresh_tokens = await get_valid_tokens(
-            redis_client, user_id, TokenType.REFRESH
-        )
-        if (
-            valid_refresh_tokens
-            and body.refresh_token not in valid_refresh_tokens
+        if not await is_valid_token(
+            redis_client, payload, body.refresh_token
         ):
             raise HTTPException(
                 status_code=403, detail="Refresh token invalid"
@@ -213,10 +210,9 @@ async def get_new_access_token(
             access_token = security.create_access_token(
                 payload["sub"], expires_delta=access_token_expires
             )
-            valid_access_get_valid_tokens = await get_valid_tokens(
+            if await has_valid_tokens(
                 redis_client, obj_user.id, TokenType.ACCESS
-            )
-            if valid_access_get_valid_tokens:
+            ):
                 await add_token_to_redis(
                     redis_client,
                     obj_user,
@@ -257,10 +253,7 @@ async def login_access_token(
     access_token = security.create_access_token(
         obj_user.id, expires_delta=access_token_expires
     )
-    valid_access_tokens = await get_valid_tokens(
-        redis_client, obj_user.id, TokenType.ACCESS
-    )
-    if valid_access_tokens:
+    if await has_valid_tokens(redis_client, obj_user.id, TokenType.ACCESS):
         await add_token_to_redis(
             redis_client,
             obj_user,
@@ -269,3 +262,30 @@ async def login_access_token(
             settings.ACCESS_TOKEN_EXPIRE_MINUTES,
         )
     return TokenRead(access_token=access_token, token_type="bearer")
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    access_token: str = Depends(deps.reusable_oauth2),
+    body: RefreshToken | None = Body(None),
+    redis_client: Redis = Depends(get_redis_client),
+) -> None:
+    """
+    Invalidates the access token and, if it is sent, the refresh token
+    """
+    try:
+        payload = decode_token(access_token)
+    except (DecodeError, ExpiredSignatureError, MissingRequiredClaimError):
+        return
+    await invalidate_token(redis_client, payload, access_token)
+
+    if body is None:
+        return
+    try:
+        refresh_payload = decode_token(body.refresh_token)
+    except (DecodeError, ExpiredSignatureError, MissingRequiredClaimError):
+        return
+    if refresh_payload["sub"] == payload["sub"]:
+        await invalidate_token(
+            redis_client, refresh_payload, body.refresh_token
+        )
@@ -9,11 +9,11 @@ from travel_ai_backend.app.api.celery_task import (
     predict_transformers_pipeline,
 )
 from travel_ai_backend.app.core.celery import celery
-from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.response_schema import (
     IPostResponseBase,
     create_response,
 )
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.fastapi_globals import g
 
 router = APIRouter()
@@ -27,7 +27,7 @@ router = APIRouter()
 )
 async def sentiment_analysis_prediction(
     prompt: str = "Fastapi is awesome",
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IPostResponseBase:
     """
     Gets a sentimental analysis predition using a NLP model from transformers libray
@@ -1,27 +1,58 @@
-from enum import Enum
-from io import BytesIO, StringIO
 from typing import Annotated
 
-import pandas as pd
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
 
-from travel_ai_backend.app.crud.hero_crud import hero
-from travel_ai_backend.app.crud.user_crud import user
 from travel_ai_backend.app.api import deps
-from travel_ai_backend.app.models.user_model import User
-from travel_ai_backend.app.schemas.hero_schema import IHeroRead
+from travel_ai_backend.app.api.celery_task import export_report as export_task
+from travel_ai_backend.app.schemas.report_schema import (
+    FileExtensionEnum,
+    IReportExportCreate,
+    IReportExportRead,
+    ReportEnum,
+)
+from travel_ai_backend.app.schemas.response_schema import (
+    IGetResponseBase,
+    IPostResponseBase,
+    create_response,
+)
 from travel_ai_backend.app.schemas.role_schema import IRoleEnum
-
-# from travel_ai_backend.app.schemas.user_schema import IUserRead
-from travel_ai_backend.app.schemas.user_schema import IUserRead
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
+from travel_ai_backend.app.utils.report_export import (
+    FILE_SUFFIXES,
+    MEDIA_TYPES,
+    get_report_query,
+    iter_csv,
+    iter_report_file,
+)
+from travel_ai_backend.app.utils.report_export_job import (
+    create_export_job,
+    get_export_job,
+)
 
 router = APIRouter()
 
 
-class FileExtensionEnum(str, Enum):
-    csv = "csv"
-    xls = "xls"
+def export_report(
+    report: ReportEnum, file_extension: FileExtensionEnum
+) -> StreamingResponse:
+    query = get_report_query(report)
+    if file_extension == FileExtensionEnum.csv:
+        content = iter_csv(query)
+    else:
+        content = iter_report_file(query, file_extension)
+    media_type = MEDIA_TYPES[file_extension]
+    filename = f"{report.value}.{FILE_SUFFIXES[file_extension]}"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment;filename={filename}",
+            "Access-Control-Expose-Headers": "Content-Disposition",
+        },
+    )
 
 
 @router.get("/users_list")
@@ -32,45 +63,17 @@ async def export_users_list(
             description="This is the exported file format",
         ),
     ] = FileExtensionEnum.csv,
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> StreamingResponse:
     """
-    Export users list in a csv/xlsx file
+    Export users list in a csv, xlsx or parquet file
 
     Required roles:
     - admin
     """
-    users = await user.get_multi_ordered(limit=1000, order_by="id")
-    users_list = [
-        IUserRead.model_validate(cur_user) for cur_user in users
-    ]  # Creates a pydantic list of object
-    users_df = pd.DataFrame([s.__dict__ for s in users_list])
-    if file_extension == FileExtensionEnum.xls:
-        stream = BytesIO()
-        with pd.ExcelWriter(stream) as writer:
-            users_df.to_excel(writer, index=False)
-        media_type = (
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        filename = "users.xlsx"
-    else:
-        stream = StringIO()
-        users_df.to_csv(stream, index=False)
-        media_type = "text/csv"
-        filename = "users.csv"
-
-    response = StreamingResponse(
-        iter([stream.getvalue()]),
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment;filename={filename}",
-            "Access-Control-Expose-Headers": "Content-Disposition",
-        },
-    )
-
-    return response
+    return export_report(ReportEnum.users, file_extension)
 
 
 @router.get("/heroes_list")
@@ -79,42 +82,61 @@ async def export_heroes_list(
         default=FileExtensionEnum.csv,
         description="This is the exported file format",
     ),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> StreamingResponse:
     """
-    Export heroes list in a csv/xlsx file
+    Export heroes list in a csv, xlsx or parquet file
 
     Required roles:
     - admin
     """
-    heroes = await hero.get_multi_ordered(limit=1000, order_by="id")
-    heroes_list = [
-        IHeroRead.model_validate(cur_hero) for cur_hero in heroes
-    ]  # Creates a pydantic list of object
-    heroes_df = pd.DataFrame([s.__dict__ for s in heroes_list])
-    if file_extension == FileExtensionEnum.xls:
-        stream = BytesIO()
-        with pd.ExcelWriter(stream) as writer:
-            heroes_df.to_excel(writer, index=False)
-        media_type = (
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        filename = "heroes.xlsx"
-    else:
-        stream = StringIO()
-        heroes_df.to_csv(stream, index=False)
-        media_type = "text/csv"
-        filename = "heroes.csv"
+    return export_report(ReportEnum.heroes, file_extension)
 
-    response = StreamingResponse(
-        iter([stream.getvalue()]),
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment;filename={filename}",
-            "Access-Control-Expose-Headers": "Content-Disposition",
-        },
+
+@router.post("/export", status_code=status.HTTP_202_ACCEPTED)
+async def create_report_export(
+    export_in: IReportExportCreate,
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IPostResponseBase[IReportExportRead]:
+    """
+    Starts a background export of a report to object storage, an identical
+    export that is still running is reused
+
+    Required roles:
+    - admin
+    """
+    job_id, created = await create_export_job(
+        redis_client, export_in.report, export_in.file_extension
     )
+    if created:
+        export_task.delay(job_id)
+    job = await get_export_job(redis_client, job_id)
+    return create_response(data=job, message="Export job created")
+
+
+@router.get("/export/{job_id}")
+async def get_report_export(
+    job_id: str,
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[IReportExportRead]:
+    """
+    Gets the progress of an export job and its download link once finished
 
-    return response
+    Required roles:
+    - admin
+    """
+    job = await get_export_job(redis_client, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unable to find the export job with id {job_id}.",
+        )
+    return create_response(data=job)
@@ -5,7 +5,6 @@ from travel_ai_backend.app.crud.role_crud import role
 from travel_ai_backend.app.api import deps
 from travel_ai_backend.app.deps import role_deps
 from travel_ai_backend.app.models.role_model import Role
-from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.response_schema import (
     IGetResponseBase,
     IGetResponsePaginated,
@@ -19,6 +18,7 @@ from travel_ai_backend.app.schemas.role_schema import (
     IRoleRead,
     IRoleUpdate,
 )
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.exceptions import (
     ContentNoChangeException,
     NameExistException,
@@ -30,7 +30,7 @@ router = APIRouter()
 @router.get("")
 async def get_roles(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IRoleRead]:
     """
     Gets a paginated list of roles
@@ -42,7 +42,7 @@ async def get_roles(
 @router.get("/{role_id}")
 async def get_role_by_id(
     role: Role = Depends(role_deps.get_user_role_by_id),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponseBase[IRoleRead]:
     """
     Gets a role by its id
@@ -53,8 +53,8 @@ async def get_role_by_id(
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_role(
     obj_role: IRoleCreate,
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> IPostResponseBase[IRoleRead]:
     """
@@ -75,8 +75,8 @@ async def create_role(
 async def update_role(
     obj_role: IRoleUpdate,
     current_role: Role = Depends(role_deps.get_user_role_by_id),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> IPutResponseBase[IRoleRead]:
     """
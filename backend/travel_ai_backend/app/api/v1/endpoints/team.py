@@ -1,12 +1,14 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from elasticsearch import AsyncElasticsearch
+from fastapi import APIRouter, Body, Depends, Query, status
 from fastapi_pagination import Params
 
 from travel_ai_backend.app.crud.team_crud import team
 from travel_ai_backend.app.api import deps
+from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.models.team_model import Team
-from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.response_schema import (
     IDeleteResponseBase,
     IGetResponseBase,
@@ -15,16 +17,21 @@ from travel_ai_backend.app.schemas.response_schema import (
     create_response,
 )
 from travel_ai_backend.app.schemas.role_schema import IRoleEnum
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
 from travel_ai_backend.app.schemas.team_schema import (
     ITeamCreate,
     ITeamRead,
+    ITeamReadBasic,
     ITeamUpdate,
 )
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
 from travel_ai_backend.app.utils.exceptions import (
     ContentNoChangeException,
     IdNotFoundException,
     NameExistException,
+    NameNotFoundException,
 )
+from travel_ai_backend.app.utils.search_index import order_by_ids, search_ids
 
 router = APIRouter()
 
@@ -32,7 +39,7 @@ router = APIRouter()
 @router.get("")
 async def get_teams_list(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[ITeamRead]:
     """
     Gets a paginated list of teams
@@ -41,10 +48,33 @@ async def get_teams_list(
     return create_response(data=teams)
 
 
+@router.get("/get_by_name/{team_name}")
+async def get_team_by_name(
+    team_name: str,
+    limit: int = Query(default=20, ge=1, le=settings.SEARCH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    es: AsyncElasticsearch = Depends(deps.get_elasticsearch_client),
+) -> IGetResponseBase[list[ITeamRead]]:
+    """
+    Gets the teams best matching a name, tolerating typos and partial
+    words
+    """
+    team_ids = await search_ids(es, SearchEntityEnum.teams, team_name, limit)
+    if team_ids is None:
+        teams = await team.get_teams_by_name(name=team_name, limit=limit)
+    else:
+        teams = order_by_ids(
+            await team.get_by_ids(list_ids=team_ids), team_ids
+        )
+    if not teams:
+        raise NameNotFoundException(Team, team_name)
+    return create_response(data=teams)
+
+
 @router.get("/{team_id}")
 async def get_team_by_id(
     team_id: UUID,
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponseBase[ITeamRead]:
     """
     Gets a team by its id
@@ -58,8 +88,8 @@ async def get_team_by_id(
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_team(
     obj_team: ITeamCreate,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -78,12 +108,68 @@ async def create_team(
     return create_response(data=obj_team)
 
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_teams(
+    objs_in: Annotated[
+        list[ITeamCreate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IPostResponseBase[list[ITeamReadBasic]]:
+    """
+    Creates several teams at once
+
+    Required roles:
+    - admin
+    - manager
+    """
+    names = [obj_in.name for obj_in in objs_in]
+    existing_names = await team.get_existing_names(names=names)
+    if existing_names:
+        raise NameExistException(Team, name=existing_names[0])
+    new_names = set()
+    for name in names:
+        if name in new_names:
+            raise NameExistException(Team, name=name)
+        new_names.add(name)
+    teams = await team.create_many(
+        objs_in=objs_in, created_by_id=current_user.id
+    )
+    return create_response(data=teams)
+
+
+@router.delete("/bulk")
+async def remove_teams(
+    team_ids: Annotated[
+        list[UUID], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IDeleteResponseBase[list[ITeamReadBasic]]:
+    """
+    Deletes several teams at once by their ids, unknown ids are ignored
+
+    Required roles:
+    - admin
+    - manager
+    """
+    teams = await team.delete_many(ids=team_ids)
+    return create_response(data=teams)
+
+
 @router.put("/{team_id}")
 async def update_team(
     team_id: UUID,
     new_team: ITeamUpdate,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -118,8 +204,8 @@ async def update_team(
 @router.delete("/{team_id}")
 async def remove_team(
     team_id: UUID,
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -1,24 +1,33 @@
-from io import BytesIO
 from typing import Annotated
 from uuid import UUID
 
+from asyncer import asyncify
+from elasticsearch import AsyncElasticsearch
 from fastapi import (
     APIRouter,
     Body,
     Depends,
     File,
+    HTTPException,
     Query,
     Response,
     UploadFile,
     status,
 )
 from fastapi_pagination import Params
-from sqlmodel import and_, col, or_, select, text
+from redis.asyncio import Redis
+from sqlmodel import col, select
 
+from travel_ai_backend.app.api.celery_task import (
+    remove_user as remove_user_task,
+)
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.crud.role_crud import role
 from travel_ai_backend.app.crud.user_crud import user
 from travel_ai_backend.app.crud.user_follow_crud import user_follow
 from travel_ai_backend.app.api import deps
 from travel_ai_backend.app.deps import user_deps
+from travel_ai_backend.app.models.media_model import prefetch_media_links
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.models.role_model import Role
 from travel_ai_backend.app.models.user_follow_model import UserFollow
@@ -26,20 +35,29 @@ from travel_ai_backend.app.schemas.media_schema import IMediaCreate
 from travel_ai_backend.app.schemas.response_schema import (
     IDeleteResponseBase,
     IGetResponseBase,
+    CursorParams,
+    IGetResponseCursor,
     IGetResponsePaginated,
     IPostResponseBase,
     IPutResponseBase,
     create_response,
 )
 from travel_ai_backend.app.schemas.role_schema import IRoleEnum
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
 from travel_ai_backend.app.schemas.user_follow_schema import (
     IUserFollowRead,
     IUserFollowReadCommon,
+    IUserGraphRead,
+    IUserSuggestionRead,
 )
 from travel_ai_backend.app.schemas.user_schema import (
+    IUserBasicInfo,
+    IUserBulkUpdate,
     IUserCreate,
+    IUserPrincipal,
     IUserRead,
     IUserReadWithoutGroups,
+    IUserSearchRead,
     IUserStatus,
 )
 from travel_ai_backend.app.utils.exceptions import (
@@ -49,8 +67,21 @@ from travel_ai_backend.app.utils.exceptions import (
     UserNotFollowedException,
     UserSelfDeleteException,
 )
+from travel_ai_backend.app.utils.follow_graph import (
+    get_common_following,
+    get_known_followers,
+    get_suggestions,
+)
 from travel_ai_backend.app.utils.minio_client import MinioClient
-from travel_ai_backend.app.utils.resize_image import modify_image
+from travel_ai_backend.app.utils.resize_image import read_image_info
+from travel_ai_backend.app.utils.search_index import order_by_ids, search_ids
+from travel_ai_backend.app.utils.user_search import (
+    escape_like,
+    get_cached_search,
+    name_matches,
+    name_score,
+    normalize_query,
+)
 
 router = APIRouter()
 
@@ -58,8 +89,8 @@ router = APIRouter()
 @router.get("/list")
 async def read_users_list(
     params: Params = Depends(),
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -72,6 +103,33 @@ async def read_users_list(
     - manager
     """
     users = await user.get_multi_paginated(params=params)
+    prefetch_media_links(
+        obj_user.image.media for obj_user in users.items if obj_user.image
+    )
+    return create_response(data=users)
+
+
+@router.get("/list/cursor")
+async def read_users_list_by_cursor(
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
+            required_roles=[IRoleEnum.admin, IRoleEnum.manager]
+        )
+    ),
+) -> IGetResponseCursor[IUserReadWithoutGroups]:
+    """
+    Retrieve users ordered by created datetime with cursor pagination.
+    Requires admin or manager role
+
+    Required roles:
+    - admin
+    - manager
+    """
+    users = await user.get_multi_cursor(params=params, order_by="created_at")
+    prefetch_media_links(
+        obj_user.image.media for obj_user in users.items if obj_user.image
+    )
     return create_response(data=users)
 
 
@@ -87,8 +145,8 @@ async def read_users_list_by_role_name(
     ] = IUserStatus.active,
     role_name: str = "",
     params: Params = Depends(),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> IGetResponsePaginated[IUserReadWithoutGroups]:
     """
@@ -102,32 +160,92 @@ async def read_users_list_by_role_name(
         select(User)
         .join(Role, User.role_id == Role.id)
         .where(
-            and_(
-                col(Role.name).ilike(f"%{role_name}%"),
-                User.is_active == user_status,
-                or_(
-                    col(User.first_name).ilike(f"%{name}%"),
-                    col(User.last_name).ilike(f"%{name}%"),
-                    text(
-                        f"""'{name}' % concat("User".last_name, ' ', "User".first_name)"""
-                    ),
-                    text(
-                        f"""'{name}' % concat("User".first_name, ' ', "User".last_name)"""
-                    ),
-                ),
-            )
+            col(Role.name).ilike(f"%{escape_like(role_name)}%", escape="\\"),
+            User.is_active == user_status,
         )
-        .order_by(User.first_name)
     )
+    name = normalize_query(name)
+    if name:
+        query = query.where(name_matches(name)).order_by(
+            name_score(name).desc(), User.id
+        )
+    else:
+        query = query.order_by(User.first_name)
     users = await user.get_multi_paginated(query=query, params=params)
+    prefetch_media_links(
+        obj_user.image.media for obj_user in users.items if obj_user.image
+    )
+    return create_response(data=users)
+
+
+@router.get("/search")
+async def search_users_by_name(
+    name: str = Query(min_length=settings.USER_SEARCH_MIN_LENGTH),
+    limit: int = Query(default=20, ge=1, le=settings.USER_SEARCH_MAX_RESULTS),
+    offset: int = Query(default=0, ge=0),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[list[IUserSearchRead]]:
+    """
+    Searches active users by name, ranked by trigram similarity
+    """
+
+    async def search(query: str) -> list[dict]:
+        return await user.search_by_name(
+            name=query, limit=limit, offset=offset
+        )
+
+    users = await get_cached_search(
+        redis_client, "search", name, limit, offset, search
+    )
+    return create_response(data=users)
+
+
+@router.get("/search/autocomplete")
+async def autocomplete_users_by_name(
+    prefix: str = Query(min_length=settings.USER_SEARCH_MIN_LENGTH),
+    limit: int = Query(default=10, ge=1, le=settings.USER_SEARCH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[list[IUserSearchRead]]:
+    """
+    Suggests active users with a first or last name starting with the
+    prefix
+    """
+
+    async def autocomplete(query: str) -> list[dict]:
+        return await user.autocomplete_by_name(prefix=query, limit=limit)
+
+    users = await get_cached_search(
+        redis_client, "autocomplete", prefix, limit, 0, autocomplete
+    )
+    return create_response(data=users)
+
+
+@router.get("/get_by_name/{user_name}")
+async def get_users_by_name(
+    user_name: str,
+    limit: int = Query(default=20, ge=1, le=settings.SEARCH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    es: AsyncElasticsearch = Depends(deps.get_elasticsearch_client),
+) -> IGetResponseBase[list[IUserReadWithoutGroups]]:
+    """
+    Gets the active users best matching a name, tolerating typos and
+    partial words
+    """
+    user_ids = await search_ids(es, SearchEntityEnum.users, user_name, limit)
+    if user_ids is None:
+        users = await user.search_by_name(name=user_name, limit=limit)
+        user_ids = [obj["id"] for obj in users]
+    users = order_by_ids(await user.get_by_ids(list_ids=user_ids), user_ids)
     return create_response(data=users)
 
 
 @router.get("/order_by_created_at")
 async def get_user_list_order_by_created_at(
     params: Params = Depends(),
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -142,13 +260,16 @@ async def get_user_list_order_by_created_at(
     users = await user.get_multi_paginated_ordered(
         params=params, order_by="created_at"
     )
+    prefetch_media_links(
+        obj_user.image.media for obj_user in users.items if obj_user.image
+    )
     return create_response(data=users)
 
 
 @router.get("/following")
 async def get_following(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IUserFollowReadCommon]:
     """
     Lists the people who the authenticated user follows.
@@ -169,6 +290,58 @@ async def get_following(
     return create_response(data=users)
 
 
+@router.get("/following/cursor")
+async def get_following_by_cursor(
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+) -> IGetResponseCursor[IUserFollowReadCommon]:
+    """
+    Lists the people who the authenticated user follows with cursor
+    pagination.
+    """
+    query = (
+        select(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.follower_count,
+            User.following_count,
+            UserFollow.is_mutual,
+        )
+        .join(UserFollow, User.id == UserFollow.target_user_id)
+        .where(UserFollow.user_id == current_user.id)
+    )
+    # uuid7 ids of UserFollow are ordered by follow time
+    users = await user.get_multi_cursor(
+        params=params, query=query, order_columns=[UserFollow.id]
+    )
+    return create_response(data=users)
+
+
+@router.get("/following/suggestions")
+async def get_follow_suggestions(
+    limit: int = Query(default=20, ge=1, le=settings.FOLLOW_GRAPH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[list[IUserSuggestionRead]]:
+    """
+    Suggests people followed by the people the authenticated user follows,
+    ranked by how many of them follow each one. Follows of the user show up
+    at once, follows of the people they follow after at most
+    FOLLOW_GRAPH_SUGGESTIONS_TTL seconds.
+    """
+    scores = dict(
+        await get_suggestions(redis_client, current_user.id, limit)
+    )
+    users = await user.get_graph_users(user_ids=list(scores))
+    return create_response(
+        data=[
+            IUserSuggestionRead(**obj_user, score=scores[obj_user["id"]])
+            for obj_user in users
+        ]
+    )
+
+
 @router.get(
     "/following/{user_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -176,7 +349,7 @@ async def get_following(
 )
 async def check_is_followed_by_user_id(
     obj_user: User = Depends(user_deps.is_valid_user),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ):
     """
     Check if a person is followed by the authenticated user
@@ -193,7 +366,7 @@ async def check_is_followed_by_user_id(
 @router.get("/followers")
 async def get_followers(
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IUserFollowReadCommon]:
     """
     Lists the people following the authenticated user.
@@ -214,11 +387,39 @@ async def get_followers(
     return create_response(data=users)
 
 
+@router.get("/followers/cursor")
+async def get_followers_by_cursor(
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+) -> IGetResponseCursor[IUserFollowReadCommon]:
+    """
+    Lists the people following the authenticated user with cursor
+    pagination.
+    """
+    query = (
+        select(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.follower_count,
+            User.following_count,
+            UserFollow.is_mutual,
+        )
+        .join(UserFollow, User.id == UserFollow.user_id)
+        .where(UserFollow.target_user_id == current_user.id)
+    )
+    # uuid7 ids of UserFollow are ordered by follow time
+    users = await user.get_multi_cursor(
+        params=params, query=query, order_columns=[UserFollow.id]
+    )
+    return create_response(data=users)
+
+
 @router.get("/{user_id}/followers")
 async def get_user_followed_by_user_id(
     user_id: UUID = Depends(user_deps.is_valid_user_id),
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IUserFollowReadCommon]:
     """
     Lists the people following the specified user.
@@ -239,11 +440,40 @@ async def get_user_followed_by_user_id(
     return create_response(data=users)
 
 
+@router.get("/{user_id}/followers/cursor")
+async def get_user_followed_by_user_id_by_cursor(
+    user_id: UUID = Depends(user_deps.is_valid_user_id),
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+) -> IGetResponseCursor[IUserFollowReadCommon]:
+    """
+    Lists the people following the specified user with cursor
+    pagination.
+    """
+    query = (
+        select(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.follower_count,
+            User.following_count,
+            UserFollow.is_mutual,
+        )
+        .join(UserFollow, User.id == UserFollow.user_id)
+        .where(UserFollow.target_user_id == user_id)
+    )
+    # uuid7 ids of UserFollow are ordered by follow time
+    users = await user.get_multi_cursor(
+        params=params, query=query, order_columns=[UserFollow.id]
+    )
+    return create_response(data=users)
+
+
 @router.get("/{user_id}/following")
 async def get_user_following_by_user_id(
     user_id: UUID = Depends(user_deps.is_valid_user_id),
     params: Params = Depends(),
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ) -> IGetResponsePaginated[IUserFollowReadCommon]:
     """
     Lists the people who the specified user follows.
@@ -264,6 +494,71 @@ async def get_user_following_by_user_id(
     return create_response(data=users)
 
 
+@router.get("/{user_id}/following/cursor")
+async def get_user_following_by_user_id_by_cursor(
+    user_id: UUID = Depends(user_deps.is_valid_user_id),
+    params: CursorParams = Depends(),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+) -> IGetResponseCursor[IUserFollowReadCommon]:
+    """
+    Lists the people who the specified user follows with cursor
+    pagination.
+    """
+    query = (
+        select(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.follower_count,
+            User.following_count,
+            UserFollow.is_mutual,
+        )
+        .join(UserFollow, User.id == UserFollow.target_user_id)
+        .where(UserFollow.user_id == user_id)
+    )
+    # uuid7 ids of UserFollow are ordered by follow time
+    users = await user.get_multi_cursor(
+        params=params, query=query, order_columns=[UserFollow.id]
+    )
+    return create_response(data=users)
+
+
+@router.get("/{user_id}/common_following")
+async def get_common_following_by_user_id(
+    user_id: UUID = Depends(user_deps.is_valid_user_id),
+    limit: int = Query(default=20, ge=1, le=settings.FOLLOW_GRAPH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[list[IUserGraphRead]]:
+    """
+    Lists the people followed by both the authenticated user and the
+    specified user
+    """
+    user_ids = await get_common_following(
+        redis_client, current_user.id, user_id, limit
+    )
+    users = await user.get_graph_users(user_ids=user_ids)
+    return create_response(data=users)
+
+
+@router.get("/{user_id}/known_followers")
+async def get_known_followers_by_user_id(
+    user_id: UUID = Depends(user_deps.is_valid_user_id),
+    limit: int = Query(default=20, ge=1, le=settings.FOLLOW_GRAPH_MAX_RESULTS),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
+    redis_client: Redis = Depends(deps.get_redis_client),
+) -> IGetResponseBase[list[IUserGraphRead]]:
+    """
+    Lists the people the authenticated user follows who follow the
+    specified user
+    """
+    user_ids = await get_known_followers(
+        redis_client, current_user.id, user_id, limit
+    )
+    users = await user.get_graph_users(user_ids=user_ids)
+    return create_response(data=users)
+
+
 @router.get(
     "/{user_id}/following/{target_user_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -272,7 +567,7 @@ async def get_user_following_by_user_id(
 async def check_a_user_is_followed_another_user_by_id(
     user_id: UUID,
     target_user_id: UUID,
-    current_user: User = Depends(deps.get_current_user()),
+    current_user: IUserPrincipal = Depends(deps.get_current_principal()),
 ):
     """
     Check if a user follows another user
@@ -311,17 +606,11 @@ async def follow_a_user_by_id(
     if not target_user:
         raise IdNotFoundException(User, id=target_user_id)
 
-    current_follow_user = (
-        await user_follow.get_follow_by_user_id_and_target_user_id(
-            user_id=current_user.id, target_user_id=target_user_id
-        )
-    )
-    if current_follow_user:
-        raise UserFollowedException(target_user_name=target_user.last_name)
-
     new_user_follow = await user_follow.follow_a_user_by_target_user_id(
         user=current_user, target_user=target_user
     )
+    if not new_user_follow:
+        raise UserFollowedException(target_user_name=target_user.last_name)
     return create_response(data=new_user_follow)
 
 
@@ -339,26 +628,19 @@ async def unfollowing_a_user_by_id(
     if not target_user:
         raise IdNotFoundException(User, id=target_user_id)
 
-    current_follow_user = await user_follow.get_follow_by_target_user_id(
-        user_id=current_user.id, target_user_id=target_user_id
+    removed_user_follow = await user_follow.unfollow_a_user_by_id(
+        user=current_user, target_user=target_user
     )
-
-    if not current_follow_user:
+    if not removed_user_follow:
         raise UserNotFollowedException(user_name=target_user.last_name)
-
-    user_follow = await user_follow.unfollow_a_user_by_id(
-        user_follow_id=current_follow_user.id,
-        user=current_user,
-        target_user=target_user,
-    )
-    return create_response(data=user_follow)
+    return create_response(data=removed_user_follow)
 
 
 @router.get("/{user_id}")
 async def get_user_by_id(
     obj_user: User = Depends(user_deps.is_valid_user),
-    current_user: User = Depends(
-        deps.get_current_user(
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(
             required_roles=[IRoleEnum.admin, IRoleEnum.manager]
         )
     ),
@@ -386,8 +668,8 @@ async def get_my_data(
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def create_user(
     new_user: IUserCreate = Depends(user_deps.user_exists),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> IPostResponseBase[IUserRead]:
     """
@@ -400,23 +682,93 @@ async def create_user(
     return create_response(data=obj_user)
 
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_users(
+    objs_in: Annotated[
+        list[IUserCreate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+) -> IPostResponseBase[list[IUserBasicInfo]]:
+    """
+    Creates several users at once
+
+    Required roles:
+    - admin
+    """
+    emails = [obj_in.email for obj_in in objs_in]
+    if len(set(emails)) != len(emails) or await user.get_existing_emails(
+        emails=emails
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="There is already a user with same email",
+        )
+    role_ids = {obj_in.role_id for obj_in in objs_in if obj_in.role_id}
+    roles = await role.get_by_ids(list_ids=list(role_ids))
+    missing_role_ids = role_ids - {obj_role.id for obj_role in roles}
+    if missing_role_ids:
+        raise IdNotFoundException(Role, id=missing_role_ids.pop())
+
+    users = await user.create_many_with_role(objs_in=objs_in)
+    return create_response(data=users)
+
+
+@router.put("/bulk")
+async def update_users(
+    objs_in: Annotated[
+        list[IUserBulkUpdate],
+        Body(min_length=1, max_length=settings.BULK_MAX_ITEMS),
+    ],
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
+    ),
+) -> IPutResponseBase[list[IUserBasicInfo]]:
+    """
+    Updates several users at once by their ids, unknown ids are ignored
+
+    Required roles:
+    - admin
+    """
+    users = await user.update_many(
+        objs_new=[obj_in.model_dump(exclude_unset=True) for obj_in in objs_in]
+    )
+    return create_response(data=users)
+
+
 @router.delete("/{user_id}")
 async def remove_user(
-    user_id: UUID = Depends(user_deps.is_valid_user_id),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    response: Response,
+    obj_user: User = Depends(user_deps.is_valid_user),
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
 ) -> IDeleteResponseBase[IUserRead]:
     """
-    Deletes a user by his/her id
+    Deletes a user by his/her id. Users with more than
+    USER_REMOVE_BACKGROUND_THRESHOLD follows are deactivated at once and
+    removed in the background (202 Accepted).
 
     Required roles:
     - admin
     """
-    if current_user.id == user_id:
+    if current_user.id == obj_user.id:
         raise UserSelfDeleteException()
 
-    obj_user = await user.remove(id=user_id)
+    follows_count = (obj_user.follower_count or 0) + (
+        obj_user.following_count or 0
+    )
+    if follows_count > settings.USER_REMOVE_BACKGROUND_THRESHOLD:
+        obj_user = await user.update(
+            obj_current=obj_user, obj_new={"is_active": False}
+        )
+        remove_user_task.delay(str(obj_user.id))
+        response.status_code = status.HTTP_202_ACCEPTED
+        return create_response(data=obj_user, message="User removal started")
+
+    obj_user = await user.remove(id=obj_user.id)
     return create_response(data=obj_user, message="User removed")
 
 
@@ -432,22 +784,22 @@ async def upload_my_image(
     Uploads a user image
     """
     try:
-        image_modified = modify_image(BytesIO(image_file.file.read()))
-        data_file = minio_client.put_object(
+        # The upload is streamed from the spooled file, not read in memory
+        image_info = await asyncify(read_image_info)(image_file.file)
+        data_file = await minio_client.put_object_async(
             file_name=image_file.filename,
-            file_data=BytesIO(image_modified.file_data),
+            file_data=image_file.file,
             content_type=image_file.content_type,
         )
-        print("data_file", data_file)
         media = IMediaCreate(
             title=title, description=description, path=data_file.file_name
         )
         obj_user = await user.update_photo(
             user=current_user,
             image=media,
-            heigth=image_modified.height,
-            width=image_modified.width,
-            file_format=image_modified.file_format,
+            heigth=image_info.height,
+            width=image_info.width,
+            file_format=image_info.file_format,
         )
         return create_response(data=obj_user)
     except Exception as e:
@@ -461,8 +813,8 @@ async def upload_user_image(
     title: str | None = Body(None),
     description: str | None = Body(None),
     image_file: UploadFile = File(...),
-    current_user: User = Depends(
-        deps.get_current_user(required_roles=[IRoleEnum.admin])
+    current_user: IUserPrincipal = Depends(
+        deps.get_current_principal(required_roles=[IRoleEnum.admin])
     ),
     minio_client: MinioClient = Depends(deps.minio_auth),
 ) -> IPostResponseBase[IUserRead]:
@@ -473,10 +825,11 @@ async def upload_user_image(
     - admin
     """
     try:
-        image_modified = modify_image(BytesIO(image_file.file.read()))
-        data_file = minio_client.put_object(
+        # The upload is streamed from the spooled file, not read in memory
+        image_info = await asyncify(read_image_info)(image_file.file)
+        data_file = await minio_client.put_object_async(
             file_name=image_file.filename,
-            file_data=BytesIO(image_modified.file_data),
+            file_data=image_file.file,
             content_type=image_file.content_type,
         )
         media = IMediaCreate(
@@ -485,9 +838,9 @@ async def upload_user_image(
         obj_user = await user.update_photo(
             user=obj_user,
             image=media,
-            heigth=image_modified.height,
-            width=image_modified.width,
-            file_format=image_modified.file_format,
+            heigth=image_info.height,
+            width=image_info.width,
+            file_format=image_info.file_format,
         )
         return create_response(data=obj_user)
     except Exception as e:
@@ -1,8 +1,10 @@
 # Celery is good for data-intensive application or some long-running tasks in other simple cases use Fastapi background tasks
 # Reference https://towardsdatascience.com/deploying-ml-models-in-production-with-fastapi-and-celery-7063e539a5db
 from celery import Celery
+from celery.signals import worker_process_init
+from prometheus_client import start_http_server
 
-from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.core.config import FollowCounterModeEnum, settings
 
 celery = Celery(
     "async_task",
@@ -13,3 +15,37 @@ celery = Celery(
 
 celery.conf.update({"beat_dburi": str(settings.SYNC_CELERY_BEAT_DATABASE_URI)})
 celery.autodiscover_tasks()
+
+celery.conf.beat_schedule["sync-search-index"] = {
+    "task": "tasks.sync_search_index",
+    "schedule": settings.SEARCH_SYNC_INTERVAL,
+}
+
+celery.conf.beat_schedule["embed-texts"] = {
+    "task": "tasks.embed_texts",
+    "schedule": settings.EMBEDDING_INTERVAL,
+    # Runs missed while the workers are busy are not queued up
+    "options": {"expires": settings.EMBEDDING_INTERVAL},
+}
+
+if settings.FOLLOW_COUNTER_MODE == FollowCounterModeEnum.buffered:
+    celery.conf.beat_schedule["flush-follow-counters"] = {
+        "task": "tasks.flush_follow_counters",
+        "schedule": settings.FOLLOW_COUNTER_FLUSH_INTERVAL,
+    }
+
+
+@worker_process_init.connect
+def start_metrics_server(**kwargs) -> None:
+    """Every pool process serves its metrics on the next free port"""
+    if settings.CELERY_METRICS_PORT is None:
+        return
+    for port in range(
+        settings.CELERY_METRICS_PORT,
+        settings.CELERY_METRICS_PORT + settings.CELERY_METRICS_MAX_PORTS,
+    ):
+        try:
+            start_http_server(port)
+            return
+        except OSError:
+            continue
@@ -20,6 +20,34 @@ class ModeEnum(str, Enum):
     testing = "testing"
 
 
+class CountStrategyEnum(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+
+
+class TokenValidationModeEnum(str, Enum):
+    allowlist = "allowlist"  # SISMEMBER on the per user set of token ids
+    revocation = "revocation"  # Lookup of the token id in a revocation list
+
+
+class VectorSimilarityEnum(str, Enum):
+    cosine = "cosine"
+    dot_product = "dot_product"
+    l2_norm = "l2_norm"
+    max_inner_product = "max_inner_product"
+
+
+class EmbeddingBackendEnum(str, Enum):
+    torch = "torch"
+    onnx = "onnx"  # Usually faster on CPU
+
+
+class FollowCounterModeEnum(str, Enum):
+    direct = "direct"  # Counters are updated in the follow statement
+    buffered = "buffered"  # Hot follower counters are aggregated in Redis
+
+
 class Settings(BaseSettings):
     MODE: ModeEnum = ModeEnum.testing
     API_VERSION: str = "v1"
@@ -27,6 +55,15 @@ class Settings(BaseSettings):
     PROJECT_NAME: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 1  # 1 hour
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 100  # 100 days
+    TOKEN_VALIDATION_MODE: TokenValidationModeEnum = (
+        TokenValidationModeEnum.allowlist
+    )
+    TOKEN_REVOCATION_BLOOM_ENABLED: bool = False
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100_000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    BCRYPT_ROUNDS: int = 12  # Passwords are rehashed on login when changed
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
     OPENAI_API_KEY: str
     
     POSTGRESQL_USERNAME: str
@@ -38,17 +75,96 @@ class Settings(BaseSettings):
     DATABASE_CELERY_NAME: str = "celery_schedule_jobs"
     REDIS_HOST: str
     REDIS_PORT: str
+    REDIS_POOL_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0  # Seconds waiting for a free connection
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    PRINCIPAL_CACHE_TTL: int = 300  # Redis tier, seconds
+    PRINCIPAL_CACHE_LOCAL_TTL: float = 5.0  # In-process tier, seconds
+    PRINCIPAL_CACHE_LOCAL_MAXSIZE: int = 10_000
     
-    DB_POOL_SIZE: int = 83
-    WEB_CONCURRENCY: int = 9
-    POOL_SIZE: int = max(DB_POOL_SIZE // WEB_CONCURRENCY, 5)
+    DB_POOL_SIZE: int = 83  # Connections budget shared by all the workers
+    WEB_CONCURRENCY: int = 9  # Number of gunicorn workers (-w)
+    POOL_SIZE: int = 0  # Per worker, computed from the values above if 0
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
     ASYNC_DATABASE_URI: PostgresDsn | str = ""
 
+    @field_validator("POOL_SIZE", mode="after")
+    def assemble_pool_size(cls, v: int, info: FieldValidationInfo) -> int:
+        if v <= 0:
+            return max(
+                info.data["DB_POOL_SIZE"] // info.data["WEB_CONCURRENCY"], 5
+            )
+        return v
+
     ELASTIC_SEARCH_DATABASE_HOST: str
     ELASTIC_SEARCH_DATABASE_PORT: int
     ELASTIC_SEARCH_DATABASE_URI: HttpUrl | str = ""
     ELASTIC_VECTOR_INDEX: str = "text_vectors"
     ELASTIC_VECTOR_DIMS: int = 128
+    ELASTIC_VECTOR_SIMILARITY: VectorSimilarityEnum = (
+        VectorSimilarityEnum.cosine
+    )
+    ELASTIC_VECTOR_HNSW_M: int = 16
+    ELASTIC_VECTOR_HNSW_EF_CONSTRUCTION: int = 100
+    # int8 quantization keeps the graph vectors in a quarter of the memory
+    ELASTIC_VECTOR_QUANTIZED: bool = False
+    ELASTIC_VECTOR_MAX_K: int = 100
+    # Candidates per shard default to k times the factor
+    ELASTIC_VECTOR_NUM_CANDIDATES_FACTOR: int = 10
+    ELASTIC_VECTOR_MAX_NUM_CANDIDATES: int = 10_000
+    ELASTIC_VECTOR_MAX_BATCH_QUERIES: int = 500  # Searches per _msearch
+    # Searches of a batch executed concurrently, None lets Elasticsearch
+    # pick from the cluster size
+    ELASTIC_VECTOR_MSEARCH_CONCURRENCY: int | None = None
+    # Unfiltered neighbor searches are answered by an in-process copy of
+    # the vector index, memory mapped from a snapshot shared by workers
+    VECTOR_LOCAL_INDEX_ENABLED: bool = False
+    VECTOR_LOCAL_INDEX_PATH: str = "/tmp/vector_index"
+    VECTOR_LOCAL_INDEX_MAX_SIZE: int = 1_000_000
+    VECTOR_LOCAL_INDEX_QUANTIZED: bool = False  # int8 matrix
+    VECTOR_LOCAL_INDEX_IVF_LISTS: int = 0  # 0 searches every vector
+    VECTOR_LOCAL_INDEX_IVF_PROBES: int = 8
+    VECTOR_LOCAL_INDEX_REFRESH_INTERVAL: int = 30  # Seconds
+    # Changes are read again for this long, as documents only become
+    # searchable after an Elasticsearch refresh
+    VECTOR_LOCAL_INDEX_REFRESH_OVERLAP: int = 60  # Seconds
+    # Changed vectors are merged into a new snapshot past this count
+    VECTOR_LOCAL_INDEX_COMPACT_SIZE: int = 50_000
+    # Snapshots are read again from Elasticsearch past this age
+    VECTOR_LOCAL_INDEX_REBUILD_INTERVAL: int = 6 * 60 * 60  # Seconds
+    VECTOR_LOCAL_INDEX_CACHE_SIZE: int = 10_000
+    VECTOR_LOCAL_INDEX_CACHE_TTL: int = 60
+    ELASTIC_BULK_CHUNK_SIZE: int = 500  # Documents per bulk request
+    ELASTIC_BULK_MAX_CHUNK_BYTES: int = 10 * 1024 * 1024
+    ELASTIC_BULK_CONCURRENCY: int = 4  # Bulk requests in flight
+    ELASTIC_BULK_MAX_CONCURRENCY: int = 16
+    ELASTIC_BULK_MAX_REPORTED_ERRORS: int = 100
+    # Texts submitted for embedding are queued on a Redis stream and
+    # encoded in batches by Celery workers. Without a sentence-transformers
+    # model name a hashing model is used.
+    EMBEDDING_MODEL_NAME: str | None = None
+    EMBEDDING_MODEL_BACKEND: EmbeddingBackendEnum = EmbeddingBackendEnum.torch
+    EMBEDDING_STREAM: str = "embedding:texts"
+    EMBEDDING_STREAM_MAXLEN: int = 1_000_000
+    EMBEDDING_MAX_TEXT_LENGTH: int = 10_000
+    EMBEDDING_BATCH_SIZE: int = 64  # Texts per model call
+    # A batch is encoded once full or when the window has elapsed
+    EMBEDDING_BATCH_WINDOW: int = 200  # Milliseconds
+    EMBEDDING_INTERVAL: int = 5  # Seconds
+    EMBEDDING_MAX_RUN_TIME: int = 60  # Seconds a task keeps reading
+    # Texts left unacknowledged by a failed run are retried after
+    EMBEDDING_RETRY_IDLE: int = 60  # Seconds
+    # Prometheus port of the first Celery pool process, None disables it
+    CELERY_METRICS_PORT: int | None = None
+    CELERY_METRICS_MAX_PORTS: int = 64
+    # Hero, team and user search indices are named <prefix>_<entity>
+    ELASTIC_SEARCH_INDEX_PREFIX: str = "search"
 
     @field_validator("ELASTIC_SEARCH_DATABASE_URI", mode="after")
     def assemble_elastic_db_connection(
@@ -146,6 +262,66 @@ class Settings(BaseSettings):
     MINIO_ROOT_PASSWORD: str
     MINIO_URL: str
     MINIO_BUCKET: str
+    MINIO_POOL_MAXSIZE: int = 20
+    MINIO_CONNECT_TIMEOUT: float = 5.0
+    MINIO_READ_TIMEOUT: float = 60.0
+    MINIO_PART_SIZE: int = 10 * 1024 * 1024  # Minimum allowed is 5 MiB
+    # With a known region presigned URLs are signed without network calls
+    MINIO_REGION: str = "us-east-1"
+    MINIO_PRESIGNED_URL_EXPIRES: int = 7 * 24 * 60 * 60  # Maximum allowed
+    MINIO_PRESIGNED_URL_CACHE_TTL: int = 24 * 60 * 60
+    MINIO_PRESIGNED_URL_CACHE_MAXSIZE: int = 10_000
+
+    @field_validator("MINIO_PRESIGNED_URL_CACHE_TTL", mode="after")
+    def check_presigned_url_cache_ttl(
+        cls, v: int, info: FieldValidationInfo
+    ) -> int:
+        if v >= info.data["MINIO_PRESIGNED_URL_EXPIRES"]:
+            raise ValueError(
+                "MINIO_PRESIGNED_URL_CACHE_TTL must be lower than "
+                "MINIO_PRESIGNED_URL_EXPIRES"
+            )
+        return v
+
+    PAGINATION_COUNT_STRATEGY: CountStrategyEnum = CountStrategyEnum.cached
+    PAGINATION_COUNT_CACHE_TTL: int = 60
+    # Estimates below the threshold are replaced by an exact count
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD: int = 10_000
+    BULK_BATCH_SIZE: int = 1000  # Rows per statement and commit
+    BULK_MAX_ITEMS: int = 1000  # Items per bulk request
+    REPORT_EXPORT_BATCH_SIZE: int = 1000
+    REPORT_EXPORT_JOB_TIMEOUT: int = 60 * 60
+    REPORT_EXPORT_JOB_TTL: int = 24 * 60 * 60
+    FOLLOW_COUNTER_MODE: FollowCounterModeEnum = FollowCounterModeEnum.direct
+    # Accounts with at least this many followers are buffered
+    FOLLOW_COUNTER_HOT_THRESHOLD: int = 10_000
+    FOLLOW_COUNTER_FLUSH_INTERVAL: int = 10  # Seconds
+    # Adjacency sets of users with more edges are cached in Redis
+    FOLLOW_GRAPH_HOT_THRESHOLD: int = 1_000
+    FOLLOW_GRAPH_CACHE_MAX_SIZE: int = 500_000
+    FOLLOW_GRAPH_CACHE_TTL: int = 60 * 60
+    FOLLOW_GRAPH_SUGGESTION_FANOUT: int = 1_000
+    FOLLOW_GRAPH_SUGGESTIONS_TTL: int = 5 * 60
+    FOLLOW_GRAPH_MAX_RESULTS: int = 100
+    USER_SEARCH_MIN_LENGTH: int = 3  # Shorter queries have no trigrams
+    USER_SEARCH_SIMILARITY_THRESHOLD: float = 0.3
+    USER_SEARCH_CACHE_TTL: int = 60
+    USER_SEARCH_MAX_RESULTS: int = 50
+    # Users with more follows are removed by a background job
+    USER_REMOVE_BACKGROUND_THRESHOLD: int = 10_000
+    USER_REMOVE_BATCH_SIZE: int = 5_000  # Follows deleted per commit
+    INGESTION_BATCH_SIZE: int = 10_000  # Rows per COPY and commit
+    INGESTION_HASH_PROCESSES: int = 4
+    INGESTION_MAX_REPORTED_ERRORS: int = 100
+    INGESTION_JOB_TIMEOUT: int = 6 * 60 * 60
+    INGESTION_JOB_TTL: int = 24 * 60 * 60
+    SEARCH_MAX_RESULTS: int = 50
+    SEARCH_SYNC_STREAM: str = "search_sync:changes"
+    SEARCH_SYNC_STREAM_MAXLEN: int = 1_000_000
+    SEARCH_SYNC_BATCH_SIZE: int = 500  # Changes per bulk request
+    SEARCH_SYNC_INTERVAL: int = 5  # Seconds
+    # Changes left unacknowledged by a failed run are retried after
+    SEARCH_SYNC_RETRY_IDLE: int = 60  # Seconds
 
     WHEATER_URL: AnyHttpUrl
 
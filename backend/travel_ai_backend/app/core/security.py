@@ -1,16 +1,39 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any
+from uuid import uuid4
 
 import bcrypt
 import jwt
 from cryptography.fernet import Fernet
+from prometheus_client import Gauge, Histogram
 
 from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.utils.exceptions import ServiceBusyException
 
 fernet = Fernet(str.encode(settings.ENCRYPT_KEY))
 
 JWT_ALGORITHM = "HS256"
 
+# bcrypt releases the GIL, so hashing in threads keeps the event loop free
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+password_hash_queue_depth = Gauge(
+    "password_hash_queue_depth",
+    "Password hash/verify operations waiting or running in the executor",
+)
+password_hash_latency = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash/verify latency including the time spent in the queue",
+    ["operation"],
+)
+_pending_password_tasks = 0
+
 
 def create_access_token(
     subject: str | Any, expires_delta: timedelta = None
@@ -21,7 +44,13 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject), "type": "access"}
+    to_encode = {
+        "exp": expire,
+        "iat": time.time(),
+        "jti": uuid4().hex,
+        "sub": str(subject),
+        "type": "access",
+    }
 
     return jwt.encode(
         payload=to_encode,
@@ -39,7 +68,13 @@ def create_refresh_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {
+        "exp": expire,
+        "iat": time.time(),
+        "jti": uuid4().hex,
+        "sub": str(subject),
+        "type": "refresh",
+    }
 
     return jwt.encode(
         payload=to_encode,
@@ -71,7 +106,53 @@ def get_password_hash(plain_password: str | bytes) -> str:
     if isinstance(plain_password, str):
         plain_password = plain_password.encode()
 
-    return bcrypt.hashpw(plain_password, bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(
+        plain_password, bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    ).decode()
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<rounds>$<salt and hash>
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+
+async def _run_password_task(
+    operation: str, func: Callable[..., Any], *args: Any
+) -> Any:
+    global _pending_password_tasks
+    if _pending_password_tasks >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise ServiceBusyException(
+            detail="Too many authentication requests, try again later."
+        )
+    _pending_password_tasks += 1
+    password_hash_queue_depth.inc()
+    start_time = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            password_hash_executor, func, *args
+        )
+    finally:
+        _pending_password_tasks -= 1
+        password_hash_queue_depth.dec()
+        password_hash_latency.labels(operation).observe(
+            time.perf_counter() - start_time
+        )
+
+
+async def verify_password_async(
+    plain_password: str | bytes, hashed_password: str | bytes
+) -> bool:
+    return await _run_password_task(
+        "verify", verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(plain_password: str | bytes) -> str:
+    return await _run_password_task("hash", get_password_hash, plain_password)
 
 
 def get_data_encrypt(data) -> str:
@@ -1,17 +1,48 @@
+from collections.abc import Iterator, Sequence
+from datetime import datetime
 from typing import Any, Generic, TypeVar
 from uuid import UUID
 
 from fastapi import HTTPException
 from fastapi_async_sqlalchemy import db
-from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlmodel import paginate
+from fastapi_pagination import Params
 from pydantic import BaseModel
-from sqlalchemy import exc
-from sqlmodel import SQLModel, func, select
+from sqlalchemy import (
+    ColumnElement,
+    and_,
+    column,
+    delete,
+    exc,
+    false,
+    insert,
+    or_,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
+from travel_ai_backend.app.core.config import CountStrategyEnum, settings
 from travel_ai_backend.app.schemas.common_schema import IOrderEnum
+from travel_ai_backend.app.schemas.response_schema import (
+    CursorPageBase,
+    CursorParams,
+    IGetResponsePaginated,
+)
+from travel_ai_backend.app.utils.cursor import (
+    coerce_cursor_values,
+    decode_cursor,
+    encode_cursor,
+)
+from travel_ai_backend.app.utils.exceptions import InvalidCursorException
+from travel_ai_backend.app.utils.query_count import (
+    count_query,
+    invalidate_counts,
+)
+from travel_ai_backend.app.utils.search_sync import record_changes
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -19,6 +50,48 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
 T = TypeVar("T", bound=SQLModel)
 
+# Maximum number of bind parameters of a single asyncpg statement
+MAX_BIND_PARAMS = 32767
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _python_type(column: ColumnElement) -> type | None:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def keyset_after(
+    columns: Sequence[ColumnElement], values: Sequence[Any], descending: bool
+) -> ColumnElement:
+    """
+    Rows after the keyset values in the order of the columns. NULL sorts
+    above every value, like the default Postgres order and indexes.
+    """
+    if None not in values and all(
+        getattr(column, "nullable", True) is False for column in columns
+    ):
+        # A row comparison can be answered by a single index range
+        key = tuple_(*columns)
+        return key < tuple_(*values) if descending else key > tuple_(*values)
+    clauses = []
+    equal = []
+    for column, value in zip(columns, values):
+        if descending:
+            after = column.is_not(None) if value is None else column < value
+        elif value is None:
+            after = false()
+        else:
+            after = or_(column > value, column.is_(None))
+        clauses.append(and_(*equal, after))
+        equal.append(column.is_(None) if value is None else column == value)
+    return or_(*clauses)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: type[ModelType]):
@@ -55,13 +128,47 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return response.scalars().all()
 
     async def get_count(
-        self, db_session: AsyncSession | None = None
-    ) -> ModelType | None:
+        self,
+        count_strategy: CountStrategyEnum | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> int:
         db_session = db_session or self.db.session
+        total, _ = await count_query(
+            db_session, select(self.model), count_strategy
+        )
+        return total
+
+    async def paginate(
+        self,
+        *,
+        query: T | Select[T],
+        params: Params,
+        count_strategy: CountStrategyEnum | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> IGetResponsePaginated[ModelType]:
+        db_session = db_session or self.db.session
+        total, is_total_exact = await count_query(
+            db_session, query, count_strategy
+        )
+        raw_params = params.to_raw_params().as_limit_offset()
         response = await db_session.execute(
-            select(func.count()).select_from(select(self.model).subquery())
+            query.limit(raw_params.limit).offset(raw_params.offset)
+        )
+        column_descriptions = query.column_descriptions
+        if (
+            len(column_descriptions) == 1
+            and column_descriptions[0]["expr"]
+            is column_descriptions[0]["entity"]
+        ):
+            items = response.unique().scalars().all()
+        else:
+            items = response.all()
+        return IGetResponsePaginated.create(
+            items=items,
+            total=total,
+            params=params,
+            is_total_exact=is_total_exact,
         )
-        return response.scalar_one()
 
     async def get_multi(
         self,
@@ -87,14 +194,18 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         *,
         params: Params | None = Params(),
         query: T | Select[T] | None = None,
+        count_strategy: CountStrategyEnum | None = None,
         db_session: AsyncSession | None = None,
-    ) -> Page[ModelType]:
-        db_session = db_session or self.db.session
+    ) -> IGetResponsePaginated[ModelType]:
         if query is None:
             query = select(self.model)
 
-        output = await paginate(db_session, query, params)
-        return output
+        return await self.paginate(
+            query=query,
+            params=params,
+            count_strategy=count_strategy,
+            db_session=db_session,
+        )
 
     async def get_multi_paginated_ordered(
         self,
@@ -103,10 +214,9 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order_by: str | None = None,
         order: IOrderEnum | None = IOrderEnum.ascendent,
         query: T | Select[T] | None = None,
+        count_strategy: CountStrategyEnum | None = None,
         db_session: AsyncSession | None = None,
-    ) -> Page[ModelType]:
-        db_session = db_session or self.db.session
-
+    ) -> IGetResponsePaginated[ModelType]:
         columns = self.model.__table__.columns
 
         if order_by is None or order_by not in columns:
@@ -118,7 +228,110 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             else:
                 query = select(self.model).order_by(columns[order_by].desc())
 
-        return await paginate(db_session, query, params)
+        return await self.paginate(
+            query=query,
+            params=params,
+            count_strategy=count_strategy,
+            db_session=db_session,
+        )
+
+    async def get_multi_cursor(
+        self,
+        *,
+        params: CursorParams = CursorParams(),
+        order_by: str | None = None,
+        order: IOrderEnum | None = IOrderEnum.ascendent,
+        order_columns: list[ColumnElement] | None = None,
+        query: T | Select[T] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> CursorPageBase[ModelType]:
+        """
+        Keyset pagination: rows are read after (or before) the cursor row
+        in `order_columns` order instead of skipping an OFFSET, so every
+        page costs the same. `order_columns` must end with a unique column,
+        by default it is the `order_by` column of the model and its id.
+        NULL order values sort above the others.
+        """
+        db_session = db_session or self.db.session
+
+        if order_columns is None:
+            columns = self.model.__table__.columns
+            if order_by is None or order_by not in columns:
+                order_by = "id"
+            order_columns = [columns[order_by]]
+            if order_by != "id":
+                order_columns.append(columns["id"])
+        if query is None:
+            query = select(self.model)
+
+        backwards = False
+        values = None
+        if params.cursor:
+            try:
+                values, backwards = decode_cursor(params.cursor)
+                if len(values) != len(order_columns):
+                    raise ValueError("Invalid cursor")
+                # A value of the wrong type would fail in the database
+                values = coerce_cursor_values(
+                    values, [_python_type(column) for column in order_columns]
+                )
+            except ValueError:
+                raise InvalidCursorException()
+
+        total = None
+        if params.include_total:
+            total, _ = await count_query(db_session, query)
+
+        # Reading backwards flips the order, rows are reversed afterwards
+        descending = (order == IOrderEnum.descendent) != backwards
+        page_query = query.order_by(None).add_columns(*order_columns)
+        if values is not None:
+            page_query = page_query.where(
+                keyset_after(order_columns, values, descending)
+            )
+        page_query = page_query.order_by(
+            *(
+                column.desc() if descending else column.asc()
+                for column in order_columns
+            )
+        ).limit(params.size + 1)
+
+        response = await db_session.execute(page_query)
+        rows = response.all()
+        has_more = len(rows) > params.size
+        rows = rows[: params.size]
+        if backwards:
+            rows.reverse()
+
+        entities_count = len(query.column_descriptions)
+        single_entity = entities_count == 1 and (
+            query.column_descriptions[0]["expr"]
+            is query.column_descriptions[0]["entity"]
+        )
+        if single_entity:
+            items = [row[0] for row in rows]
+        else:
+            items = [
+                dict(zip(row._fields[:entities_count], row[:entities_count]))
+                for row in rows
+            ]
+
+        next_cursor = None
+        previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = encode_cursor(rows[-1][entities_count:])
+            if has_more if backwards else keyset is not None:
+                previous_cursor = encode_cursor(
+                    rows[0][entities_count:], backwards=True
+                )
+        return CursorPageBase(
+            items=items,
+            size=params.size,
+            total=total,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
 
     async def get_multi_ordered(
         self,
@@ -176,6 +389,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 status_code=409,
                 detail="Resource already exists",
             )
+        await invalidate_counts([self.model.__table__.name])
         await db_session.refresh(db_obj)
         return db_obj
 
@@ -199,6 +413,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         db_session.add(obj_current)
         await db_session.commit()
+        await invalidate_counts([self.model.__table__.name])
         await db_session.refresh(obj_current)
         return obj_current
 
@@ -212,4 +427,191 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = response.scalar_one()
         await db_session.delete(obj)
         await db_session.commit()
+        await invalidate_counts([self.model.__table__.name])
         return obj
+
+    def _bulk_chunk_size(self, columns_count: int) -> int:
+        return max(
+            1, min(settings.BULK_BATCH_SIZE, MAX_BIND_PARAMS // columns_count)
+        )
+
+    def _to_row(
+        self,
+        obj_in: CreateSchemaType | ModelType,
+        created_by_id: UUID | str | None = None,
+    ) -> dict[str, Any]:
+        # Validating through the model fills the defaults (id, created_at)
+        db_obj = self.model.model_validate(obj_in)  # type: ignore
+        if created_by_id:
+            db_obj.created_by_id = created_by_id
+        # Generated columns are computed by the database
+        return {
+            column.key: getattr(db_obj, column.key)
+            for column in self.model.__table__.columns
+            if column.computed is None
+        }
+
+    async def _execute_bulk(
+        self, statement: Any, db_session: AsyncSession
+    ) -> list[ModelType]:
+        try:
+            response = await db_session.execute(statement)
+            objs = response.scalars().all()
+            # Returned rows stay usable after the commit expires the session
+            for obj in objs:
+                db_session.expunge(obj)
+            record_changes(db_session, self.model, [obj.id for obj in objs])
+            await db_session.commit()
+        except exc.IntegrityError:
+            await db_session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Resource already exists",
+            )
+        await invalidate_counts([self.model.__table__.name])
+        return objs
+
+    async def create_many(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType],
+        created_by_id: UUID | str | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        """
+        Inserts the objects with multi-row INSERT ... RETURNING statements,
+        one statement and one commit per batch
+        """
+        db_session = db_session or self.db.session
+        rows = [self._to_row(obj_in, created_by_id) for obj_in in objs_in]
+        if not rows:
+            return []
+        created = []
+        for chunk in chunked(rows, self._bulk_chunk_size(len(rows[0]))):
+            statement = insert(self.model).values(chunk).returning(self.model)
+            created.extend(
+                await self._execute_bulk(statement, db_session)
+            )
+        return created
+
+    async def upsert_many(
+        self,
+        *,
+        objs_in: Sequence[CreateSchemaType | ModelType],
+        index_elements: list[str] | None = None,
+        update_fields: list[str] | None = None,
+        created_by_id: UUID | str | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        """
+        INSERT ... ON CONFLICT (index_elements) DO UPDATE. By default every
+        column except the conflict target and the creation fields is updated.
+        """
+        db_session = db_session or self.db.session
+        index_elements = index_elements or ["id"]
+        rows = [self._to_row(obj_in, created_by_id) for obj_in in objs_in]
+        if not rows:
+            return []
+        if update_fields is None:
+            excluded_fields = {"id", "created_at", "created_by_id"}
+            update_fields = [
+                name
+                for name in rows[0]
+                if name not in excluded_fields and name not in index_elements
+            ]
+        upserted = []
+        for chunk in chunked(rows, self._bulk_chunk_size(len(rows[0]))):
+            statement = pg_insert(self.model).values(chunk)
+            statement = (
+                statement.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={
+                        name: statement.excluded[name]
+                        for name in update_fields
+                    },
+                )
+                .returning(self.model)
+                .execution_options(populate_existing=True)
+            )
+            upserted.extend(
+                await self._execute_bulk(statement, db_session)
+            )
+        return upserted
+
+    async def update_many(
+        self,
+        *,
+        objs_new: Sequence[dict[str, Any]],
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        """
+        Every item of `objs_new` holds the id of the row and its new values.
+        Items updating the same fields are sent as a single
+        UPDATE ... FROM (VALUES ...) RETURNING statement per batch.
+        """
+        db_session = db_session or self.db.session
+        table = self.model.__table__
+        updated_at = datetime.utcnow()
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for obj_new in objs_new:
+            fields = tuple(sorted(name for name in obj_new if name != "id"))
+            groups.setdefault(fields, []).append(obj_new)
+
+        updated = []
+        for fields, group_rows in groups.items():
+            names = ["id", *fields]
+            if "updated_at" in table.columns and "updated_at" not in fields:
+                names.append("updated_at")
+            chunk_size = self._bulk_chunk_size(len(names))
+            for chunk in chunked(group_rows, chunk_size):
+                new_values = values(
+                    *(column(name, table.c[name].type) for name in names),
+                    name="new_values",
+                ).data(
+                    [
+                        tuple(
+                            {"updated_at": updated_at, **row}[name]
+                            for name in names
+                        )
+                        for row in chunk
+                    ]
+                )
+                statement = (
+                    update(self.model)
+                    .where(self.model.id == new_values.c.id)
+                    .values(
+                        {
+                            name: new_values.c[name]
+                            for name in names
+                            if name != "id"
+                        }
+                    )
+                    .returning(self.model)
+                    .execution_options(
+                        synchronize_session=False, populate_existing=True
+                    )
+                )
+                updated.extend(
+                    await self._execute_bulk(statement, db_session)
+                )
+        return updated
+
+    async def delete_many(
+        self,
+        *,
+        ids: Sequence[UUID | str],
+        db_session: AsyncSession | None = None,
+    ) -> list[ModelType]:
+        db_session = db_session or self.db.session
+        deleted = []
+        for chunk in chunked(ids, self._bulk_chunk_size(1)):
+            statement = (
+                delete(self.model)
+                .where(self.model.id.in_(chunk))
+                .returning(self.model)
+                .execution_options(synchronize_session=False)
+            )
+            deleted.extend(
+                await self._execute_bulk(statement, db_session)
+            )
+        return deleted
@@ -5,11 +5,13 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 
 from travel_ai_backend.app.crud.base_crud import CRUDBase
 from travel_ai_backend.app.models.group_model import Group
+from travel_ai_backend.app.models.links_model import LinkGroupUser
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.group_schema import (
     IGroupCreate,
     IGroupUpdate,
 )
+from travel_ai_backend.app.utils.query_count import invalidate_counts
 
 
 class CRUDGroup(CRUDBase[Group, IGroupCreate, IGroupUpdate]):
@@ -28,6 +30,7 @@ class CRUDGroup(CRUDBase[Group, IGroupCreate, IGroupUpdate]):
         group.users.append(user)
         db_session.add(group)
         await db_session.commit()
+        await invalidate_counts([LinkGroupUser.__table__.name])
         await db_session.refresh(group)
         return group
 
@@ -43,6 +46,7 @@ class CRUDGroup(CRUDBase[Group, IGroupCreate, IGroupUpdate]):
         group.users.extend(users)
         db_session.add(group)
         await db_session.commit()
+        await invalidate_counts([LinkGroupUser.__table__.name])
         await db_session.refresh(group)
         return group
 
@@ -10,11 +10,18 @@ from travel_ai_backend.app.schemas.hero_schema import IHeroCreate, IHeroUpdate
 
 class CRUDHero(CRUDBase[Hero, IHeroCreate, IHeroUpdate]):
     async def get_heroe_by_name(
-        self, *, name: str, db_session: AsyncSession | None = None
-    ) -> Hero:
+        self,
+        *,
+        name: str,
+        limit: int | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> list[Hero]:
         db_session = db_session or super().get_db().session
         heroe = await db_session.execute(
-            select(Hero).where(col(Hero.name).ilike(f"%{name}%"))
+            select(Hero)
+            .where(col(Hero.name).ilike(f"%{name}%"))
+            .order_by(Hero.name, Hero.id)
+            .limit(limit)
         )
         return heroe.scalars().all()
 
@@ -1,3 +1,4 @@
+from typing import Any
 from uuid import UUID
 
 from sqlmodel import select
@@ -7,6 +8,11 @@ from travel_ai_backend.app.crud.base_crud import CRUDBase
 from travel_ai_backend.app.models.role_model import Role
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.role_schema import IRoleCreate, IRoleUpdate
+from travel_ai_backend.app.utils.principal_cache import (
+    invalidate_principal,
+    invalidate_principals,
+)
+from travel_ai_backend.app.utils.query_count import invalidate_counts
 
 
 class CRUDRole(CRUDBase[Role, IRoleCreate, IRoleUpdate]):
@@ -24,6 +30,29 @@ class CRUDRole(CRUDBase[Role, IRoleCreate, IRoleUpdate]):
         db_session.add(role)
         await db_session.commit()
         await db_session.refresh(role)
+        await invalidate_principal(user.id)
+        await invalidate_counts([User.__table__.name])
+        return role
+
+    async def update(
+        self,
+        *,
+        obj_current: Role,
+        obj_new: IRoleUpdate | dict[str, Any] | Role,
+        db_session: AsyncSession | None = None,
+    ) -> Role:
+        user_ids = [user.id for user in obj_current.users]
+        role = await super().update(
+            obj_current=obj_current, obj_new=obj_new, db_session=db_session
+        )
+        await invalidate_principals(user_ids)
+        return role
+
+    async def remove(
+        self, *, id: UUID | str, db_session: AsyncSession | None = None
+    ) -> Role:
+        role = await super().remove(id=id, db_session=db_session)
+        await invalidate_principals([user.id for user in role.users])
         return role
 
 
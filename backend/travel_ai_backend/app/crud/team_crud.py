@@ -1,4 +1,4 @@
-from sqlmodel import select
+from sqlmodel import col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from travel_ai_backend.app.crud.base_crud import CRUDBase
@@ -14,5 +14,30 @@ class CRUDTeam(CRUDBase[Team, ITeamCreate, ITeamUpdate]):
         team = await db_session.execute(select(Team).where(Team.name == name))
         return team.scalar_one_or_none()
 
+    async def get_teams_by_name(
+        self,
+        *,
+        name: str,
+        limit: int | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> list[Team]:
+        db_session = db_session or super().get_db().session
+        teams = await db_session.execute(
+            select(Team)
+            .where(col(Team.name).ilike(f"%{name}%"))
+            .order_by(Team.name, Team.id)
+            .limit(limit)
+        )
+        return teams.scalars().all()
+
+    async def get_existing_names(
+        self, *, names: list[str], db_session: AsyncSession | None = None
+    ) -> list[str]:
+        db_session = db_session or super().get_db().session
+        response = await db_session.execute(
+            select(Team.name).where(Team.name.in_(names))
+        )
+        return response.scalars().all()
+
 
 team = CRUDTeam(Team)
@@ -1,23 +1,46 @@
+import asyncio
+from collections.abc import Sequence
 from typing import Any
 from uuid import UUID
 
 from pydantic.networks import EmailStr
-from sqlmodel import select
+from sqlalchemy import delete, false, true, union_all, update
+from sqlmodel import func, or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.core.security import (
-    get_password_hash,
-    verify_password,
-)
-from travel_ai_backend.app.crud.base_crud import CRUDBase
-from travel_ai_backend.app.crud.user_follow_crud import (
-    user_follow as UserFollowCRUD,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
 )
+from travel_ai_backend.app.crud.base_crud import CRUDBase, chunked
+from travel_ai_backend.app.db.session import RedisClient
 from travel_ai_backend.app.models.image_media_model import ImageMedia
 from travel_ai_backend.app.models.media_model import Media
+from travel_ai_backend.app.models.role_model import Role
+from travel_ai_backend.app.models.user_follow_model import UserFollow
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.media_schema import IMediaCreate
-from travel_ai_backend.app.schemas.user_schema import IUserCreate, IUserUpdate
+from travel_ai_backend.app.schemas.user_follow_schema import (
+    IFollowDirectionEnum,
+)
+from travel_ai_backend.app.schemas.user_schema import (
+    IUserCreate,
+    IUserPrincipal,
+    IUserUpdate,
+)
+from travel_ai_backend.app.utils.follow_graph_cache import forget_user
+from travel_ai_backend.app.utils.principal_cache import (
+    invalidate_principal,
+    invalidate_principals,
+)
+from travel_ai_backend.app.utils.query_count import invalidate_counts
+from travel_ai_backend.app.utils.user_search import (
+    name_matches,
+    name_prefix_matches,
+    name_score,
+)
 
 
 class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
@@ -30,6 +53,112 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
         )
         return users.scalar_one_or_none()
 
+    async def get_existing_emails(
+        self, *, emails: list[str], db_session: AsyncSession | None = None
+    ) -> list[str]:
+        db_session = db_session or super().get_db().session
+        response = await db_session.execute(
+            select(User.email).where(User.email.in_(emails))
+        )
+        return response.scalars().all()
+
+    async def get_follow_counts(
+        self,
+        *,
+        user_ids: Sequence[UUID],
+        db_session: AsyncSession | None = None,
+    ) -> dict[tuple[UUID, IFollowDirectionEnum], int]:
+        db_session = db_session or super().get_db().session
+        response = await db_session.execute(
+            select(User.id, User.following_count, User.follower_count).where(
+                User.id.in_(user_ids)
+            )
+        )
+        counts = {}
+        for user_id, following_count, follower_count in response.all():
+            counts[(user_id, IFollowDirectionEnum.following)] = (
+                following_count or 0
+            )
+            counts[(user_id, IFollowDirectionEnum.followers)] = (
+                follower_count or 0
+            )
+        return counts
+
+    async def get_graph_users(
+        self,
+        *,
+        user_ids: Sequence[UUID],
+        db_session: AsyncSession | None = None,
+    ) -> list[dict[str, Any]]:
+        """Follow graph columns of the users in the order of the ids"""
+        if not user_ids:
+            return []
+        db_session = db_session or super().get_db().session
+        response = await db_session.execute(
+            select(
+                User.id,
+                User.first_name,
+                User.last_name,
+                User.follower_count,
+                User.following_count,
+            ).where(User.id.in_(user_ids))
+        )
+        users = {row.id: row._asdict() for row in response.all()}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+    async def _set_similarity_threshold(
+        self, db_session: AsyncSession
+    ) -> None:
+        # Local to the transaction, pooled connections keep the default
+        await db_session.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.similarity_threshold",
+                    str(settings.USER_SEARCH_SIMILARITY_THRESHOLD),
+                    True,
+                )
+            )
+        )
+
+    async def search_by_name(
+        self,
+        *,
+        name: str,
+        limit: int,
+        offset: int = 0,
+        db_session: AsyncSession | None = None,
+    ) -> list[dict[str, Any]]:
+        """Active users with a name similar to the query, best match first"""
+        db_session = db_session or super().get_db().session
+        await self._set_similarity_threshold(db_session)
+        score = name_score(name).label("score")
+        response = await db_session.execute(
+            select(User.id, User.first_name, User.last_name, score)
+            .where(name_matches(name), User.is_active.is_(True))
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return [row._asdict() for row in response.all()]
+
+    async def autocomplete_by_name(
+        self,
+        *,
+        prefix: str,
+        limit: int,
+        db_session: AsyncSession | None = None,
+    ) -> list[dict[str, Any]]:
+        """Active users with a name word starting with the prefix"""
+        db_session = db_session or super().get_db().session
+        score = name_score(prefix).label("score")
+        response = await db_session.execute(
+            select(User.id, User.first_name, User.last_name, score)
+            .where(name_prefix_matches(prefix), User.is_active.is_(True))
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+        )
+        return [row._asdict() for row in response.all()]
+
     async def get_by_id_active(self, *, id: UUID) -> User | None:
         user = await super().get(id=id)
         if not user:
@@ -39,21 +168,83 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
 
         return user
 
+    async def get_principal(
+        self, *, id: UUID | str, db_session: AsyncSession | None = None
+    ) -> IUserPrincipal | None:
+        db_session = db_session or super().get_db().session
+        response = await db_session.execute(
+            select(User.id, User.is_active, Role.name)
+            .outerjoin(Role, User.role_id == Role.id)
+            .where(User.id == id)
+        )
+        row = response.one_or_none()
+        if row is None:
+            return None
+        return IUserPrincipal(
+            id=row.id, is_active=row.is_active, role_name=row.name
+        )
+
     async def create_with_role(
         self, *, obj_in: IUserCreate, db_session: AsyncSession | None = None
     ) -> User:
         db_session = db_session or super().get_db().session
         db_obj = User.model_validate(obj_in)
-        db_obj.hashed_password = get_password_hash(obj_in.password)
+        db_obj.hashed_password = await get_password_hash_async(
+            obj_in.password
+        )
         db_session.add(db_obj)
         await db_session.commit()
+        await invalidate_counts([User.__table__.name])
         await db_session.refresh(db_obj)
         return db_obj
 
+    async def create_many_with_role(
+        self,
+        *,
+        objs_in: Sequence[IUserCreate],
+        db_session: AsyncSession | None = None,
+    ) -> list[User]:
+        db_objs = []
+        # Never more hashes in flight than password hash workers
+        for chunk in chunked(objs_in, settings.PASSWORD_HASH_WORKERS):
+            hashed_passwords = await asyncio.gather(
+                *(get_password_hash_async(obj_in.password) for obj_in in chunk)
+            )
+            for obj_in, hashed_password in zip(chunk, hashed_passwords):
+                db_obj = User.model_validate(obj_in)
+                db_obj.hashed_password = hashed_password
+                db_objs.append(db_obj)
+        return await self.create_many(objs_in=db_objs, db_session=db_session)
+
+    async def update_many(
+        self,
+        *,
+        objs_new: Sequence[dict[str, Any]],
+        db_session: AsyncSession | None = None,
+    ) -> list[User]:
+        objs_updated = await super().update_many(
+            objs_new=objs_new, db_session=db_session
+        )
+        await invalidate_principals([obj.id for obj in objs_updated])
+        return objs_updated
+
+    async def update(
+        self,
+        *,
+        obj_current: User,
+        obj_new: IUserUpdate | dict[str, Any] | User,
+        db_session: AsyncSession | None = None,
+    ) -> User:
+        obj_updated = await super().update(
+            obj_current=obj_current, obj_new=obj_new, db_session=db_session
+        )
+        await invalidate_principal(obj_updated.id)
+        return obj_updated
+
     async def update_is_active(
         self, *, db_obj: list[User], obj_in: int | str | dict[str, Any]
     ) -> User | None:
-        response = None
+        response = []
         db_session = super().get_db().session
         for x in db_obj:
             x.is_active = obj_in.is_active
@@ -61,6 +252,8 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
             await db_session.commit()
             await db_session.refresh(x)
             response.append(x)
+        await invalidate_principals([x.id for x in response])
+        await invalidate_counts([User.__table__.name])
         return response
 
     async def authenticate(
@@ -69,8 +262,15 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
         user = await self.get_by_email(email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
+        if password_needs_rehash(user.hashed_password):
+            user = await self.update(
+                obj_current=user,
+                obj_new={
+                    "hashed_password": await get_password_hash_async(password)
+                },
+            )
         return user
 
     async def update_photo(
@@ -91,38 +291,109 @@ class CRUDUser(CRUDBase[User, IUserCreate, IUserUpdate]):
         )
         db_session.add(user)
         await db_session.commit()
+        await invalidate_counts(
+            [
+                User.__table__.name,
+                ImageMedia.__table__.name,
+                Media.__table__.name,
+            ]
+        )
         await db_session.refresh(user)
         return user
 
+    async def _remove_follows(
+        self, *, id: UUID | str, limit: int | None, db_session: AsyncSession
+    ) -> int:
+        """
+        Deletes the follows of a user in both directions and decrements the
+        counters of the other users with a single UPDATE ... FROM, as a row
+        updated twice by one statement keeps only one of the changes.
+        Returns the number of deleted follows.
+        """
+        follow_ids = select(UserFollow.id).where(
+            or_(UserFollow.user_id == id, UserFollow.target_user_id == id)
+        )
+        if limit is not None:
+            follow_ids = follow_ids.limit(limit)
+        deleted = (
+            delete(UserFollow)
+            .where(UserFollow.id.in_(follow_ids))
+            .returning(UserFollow.user_id, UserFollow.target_user_id)
+            .cte("deleted")
+        )
+        # A mutual follower appears once in each direction
+        changes = union_all(
+            select(
+                deleted.c.target_user_id.label("id"),
+                true().label("followed"),
+            ).where(deleted.c.user_id == id),
+            select(
+                deleted.c.user_id.label("id"),
+                false().label("followed"),
+            ).where(deleted.c.target_user_id == id),
+        ).subquery("changes")
+        deltas = (
+            select(
+                changes.c.id,
+                func.count().filter(changes.c.followed).label("followers"),
+                func.count().filter(~changes.c.followed).label("following"),
+            )
+            .group_by(changes.c.id)
+            .subquery("deltas")
+        )
+        statement = (
+            select(func.count())
+            .select_from(deleted)
+            .add_cte(
+                update(User)
+                .where(User.id == deltas.c.id)
+                .values(
+                    follower_count=func.coalesce(User.follower_count, 0)
+                    - deltas.c.followers,
+                    following_count=func.coalesce(User.following_count, 0)
+                    - deltas.c.following,
+                )
+                .cte("update_counts"),
+            )
+        )
+        response = await db_session.execute(statement)
+        return response.scalar_one()
+
     async def remove(
-        self, *, id: UUID | str, db_session: AsyncSession | None = None
+        self,
+        *,
+        id: UUID | str,
+        batch_size: int | None = None,
+        db_session: AsyncSession | None = None,
     ) -> User:
+        """
+        Removes the user with its follows in a single transaction. With a
+        batch_size the follows are removed and committed in batches, which
+        keeps the locks short for very large accounts.
+        """
         db_session = db_session or super().get_db().session
         response = await db_session.execute(
             select(self.model).where(self.model.id == id)
         )
         obj = response.scalar_one()
 
-        followings = await UserFollowCRUD.get_follow_by_user_id(user_id=obj.id)
-        if followings:
-            for following in followings:
-                user = await self.get(id=following.target_user_id)
-                user.follower_count -= 1
-                db_session.add(user)
-                await db_session.delete(following)
-
-        followeds = await UserFollowCRUD.get_follow_by_target_user_id(
-            target_user_id=obj.id
-        )
-        if followeds:
-            for followed in followeds:
-                user = await self.get(id=followed.user_id)
-                user.following_count -= 1
-                db_session.add(user)
-                await db_session.delete(followed)
+        if batch_size is None:
+            await self._remove_follows(
+                id=obj.id, limit=None, db_session=db_session
+            )
+        else:
+            while await self._remove_follows(
+                id=obj.id, limit=batch_size, db_session=db_session
+            ):
+                await db_session.commit()
 
         await db_session.delete(obj)
         await db_session.commit()
+        await invalidate_principal(obj.id)
+        await forget_user(RedisClient.get_instance(), obj.id)
+        await invalidate_counts(
+            [User.__table__.name, UserFollow.__table__.name]
+        )
         return obj
 
 
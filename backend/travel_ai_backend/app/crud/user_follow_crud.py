@@ -1,80 +1,190 @@
+from datetime import datetime
 from uuid import UUID
 
-from sqlmodel import and_, select
+from sqlalchemy import CTE, delete, exists, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlmodel import and_, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from travel_ai_backend.app.crud.base_crud import CRUDBase
+from travel_ai_backend.app.db.session import RedisClient
 from travel_ai_backend.app.models.user_follow_model import (
     UserFollow as UserFollowModel,
 )
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.user_follow_schema import (
+    IFollowDirectionEnum,
     IUserFollowCreate,
     IUserFollowUpdate,
 )
+from travel_ai_backend.app.utils.follow_counter import (
+    buffer_follower_count,
+    is_buffered,
+)
+from travel_ai_backend.app.utils.follow_graph_cache import (
+    add_follow_edge,
+    remove_follow_edge,
+)
+from travel_ai_backend.app.utils.query_count import invalidate_counts
 
 
 class CRUDUserFollow(
     CRUDBase[UserFollowModel, IUserFollowCreate, IUserFollowUpdate]
 ):
+    def _update_counters(
+        self, follows: CTE, delta: int, target_user: User
+    ) -> list[CTE]:
+        """
+        Counter updates for the follows changed by the statement, so they
+        are applied at most once even under concurrent requests
+        """
+        following = (
+            update(User)
+            .where(User.id.in_(select(follows.c.user_id)))
+            .values(
+                following_count=func.coalesce(User.following_count, 0) + delta
+            )
+            .cte("following")
+        )
+        if is_buffered(target_user):
+            return [following]
+        follower = (
+            update(User)
+            .where(User.id.in_(select(follows.c.target_user_id)))
+            .values(
+                follower_count=func.coalesce(User.follower_count, 0) + delta
+            )
+            .cte("follower")
+        )
+        return [following, follower]
+
+    def _update_reverse_follow(self, follows: CTE, is_mutual: bool) -> CTE:
+        return (
+            update(UserFollowModel)
+            .where(
+                UserFollowModel.user_id.in_(select(follows.c.target_user_id)),
+                UserFollowModel.target_user_id.in_(select(follows.c.user_id)),
+            )
+            .values(is_mutual=is_mutual)
+            .cte("reverse_follow")
+        )
+
+    async def _execute_follow_statement(
+        self,
+        follows: CTE,
+        delta: int,
+        target_user: User,
+        is_mutual: bool,
+        db_session: AsyncSession,
+    ) -> UserFollowModel | None:
+        statement = select(aliased(UserFollowModel, follows)).add_cte(
+            self._update_reverse_follow(follows, is_mutual),
+            *self._update_counters(follows, delta, target_user),
+        )
+        response = await db_session.execute(statement)
+        db_obj = response.scalar_one_or_none()
+        # The returned row stays usable after the commit expires the session
+        if db_obj is not None:
+            db_session.expunge(db_obj)
+        await db_session.commit()
+        if db_obj is not None:
+            redis_client = RedisClient.get_instance()
+            if is_buffered(target_user):
+                await buffer_follower_count(
+                    redis_client, target_user.id, delta
+                )
+            if delta > 0:
+                await add_follow_edge(
+                    redis_client,
+                    db_obj.user_id,
+                    db_obj.target_user_id,
+                    db_obj.created_at,
+                )
+            else:
+                await remove_follow_edge(
+                    redis_client, db_obj.user_id, db_obj.target_user_id
+                )
+            await invalidate_counts(
+                [UserFollowModel.__table__.name, User.__table__.name]
+            )
+        return db_obj
+
     async def follow_a_user_by_target_user_id(
         self,
         *,
         user: User,
         target_user: User,
         db_session: AsyncSession | None = None,
-    ) -> UserFollowModel:
+    ) -> UserFollowModel | None:
+        """
+        Inserts the follow, flags a reverse follow as mutual and increments
+        both counters in a single statement. Returns None when the user
+        already follows the target user.
+        """
         db_session = db_session or super().get_db().session
         new_user_follow = IUserFollowCreate(
             user_id=user.id, target_user_id=target_user.id
         )
         db_obj = UserFollowModel.model_validate(new_user_follow)
-
-        reverse_follow = await self.get_follow_by_user_id_and_target_user_id(
-            user_id=target_user.id, target_user_id=user.id
+        reverse_follow_exists = (
+            select(UserFollowModel.id)
+            .where(
+                UserFollowModel.user_id == target_user.id,
+                UserFollowModel.target_user_id == user.id,
+            )
+            .exists()
+        )
+        # A concurrent or repeated follow inserts nothing and returns None
+        inserted = (
+            pg_insert(UserFollowModel)
+            .values(
+                id=db_obj.id,
+                user_id=db_obj.user_id,
+                target_user_id=db_obj.target_user_id,
+                is_mutual=reverse_follow_exists,
+                created_at=db_obj.created_at,
+                updated_at=db_obj.updated_at,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["user_id", "target_user_id"]
+            )
+            .returning(*UserFollowModel.__table__.c)
+            .cte("inserted")
+        )
+        return await self._execute_follow_statement(
+            inserted, 1, target_user, True, db_session
         )
-        if reverse_follow:
-            db_obj.is_mutual = True
-            reverse_follow.is_mutual = True
-            db_session.add(reverse_follow)
-        db_session.add(db_obj)
-
-        user.following_count += 1
-        target_user.follower_count += 1
-
-        db_session.add(user)
-        db_session.add(target_user)
-        await db_session.commit()
-        await db_session.refresh(db_obj)
-        return db_obj
 
     async def unfollow_a_user_by_id(
         self,
         *,
-        user_follow_id: UUID,
         user: User,
         target_user: User,
+        user_follow_id: UUID | None = None,
         db_session: AsyncSession | None = None,
-    ) -> UserFollowModel:
+    ) -> UserFollowModel | None:
+        """
+        Deletes the follow, clears the mutual flag of a reverse follow and
+        decrements both counters in a single statement. Returns None when
+        the user does not follow the target user.
+        """
         db_session = db_session or super().get_db().session
-
-        follow_user_obj = await self.get(id=user_follow_id)
-        await db_session.delete(follow_user_obj)
-
-        reverse_follow = await self.get_follow_by_user_id_and_target_user_id(
-            user_id=target_user.id, target_user_id=user.id
+        conditions = [
+            UserFollowModel.user_id == user.id,
+            UserFollowModel.target_user_id == target_user.id,
+        ]
+        if user_follow_id is not None:
+            conditions.append(UserFollowModel.id == user_follow_id)
+        deleted = (
+            delete(UserFollowModel)
+            .where(*conditions)
+            .returning(*UserFollowModel.__table__.c)
+            .cte("deleted")
+        )
+        return await self._execute_follow_statement(
+            deleted, -1, target_user, False, db_session
         )
-        if reverse_follow:
-            reverse_follow.is_mutual = False
-            db_session.add(reverse_follow)
-
-        user.following_count -= 1
-        target_user.follower_count -= 1
-
-        db_session.add(user)
-        db_session.add(target_user)
-        await db_session.commit()
-        return follow_user_obj
 
     async def get_follow_by_user_id(
         self, *, user_id: UUID, db_session: AsyncSession | None = None
@@ -114,5 +224,126 @@ class CRUDUserFollow(
         )
         return followed_user.scalar_one_or_none()
 
+    async def get_adjacency(
+        self,
+        *,
+        user_id: UUID,
+        direction: IFollowDirectionEnum,
+        db_session: AsyncSession | None = None,
+    ) -> list[tuple[UUID, datetime]]:
+        """Neighbour ids of a user with the time of the follow"""
+        db_session = db_session or super().get_db().session
+        if direction == IFollowDirectionEnum.following:
+            neighbour, owner = (
+                UserFollowModel.target_user_id,
+                UserFollowModel.user_id,
+            )
+        else:
+            neighbour, owner = (
+                UserFollowModel.user_id,
+                UserFollowModel.target_user_id,
+            )
+        response = await db_session.execute(
+            select(neighbour, UserFollowModel.created_at).where(
+                owner == user_id
+            )
+        )
+        return response.all()
+
+    async def get_common_following_ids(
+        self,
+        *,
+        user_id: UUID,
+        other_user_id: UUID,
+        limit: int,
+        db_session: AsyncSession | None = None,
+    ) -> list[UUID]:
+        """Users followed by both users, most recently followed first"""
+        db_session = db_session or super().get_db().session
+        other_follow = aliased(UserFollowModel)
+        response = await db_session.execute(
+            select(UserFollowModel.target_user_id)
+            .join(
+                other_follow,
+                and_(
+                    other_follow.target_user_id
+                    == UserFollowModel.target_user_id,
+                    other_follow.user_id == other_user_id,
+                ),
+            )
+            .where(UserFollowModel.user_id == user_id)
+            .order_by(UserFollowModel.id.desc())
+            .limit(limit)
+        )
+        return response.scalars().all()
+
+    async def get_known_follower_ids(
+        self,
+        *,
+        user_id: UUID,
+        target_user_id: UUID,
+        limit: int,
+        db_session: AsyncSession | None = None,
+    ) -> list[UUID]:
+        """Users followed by user_id who follow target_user_id"""
+        db_session = db_session or super().get_db().session
+        target_follow = aliased(UserFollowModel)
+        response = await db_session.execute(
+            select(UserFollowModel.target_user_id)
+            .join(
+                target_follow,
+                and_(
+                    target_follow.user_id == UserFollowModel.target_user_id,
+                    target_follow.target_user_id == target_user_id,
+                ),
+            )
+            .where(UserFollowModel.user_id == user_id)
+            .order_by(UserFollowModel.id.desc())
+            .limit(limit)
+        )
+        return response.scalars().all()
+
+    async def get_suggestions(
+        self,
+        *,
+        user_id: UUID,
+        limit: int,
+        fanout: int,
+        db_session: AsyncSession | None = None,
+    ) -> list[tuple[UUID, int]]:
+        """
+        Users followed by the users that user_id follows, ranked by how
+        many of them follow each one. Only the fanout most recent follows
+        of user_id are expanded, which bounds the cost for large accounts.
+        """
+        db_session = db_session or super().get_db().session
+        following = (
+            select(UserFollowModel.target_user_id)
+            .where(UserFollowModel.user_id == user_id)
+            .order_by(UserFollowModel.id.desc())
+            .limit(fanout)
+            .subquery("following")
+        )
+        second_follow = aliased(UserFollowModel)
+        own_follow = aliased(UserFollowModel)
+        score = func.count().label("score")
+        response = await db_session.execute(
+            select(second_follow.target_user_id, score)
+            .join(
+                following, second_follow.user_id == following.c.target_user_id
+            )
+            .where(
+                second_follow.target_user_id != user_id,
+                ~exists().where(
+                    own_follow.user_id == user_id,
+                    own_follow.target_user_id == second_follow.target_user_id,
+                ),
+            )
+            .group_by(second_follow.target_user_id)
+            .order_by(score.desc(), second_follow.target_user_id)
+            .limit(limit)
+        )
+        return response.all()
+
 
 user_follow = CRUDUserFollow(UserFollowModel)
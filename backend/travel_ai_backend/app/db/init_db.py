@@ -77,37 +77,44 @@ heroes: list[dict[str, str | IHeroCreate]] = [
 
 
 async def init_db(db_session: AsyncSession) -> None:
-    for cur_role in roles:
-        role_current = await role.get_role_by_name(
-            name=cur_role.name, db_session=db_session
-        )
-        if not role_current:
-            await role.create(obj_in=cur_role, db_session=db_session)
+    # Missing rows of each table are created with a single bulk insert
+    existing_roles = {
+        cur_role.name: cur_role
+        for cur_role in await role.get_multi(db_session=db_session)
+    }
+    new_roles = await role.create_many(
+        objs_in=[
+            cur_role
+            for cur_role in roles
+            if cur_role.name not in existing_roles
+        ],
+        db_session=db_session,
+    )
+    existing_roles.update({cur_role.name: cur_role for cur_role in new_roles})
 
+    existing_emails = await user.get_existing_emails(
+        emails=[cur_user["data"].email for cur_user in users],
+        db_session=db_session,
+    )
+    new_users = []
     for cur_user in users:
-        current_user = await user.get_by_email(
-            email=cur_user["data"].email, db_session=db_session
-        )
-        cur_role = await role.get_role_by_name(
-            name=cur_user["role"], db_session=db_session
-        )
-        if not current_user:
-            cur_user["data"].role_id = cur_role.id
-            await user.create_with_role(
-                obj_in=cur_user["data"], db_session=db_session
-            )
+        if cur_user["data"].email not in existing_emails:
+            cur_user["data"].role_id = existing_roles[cur_user["role"]].id
+            new_users.append(cur_user["data"])
+    await user.create_many_with_role(objs_in=new_users, db_session=db_session)
+
+    admin_user = await user.get_by_email(
+        email=users[0]["data"].email, db_session=db_session
+    )
 
     for cur_group in groups:
         current_group = await group.get_group_by_name(
             name=cur_group.name, db_session=db_session
         )
         if not current_group:
-            current_user = await user.get_by_email(
-                email=users[0]["data"].email, db_session=db_session
-            )
             new_group = await group.create(
                 obj_in=cur_group,
-                created_by_id=current_user.id,
+                created_by_id=admin_user.id,
                 db_session=db_session,
             )
             current_users = []
@@ -123,35 +130,33 @@ async def init_db(db_session: AsyncSession) -> None:
                 db_session=db_session,
             )
 
-    for cur_team in teams:
-        current_team = await team.get_team_by_name(
-            name=cur_team.name, db_session=db_session
-        )
-        if not current_team:
-            current_user = await user.get_by_email(
-                email=users[0]["data"].email, db_session=db_session
-            )
-            await team.create(
-                obj_in=cur_team,
-                created_by_id=current_user.id,
-                db_session=db_session,
-            )
+    existing_teams = await team.get_existing_names(
+        names=[cur_team.name for cur_team in teams], db_session=db_session
+    )
+    await team.create_many(
+        objs_in=[
+            cur_team
+            for cur_team in teams
+            if cur_team.name not in existing_teams
+        ],
+        created_by_id=admin_user.id,
+        db_session=db_session,
+    )
 
+    new_heroes = []
     for heroe in heroes:
         current_heroe = await hero.get_heroe_by_name(
             name=heroe["data"].name, db_session=db_session
         )
-        cur_team = await team.get_team_by_name(
-            name=heroe["team"], db_session=db_session
-        )
         if not current_heroe:
-            current_user = await user.get_by_email(
-                email=users[0]["data"].email, db_session=db_session
+            cur_team = await team.get_team_by_name(
+                name=heroe["team"], db_session=db_session
             )
             new_heroe = heroe["data"]
             new_heroe.team_id = cur_team.id
-            await hero.create(
-                obj_in=new_heroe,
-                created_by_id=current_user.id,
-                db_session=db_session,
-            )
+            new_heroes.append(new_heroe)
+    await hero.create_many(
+        objs_in=new_heroes,
+        created_by_id=admin_user.id,
+        db_session=db_session,
+    )
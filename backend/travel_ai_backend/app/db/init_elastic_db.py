@@ -1,7 +1,130 @@
 from elasticsearch.exceptions import RequestError
 
 from travel_ai_backend.app.api.deps import get_elasticsearch_client
+from travel_ai_backend.app.core.celery import celery
 from travel_ai_backend.app.core.config import ModeEnum, settings
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
+from travel_ai_backend.app.utils.search_index import (
+    SEARCH_FIELDS,
+    search_index_name,
+)
+
+SEARCH_ANALYSIS = {
+    "filter": {
+        "name_edge_ngram": {
+            "type": "edge_ngram",
+            "min_gram": 1,
+            "max_gram": 20,
+        },
+    },
+    "analyzer": {
+        # Unicode word boundaries, case and accent insensitive
+        "name": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["lowercase", "asciifolding"],
+        },
+        "name_prefix": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["lowercase", "asciifolding", "name_edge_ngram"],
+        },
+    },
+}
+# Fuzzy queries run on the field, prefix queries on .prefix and stemmed
+# queries on the language subfields
+SEARCH_TEXT_FIELD = {
+    "type": "text",
+    "analyzer": "name",
+    "fields": {
+        "prefix": {
+            "type": "text",
+            "analyzer": "name_prefix",
+            "search_analyzer": "name",
+        },
+        "english": {"type": "text", "analyzer": "english"},
+        "russian": {"type": "text", "analyzer": "russian"},
+        "keyword": {"type": "keyword", "ignore_above": 256},
+    },
+}
+SEARCH_PROPERTIES = {
+    SearchEntityEnum.heroes: {
+        "age": {"type": "integer"},
+        "team_id": {"type": "keyword"},
+        "team_name": {"type": "text", "analyzer": "name"},
+        "created_at": {"type": "date"},
+    },
+    SearchEntityEnum.teams: {
+        "created_at": {"type": "date"},
+    },
+    SearchEntityEnum.users: {
+        "email": {"type": "keyword"},
+        "is_active": {"type": "boolean"},
+        "role_id": {"type": "keyword"},
+        "created_at": {"type": "date"},
+    },
+}
+
+
+def search_index_body(entity: SearchEntityEnum) -> dict:
+    return {
+        "settings": {"analysis": SEARCH_ANALYSIS},
+        "mappings": {
+            "dynamic": "strict",
+            "properties": {
+                **{
+                    field: SEARCH_TEXT_FIELD
+                    for field in SEARCH_FIELDS[entity]
+                },
+                **SEARCH_PROPERTIES[entity],
+            },
+        },
+    }
+
+
+async def create_search_indexes():
+    es = await get_elasticsearch_client()
+    for entity in SearchEntityEnum:
+        index = search_index_name(entity)
+        if await es.indices.exists(index=index):
+            continue
+        try:
+            await es.indices.create(
+                index=index, body=search_index_body(entity)
+            )
+        except RequestError as e:
+            print(f"Ошибка создания индексов: {e}")
+            continue
+        # Rows stored before the index existed are loaded in the background
+        if settings.MODE != ModeEnum.testing:
+            celery.send_task("tasks.reindex_search", args=[entity.value])
+
+
+def vector_index_body() -> dict:
+    index_options = {
+        "type": (
+            "int8_hnsw" if settings.ELASTIC_VECTOR_QUANTIZED else "hnsw"
+        ),
+        "m": settings.ELASTIC_VECTOR_HNSW_M,
+        "ef_construction": settings.ELASTIC_VECTOR_HNSW_EF_CONSTRUCTION,
+    }
+    return {
+        "mappings": {
+            "properties": {
+                "text": {"type": "text"},
+                # Every value is indexed as a keyword for kNN filters
+                "metadata": {"type": "flattened"},
+                "updated_at": {"type": "date"},
+                "vector": {
+                    "type": "dense_vector",
+                    "dims": settings.ELASTIC_VECTOR_DIMS,
+                    "index": True,
+                    "similarity": settings.ELASTIC_VECTOR_SIMILARITY.value,
+                    "index_options": index_options,
+                },
+            }
+        }
+    }
 
 
 async def create_indexes():
@@ -12,17 +135,8 @@ async def create_indexes():
         try:
             await es.indices.create(
                 index=settings.ELASTIC_VECTOR_INDEX,
-                body={
-                    "mappings": {
-                        "properties": {
-                            "text": {"type": "text"},
-                            "vector": {
-                                "type": "dense_vector",
-                                "dims": settings.ELASTIC_VECTOR_DIMS,
-                            },
-                        }
-                    }
-                },
+                body=vector_index_body(),
             )
         except RequestError as e:
             print(f"Ошибка создания индексов: {e}")
+    await create_search_indexes()
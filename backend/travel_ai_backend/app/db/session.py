@@ -1,32 +1,84 @@
 # https://stackoverflow.com/questions/75252097/fastapi-testing-runtimeerror-task-attached-to-a-different-loop/75444607#75444607
-from typing import List
+import time
+from typing import Any, List
 
+import redis.asyncio as aioredis
 from elasticsearch import AsyncElasticsearch
 from elasticsearch.exceptions import RequestError
+from prometheus_client import Gauge, Histogram
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from travel_ai_backend.app.core.config import ModeEnum, settings
 
-DB_POOL_SIZE = 83
-WEB_CONCURRENCY = 9
-POOL_SIZE = max(DB_POOL_SIZE // WEB_CONCURRENCY, 5)
-
 connect_args = {"check_same_thread": False}
 
+db_pool_wait_time = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait_time.observe(time.perf_counter() - start_time)
+
+
+def get_engine_args() -> dict[str, Any]:
+    if settings.MODE == ModeEnum.testing:
+        # Asincio pytest works with NullPool
+        return {"echo": False, "poolclass": NullPool}
+    return {
+        "echo": False,
+        "poolclass": InstrumentedAsyncAdaptedQueuePool,
+        "pool_size": settings.POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# Single engine of the worker process, shared by SQLAlchemyMiddleware and
+# SessionLocal
 engine = create_async_engine(
-    str(settings.ASYNC_DATABASE_URI),
-    echo=False,
-    poolclass=(
-        NullPool
-        if settings.MODE == ModeEnum.testing
-        else AsyncAdaptedQueuePool
-    ),  # Asincio pytest works with NullPool
-    # pool_size=POOL_SIZE,
-    # max_overflow=64,
+    str(settings.ASYNC_DATABASE_URI), **get_engine_args()
+)
+
+
+def _pool_value(name: str) -> int:
+    value = getattr(engine.sync_engine.pool, name, None)
+    return value() if callable(value) else 0
+
+
+db_pool_size = Gauge("db_pool_size", "Size of the SQLAlchemy pool")
+db_pool_size.set_function(lambda: _pool_value("size"))
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections checked out of the SQLAlchemy pool"
+)
+db_pool_checked_out.set_function(lambda: _pool_value("checkedout"))
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Overflow connections opened by the SQLAlchemy pool"
 )
+db_pool_overflow.set_function(lambda: max(_pool_value("overflow"), 0))
+
+
+class AppSession(Session):
+    """
+    Sync session of SessionLocal and SQLAlchemyMiddleware, the search index
+    listeners are registered on it so migrations and scripts do not record
+    changes
+    """
+
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -34,6 +86,7 @@ SessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
+    sync_session_class=AppSession,
 )
 
 engine_celery = create_async_engine(
@@ -71,3 +124,94 @@ class ElasticSearchSession:
 SessionLocalElasticSearch = ElasticSearchSession(
     hosts=[settings.ELASTIC_SEARCH_DATABASE_URI]
 )
+
+
+class InstrumentedBlockingConnectionPool(aioredis.BlockingConnectionPool):
+    """
+    Counts opened and checked out connections through the public pool
+    methods, the internal attributes change between redis-py versions
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.created_connections = 0
+        # The pool also releases connections that failed to connect
+        self.checked_out: set[int] = set()
+
+    def make_connection(self) -> Any:
+        connection = super().make_connection()
+        self.created_connections += 1
+        return connection
+
+    async def get_connection(self, *args: Any, **kwargs: Any) -> Any:
+        connection = await super().get_connection(*args, **kwargs)
+        self.checked_out.add(id(connection))
+        return connection
+
+    async def release(self, connection: Any) -> None:
+        self.checked_out.discard(id(connection))
+        await super().release(connection)
+
+
+class RedisClient:
+    """
+    Process-wide Redis client backed by a single bounded connection pool.
+    The pool is created lazily (after gunicorn forks the workers) and must
+    be closed on shutdown with `close_instance`.
+    """
+
+    _pool: InstrumentedBlockingConnectionPool | None = None
+    _instance: Redis | None = None
+
+    @classmethod
+    def get_instance(cls) -> Redis:
+        if cls._instance is None:
+            cls._pool = InstrumentedBlockingConnectionPool.from_url(
+                f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+                max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+                encoding="utf8",
+                decode_responses=True,
+            )
+            cls._instance = Redis(connection_pool=cls._pool)
+        return cls._instance
+
+    @classmethod
+    async def close_instance(cls) -> None:
+        if cls._instance is None:
+            return
+        await cls._instance.close()
+        await cls._pool.disconnect()
+        cls._instance = None
+        cls._pool = None
+
+    @classmethod
+    def pool_stats(cls) -> tuple[int, int]:
+        """
+        Returns the number of opened connections and the number of
+        connections currently checked out of the pool
+        """
+        if cls._pool is None:
+            return 0, 0
+        return cls._pool.created_connections, len(cls._pool.checked_out)
+
+
+redis_pool_max_connections = Gauge(
+    "redis_pool_max_connections", "Maximum size of the Redis pool"
+)
+redis_pool_max_connections.set(settings.REDIS_POOL_MAX_CONNECTIONS)
+redis_pool_connections_created = Gauge(
+    "redis_pool_connections_created", "Connections opened by the Redis pool"
+)
+redis_pool_connections_created.set_function(
+    lambda: RedisClient.pool_stats()[0]
+)
+redis_pool_connections_in_use = Gauge(
+    "redis_pool_connections_in_use", "Connections checked out of Redis pool"
+)
+redis_pool_connections_in_use.set_function(
+    lambda: RedisClient.pool_stats()[1]
+)
@@ -21,12 +21,12 @@ from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import WebSocketRateLimiter
 from jwt import DecodeError, ExpiredSignatureError, MissingRequiredClaimError
 from prometheus_client import generate_latest
-from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from starlette.middleware.cors import CORSMiddleware
 from starlette.responses import PlainTextResponse
 
 from travel_ai_backend.app.crud.user_crud import user
 from travel_ai_backend.app.api.deps import (
+    get_elasticsearch_client,
     get_redis_client,
     http_200_counter,
     http_404_counter,
@@ -36,17 +36,31 @@ from travel_ai_backend.app.api.deps import (
     request_latency,
 )
 from travel_ai_backend.app.api.v1.api import api_router as api_router_v1
-from travel_ai_backend.app.core.config import ModeEnum, settings
-from travel_ai_backend.app.core.security import decode_token
+from travel_ai_backend.app.core.config import (
+    TokenValidationModeEnum,
+    settings,
+)
+from travel_ai_backend.app.core.security import (
+    decode_token,
+    password_hash_executor,
+)
 
 # from langchain.chat_models import ChatOpenAI
 # from langchain.schema import HumanMessage
 from travel_ai_backend.app.db.init_elastic_db import create_indexes
+from travel_ai_backend.app.db.session import (
+    AppSession,
+    RedisClient,
+    engine,
+)
 from travel_ai_backend.app.schemas.common_schema import (
     IChatResponse,
     IUserMessage,
 )
 from travel_ai_backend.app.utils.fastapi_globals import GlobalsMiddleware, g
+from travel_ai_backend.app.utils.local_vector_index import local_vector_index
+from travel_ai_backend.app.utils.minio_client import MinioClient
+from travel_ai_backend.app.utils.token_revocation import revocation_listener
 from travel_ai_backend.app.utils.uuid6 import uuid7
 
 # os.environ["HTTP_PROXY"] = "http://130.100.7.222:1082"
@@ -116,9 +130,19 @@ async def user_id_identifier(request: Request):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # Drop connections inherited from the gunicorn master (--preload)
+    await engine.dispose(close=False)
     redis_client = await get_redis_client()
+    await redis_client.ping()
     FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
     await FastAPILimiter.init(redis_client, identifier=user_id_identifier)
+    if (
+        settings.TOKEN_VALIDATION_MODE == TokenValidationModeEnum.revocation
+        and settings.TOKEN_REVOCATION_BLOOM_ENABLED
+    ):
+        await revocation_listener.start(redis_client)
+    # The bucket is checked once per worker instead of on every request
+    await MinioClient.get_instance().make_bucket_async()
 
     # Load a pre-trained sentiment analysis model as a dictionary to an easy cleanup
     models: dict[str, Any] = {
@@ -133,10 +157,18 @@ async def lifespan(app: FastAPI):
 
     await create_indexes()
     print(f"Индексы ElasticSearch созданы!")
+    if settings.VECTOR_LOCAL_INDEX_ENABLED:
+        await local_vector_index.start(await get_elasticsearch_client())
     yield
     # shutdown
     await FastAPICache.clear()
     await FastAPILimiter.close()
+    await revocation_listener.stop()
+    await local_vector_index.stop()
+    await RedisClient.close_instance()
+    await engine.dispose()
+    password_hash_executor.shutdown(wait=False, cancel_futures=True)
+    MinioClient.close_instance()
     models.clear()
     g.cleanup()
     gc.collect()
@@ -153,18 +185,8 @@ app = FastAPI(
 
 app.add_middleware(
     SQLAlchemyMiddleware,
-    db_url=str(settings.ASYNC_DATABASE_URI),
-    engine_args={
-        "echo": False,
-        "poolclass": (
-            NullPool
-            if settings.MODE == ModeEnum.testing
-            else AsyncAdaptedQueuePool
-        ),
-        # "pool_pre_ping": True,
-        # "pool_size": settings.POOL_SIZE,
-        # "max_overflow": 64,
-    },
+    custom_engine=engine,
+    session_args={"sync_session_class": AppSession},
 )
 app.add_middleware(GlobalsMiddleware)
 
@@ -3,6 +3,7 @@
 # from .image_media_model import ImageMedia
 # from .media_model import Media
 # from .role_model import Role
+# from .search_change_model import SearchChange
 # from .team_model import Team
 # from .user_follow_model import UserFollow
 # from .user_model import User
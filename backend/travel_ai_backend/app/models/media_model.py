@@ -1,7 +1,8 @@
+from collections.abc import Iterable
+
 from pydantic import computed_field
 from sqlmodel import SQLModel
 
-from travel_ai_backend.app import api
 from travel_ai_backend.app.core.config import settings
 from travel_ai_backend.app.models.base_uuid_model import BaseUUIDModel
 from travel_ai_backend.app.utils.minio_client import MinioClient
@@ -19,8 +20,21 @@ class Media(BaseUUIDModel, MediaBase, table=True):
     def link(self) -> str | None:
         if self.path is None:
             return ""
-        minio: MinioClient = api.deps.minio_auth()
+        minio = MinioClient.get_instance()
         url = minio.presigned_get_object(
             bucket_name=settings.MINIO_BUCKET, object_name=self.path
         )
         return url
+
+
+def prefetch_media_links(media_items: Iterable[Media | None]) -> None:
+    """Presigns the links of a page of media before it is serialized"""
+    paths = [
+        media.path
+        for media in media_items
+        if media is not None and media.path is not None
+    ]
+    if paths:
+        MinioClient.get_instance().presigned_get_objects(
+            settings.MINIO_BUCKET, paths
+        )
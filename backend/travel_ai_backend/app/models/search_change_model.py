@@ -0,0 +1,16 @@
+from uuid import UUID
+
+from sqlmodel import Field
+
+from travel_ai_backend.app.models.base_uuid_model import SQLModel
+
+
+class SearchChange(SQLModel, table=True):
+    """
+    Row changed in a committed transaction and not yet published to the
+    search sync stream, written in the same transaction as the change
+    """
+
+    id: int | None = Field(default=None, primary_key=True)
+    entity: str = Field(nullable=False, max_length=16)
+    entity_id: UUID = Field(nullable=False)
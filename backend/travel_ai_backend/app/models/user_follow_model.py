@@ -1,6 +1,7 @@
+from datetime import datetime
 from uuid import UUID
 
-from sqlmodel import Boolean, Column, Field
+from sqlmodel import Boolean, Column, Field, ForeignKey, Index
 
 from travel_ai_backend.app.models.base_uuid_model import (
     BaseUUIDModel,
@@ -9,11 +10,45 @@ from travel_ai_backend.app.models.base_uuid_model import (
 
 
 class UserFollowBase(SQLModel):
-    user_id: UUID = Field(nullable=False)
-    target_user_id: UUID = Field(nullable=False)
+    user_id: UUID = Field(
+        nullable=False,
+        sa_column_args=[ForeignKey("User.id", ondelete="CASCADE")],
+    )
+    target_user_id: UUID = Field(
+        nullable=False,
+        sa_column_args=[ForeignKey("User.id", ondelete="CASCADE")],
+    )
 
 
 class UserFollow(BaseUUIDModel, UserFollowBase, table=True):
+    # Edge lookups in both directions are served by index-only scans
+    __table_args__ = (
+        Index(
+            "ix_UserFollow_user_id_target_user_id",
+            "user_id",
+            "target_user_id",
+            unique=True,
+        ),
+        Index(
+            "ix_UserFollow_target_user_id_user_id",
+            "target_user_id",
+            "user_id",
+            postgresql_include=["is_mutual"],
+        ),
+    )
+
     is_mutual: bool | None = Field(
         default=None, sa_column=Column(Boolean(), server_default="0")
     )
+
+
+class FollowerCountFlush(SQLModel, table=True):
+    """
+    Flush of the buffered follower counts, written in the transaction that
+    applies its deltas so a retried flush does not apply them twice
+    """
+
+    id: str = Field(primary_key=True, nullable=False, max_length=32)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow, nullable=False
+    )
@@ -3,12 +3,14 @@ from typing import Optional
 from uuid import UUID
 
 from pydantic import EmailStr
+from sqlalchemy import Computed
 from sqlalchemy_utils import ChoiceType
 from sqlmodel import (
     BigInteger,
     Column,
     DateTime,
     Field,
+    Index,
     Relationship,
     SQLModel,
     String,
@@ -46,6 +48,16 @@ class UserBase(SQLModel):
 
 
 class User(BaseUUIDModel, UserBase, table=True):
+    # Name search matches trigrams of full_name
+    __table_args__ = (
+        Index(
+            "ix_User_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+    )
+
     hashed_password: str | None = Field(
         default=None, nullable=False, index=True
     )
@@ -65,8 +77,15 @@ class User(BaseUUIDModel, UserBase, table=True):
         }
     )
     follower_count: int | None = Field(
-        default=None, sa_column=Column(BigInteger(), server_default="0")
+        default=0, sa_column=Column(BigInteger(), server_default="0")
     )
     following_count: int | None = Field(
-        default=None, sa_column=Column(BigInteger(), server_default="0")
+        default=0, sa_column=Column(BigInteger(), server_default="0")
+    )
+    full_name: str | None = Field(
+        default=None,
+        sa_column=Column(
+            String,
+            Computed("first_name || ' ' || last_name", persisted=True),
+        ),
     )
@@ -21,6 +21,14 @@ class IHeroUpdate(HeroBase):
     pass
 
 
+class IHeroBulkUpdate(IHeroUpdate):
+    id: UUID
+
+
+class IHeroUpsert(IHeroCreate):
+    id: UUID | None = None
+
+
 class IHeroRead(HeroBase):
     id: UUID
 
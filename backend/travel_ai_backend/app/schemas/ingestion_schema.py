@@ -0,0 +1,59 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+from travel_ai_backend.app.schemas.hero_schema import IHeroCreate
+from travel_ai_backend.app.schemas.user_schema import IUserCreate
+
+
+class IngestionEntityEnum(str, Enum):
+    users = "users"
+    heroes = "heroes"
+    teams = "teams"
+
+
+class IngestionFormatEnum(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+class IIngestionStatusEnum(str, Enum):
+    pending = "pending"
+    running = "running"
+    success = "success"
+    failure = "failure"
+
+
+class IUserIngest(IUserCreate):
+    # Role name, resolved to role_id before loading
+    role: str | None = None
+
+
+class IHeroIngest(IHeroCreate):
+    # Team name, resolved to team_id before loading
+    team: str | None = None
+
+
+class IIngestionFromStorage(BaseModel):
+    object_name: str
+    file_format: IngestionFormatEnum = IngestionFormatEnum.csv
+
+
+class IIngestionRejectedRow(BaseModel):
+    line: int
+    error: str
+
+
+class IIngestionRead(BaseModel):
+    id: str
+    entity: IngestionEntityEnum
+    file_format: IngestionFormatEnum
+    status: IIngestionStatusEnum
+    rows_read: int = 0
+    rows_rejected: int = 0
+    rows_inserted: int = 0
+    rows_skipped: int = 0
+    elapsed_seconds: float | None = None
+    rows_per_second: float | None = None
+    rejected: list[IIngestionRejectedRow] = []
+    error: str | None = None
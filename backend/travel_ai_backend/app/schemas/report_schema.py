@@ -0,0 +1,38 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class FileExtensionEnum(str, Enum):
+    csv = "csv"
+    xls = "xls"
+    parquet = "parquet"
+
+
+class ReportEnum(str, Enum):
+    users = "users"
+    heroes = "heroes"
+
+
+class IReportExportStatusEnum(str, Enum):
+    pending = "pending"
+    running = "running"
+    success = "success"
+    failure = "failure"
+
+
+class IReportExportCreate(BaseModel):
+    report: ReportEnum
+    file_extension: FileExtensionEnum = FileExtensionEnum.csv
+
+
+class IReportExportRead(BaseModel):
+    id: str
+    report: ReportEnum
+    file_extension: FileExtensionEnum
+    status: IReportExportStatusEnum
+    rows_total: int | None = None
+    rows_exported: int = 0
+    progress: float | None = None
+    url: str | None = None
+    error: str | None = None
@@ -2,6 +2,7 @@ from collections.abc import Sequence
 from math import ceil
 from typing import Any, Generic, TypeVar
 
+from fastapi import Query
 from fastapi_pagination import Page, Params
 from fastapi_pagination.bases import AbstractPage, AbstractParams
 from pydantic import BaseModel, Field
@@ -17,6 +18,9 @@ class PageBase(Page[T], Generic[T]):
     next_page: int | None = Field(
         default=None, description="Page number of the next page"
     )
+    is_total_exact: bool = Field(
+        default=True, description="False when total is a planner estimate"
+    )
 
 
 class IResponseBase(BaseModel, Generic[T]):
@@ -38,6 +42,7 @@ class IGetResponsePaginated(AbstractPage[T], Generic[T]):
         items: Sequence[T],
         total: int,
         params: AbstractParams,
+        is_total_exact: bool = True,
     ) -> PageBase[T] | None:
         if params.size is not None and total is not None and params.size != 0:
             pages = ceil(total / params.size)
@@ -53,10 +58,39 @@ class IGetResponsePaginated(AbstractPage[T], Generic[T]):
                 pages=pages,
                 next_page=params.page + 1 if params.page < pages else None,
                 previous_page=params.page - 1 if params.page > 1 else None,
+                is_total_exact=is_total_exact,
             )
         )
 
 
+class CursorParams(BaseModel):
+    cursor: str | None = Query(
+        None, description="Cursor of the page, the first page if empty"
+    )
+    size: int = Query(50, ge=1, le=100, description="Page size")
+    include_total: bool = Query(
+        False, description="Counts all the rows, it is slow on big tables"
+    )
+
+
+class CursorPageBase(BaseModel, Generic[T]):
+    items: Sequence[T]
+    size: int
+    total: int | None = Field(
+        default=None, description="Only returned when include_total is set"
+    )
+    next_cursor: str | None = Field(
+        default=None, description="Cursor of the next page"
+    )
+    previous_cursor: str | None = Field(
+        default=None, description="Cursor of the previous page"
+    )
+
+
+class IGetResponseCursor(IResponseBase[CursorPageBase[T]], Generic[T]):
+    message: str | None = "Data paginated correctly"
+
+
 class IGetResponseBase(IResponseBase[DataType], Generic[DataType]):
     message: str | None = "Data got correctly"
 
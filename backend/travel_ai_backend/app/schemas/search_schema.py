@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class SearchEntityEnum(str, Enum):
+    heroes = "heroes"
+    teams = "teams"
+    users = "users"
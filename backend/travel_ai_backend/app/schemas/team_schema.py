@@ -17,6 +17,11 @@ class ITeamUpdate(TeamBase):
     pass
 
 
+class ITeamReadBasic(TeamBase):
+    id: UUID
+    created_by_id: UUID | None = None
+
+
 class ITeamRead(TeamBase):
     id: UUID
     created_by: IUserBasicInfo
@@ -1,31 +1,81 @@
-from typing import List
+from enum import Enum
+from typing import Annotated, Any, List
 
-from pydantic import BaseModel, field_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    PlainSerializer,
+    PlainValidator,
+    WithJsonSchema,
+    field_validator,
+    model_validator,
+)
 
 from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.utils.vector_codec import encode_vector, to_vector
 
 VECTOR_LEN = settings.ELASTIC_VECTOR_DIMS
 
+MetadataValue = str | int | float | bool
+
+# A float32 array, sent as a list of numbers or as the base64 of its
+# little-endian bytes
+Vector = Annotated[
+    Any,
+    PlainValidator(lambda v: to_vector(v, VECTOR_LEN)),
+    PlainSerializer(encode_vector, return_type=List[float]),
+    WithJsonSchema(
+        {
+            "anyOf": [
+                {"type": "array", "items": {"type": "number"}},
+                {"type": "string", "format": "base64"},
+            ]
+        }
+    ),
+]
+
+
+class IVectorFormatEnum(str, Enum):
+    json = "json"
+    base64 = "base64"
+
 
 class TextVectorBase(BaseModel):
-    vector: List[float]
+    vector: Vector
+
+
+class ITextVectorCreate(TextVectorBase):
+    # Generated by Elasticsearch when missing, reusing one replaces the
+    # stored vector
+    id: str | None = None
+    text: str | None = None
+    # Values the search can filter on
+    metadata: dict[str, MetadataValue | list[MetadataValue]] | None = None
+
 
-    @field_validator(
-        "vector", mode="before", json_schema_input_type=List[float]
+class ITextEmbeddingCreate(BaseModel):
+    # Same as ITextVectorCreate, the vector is computed by the workers
+    id: str | None = None
+    text: str = Field(
+        min_length=1, max_length=settings.EMBEDDING_MAX_TEXT_LENGTH
     )
-    @classmethod
-    def vector_validator(csl, v):
-        if len(v) != VECTOR_LEN:
-            raise ValueError(f"The length of the array must be {VECTOR_LEN}!")
-        return v
+    metadata: dict[str, MetadataValue | list[MetadataValue]] | None = None
 
 
-class ITextVectorCreate(TextVectorBase):
-    pass
+class ITextEmbeddingQueuedRead(BaseModel):
+    index: str
+    queued: int
 
 
 class ITextVectorSearch(TextVectorBase):
-    k: int = 10
+    k: int = Field(default=10, le=settings.ELASTIC_VECTOR_MAX_K)
+    # Candidates examined per shard, more is slower and more accurate
+    num_candidates: int | None = Field(
+        default=None, le=settings.ELASTIC_VECTOR_MAX_NUM_CANDIDATES
+    )
+    # Metadata values the neighbors must have, applied before the search
+    filter: dict[str, MetadataValue | list[MetadataValue]] | None = None
+    include_vector: bool = False
 
     @field_validator("k", mode="before", json_schema_input_type=int)
     @classmethod
@@ -34,12 +84,61 @@ class ITextVectorSearch(TextVectorBase):
             raise ValueError("The number of requested items must be >= 1")
         return v
 
+    @model_validator(mode="after")
+    def num_candidates_validator(self):
+        if self.num_candidates is None:
+            self.num_candidates = min(
+                self.k * settings.ELASTIC_VECTOR_NUM_CANDIDATES_FACTOR,
+                settings.ELASTIC_VECTOR_MAX_NUM_CANDIDATES,
+            )
+        elif self.num_candidates < self.k:
+            raise ValueError("num_candidates must be >= k")
+        return self
+
 
-class ITextVectorBaseRead(TextVectorBase):
+class ITextVectorBaseRead(BaseModel):
     index: str
     id: str
+    text: str | None = None
+    # Base64 when requested with vector_format
+    vector: List[float] | str | None = None
 
 
-class ITextVectorSearchRead(ITextVectorBaseRead, ITextVectorSearch):
+class ITextVectorSearchRead(BaseModel):
+    id: str
     score: float
-    # vector: List[float]
+    text: str | None = None
+    metadata: dict[str, MetadataValue | list[MetadataValue]] | None = None
+    # Only returned when include_vector is set
+    vector: List[float] | str | None = None
+
+
+class ITextVectorBatchSearchRead(BaseModel):
+    # Position of the query in the batch
+    position: int
+    status: int
+    neighbors: list[ITextVectorSearchRead] = []
+    error: str | None = None
+
+
+class IRefreshPolicyEnum(str, Enum):
+    false = "false"
+    true = "true"
+    wait_for = "wait_for"
+
+
+class ITextVectorBulkItemRead(BaseModel):
+    # Position in the request, or line number of an ndjson upload
+    position: int
+    id: str | None = None
+    status: int
+    error: str | None = None
+
+
+class ITextVectorBulkRead(BaseModel):
+    index: str
+    indexed: int
+    failed: int
+    seconds: float
+    docs_per_second: float
+    items: list[ITextVectorBulkItemRead]
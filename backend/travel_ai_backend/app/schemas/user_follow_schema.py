@@ -1,3 +1,4 @@
+from enum import Enum
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -27,3 +28,21 @@ class IUserFollowReadCommon(BaseModel):
     follower_count: int
     following_count: int
     is_mutual: bool
+
+
+class IFollowDirectionEnum(str, Enum):
+    following = "following"
+    followers = "followers"
+
+
+class IUserGraphRead(BaseModel):
+    id: UUID
+    first_name: str
+    last_name: str
+    follower_count: int | None = 0
+    following_count: int | None = 0
+
+
+class IUserSuggestionRead(IUserGraphRead):
+    # Number of followed users who follow the suggested user
+    score: int
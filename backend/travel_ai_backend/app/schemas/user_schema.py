@@ -24,6 +24,10 @@ class IUserUpdate(UserBase):
     pass
 
 
+class IUserBulkUpdate(IUserUpdate):
+    id: UUID
+
+
 # This schema is used to avoid circular import
 class IGroupReadBasic(GroupBase):
     id: UUID
@@ -52,6 +56,22 @@ class IUserBasicInfo(BaseModel):
     last_name: str
 
 
+class IUserSearchRead(BaseModel):
+    id: UUID
+    first_name: str
+    last_name: str
+    score: float
+
+
 class IUserStatus(str, Enum):
     active = "active"
     inactive = "inactive"
+
+
+class IUserPrincipal(BaseModel):
+    """Minimal identity of an authenticated user, cached across requests"""
+
+    id: UUID
+    is_active: bool
+    role_name: str | None = None
+    version: int = 0
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "uuid" in value:
+            return UUID(value["uuid"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def encode_cursor(values: Sequence[Any], backwards: bool = False) -> str:
+    """
+    Encodes the keyset values of a row into an opaque url-safe string.
+    A backwards cursor points to the rows before that row.
+    """
+    payload = json.dumps(
+        {"v": [_encode_value(value) for value in values], "b": backwards},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[list[Any], bool]:
+    """Raises ValueError when the cursor is malformed"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        values = [_decode_value(value) for value in payload["v"]]
+        backwards = bool(payload["b"])
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    return values, backwards
+
+
+def coerce_cursor_values(
+    values: Sequence[Any], python_types: Sequence[type | None]
+) -> list[Any]:
+    """
+    Checks the decoded values against the types of their order columns,
+    a None type is not checked and None values stand for NULL. Raises
+    ValueError on a mismatch.
+    """
+    coerced = []
+    for value, python_type in zip(values, python_types):
+        if python_type is None or value is None:
+            pass
+        elif issubclass(python_type, Enum):
+            value = python_type(value)
+        elif python_type is float and type(value) is int:
+            value = float(value)
+        elif not isinstance(value, python_type) or (
+            isinstance(value, bool) and python_type is not bool
+        ):
+            raise ValueError("Invalid cursor value")
+        coerced.append(value)
+    return coerced
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import re
+import socket
+import time
+from collections.abc import Sequence
+from typing import Protocol
+
+import numpy as np
+from asyncer import asyncify
+from elasticsearch import AsyncElasticsearch
+from prometheus_client import Counter, Gauge, Histogram
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.text_vector_schema import (
+    ITextEmbeddingCreate,
+    ITextVectorCreate,
+)
+from travel_ai_backend.app.utils.vector_bulk import (
+    VectorBulkLoader,
+    iter_items,
+)
+
+CONSUMER_GROUP = "embedding_indexer"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+embedding_batch_size = Histogram(
+    "embedding_batch_size",
+    "Texts encoded per model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+embedding_encode_latency = Histogram(
+    "embedding_encode_seconds",
+    "Time spent encoding a batch of texts",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+embedding_texts = Counter(
+    "embedding_texts_total",
+    "Texts processed by the embedding pipeline",
+    ["result"],
+)
+embedding_texts_per_second = Gauge(
+    "embedding_texts_per_second",
+    "Encoding throughput of the last batch",
+)
+
+# (stream id, fields)
+Message = tuple[str, dict[str, str]]
+
+
+class EmbeddingModel(Protocol):
+    dims: int
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbeddingModel:
+    """
+    Bag of words model adding every token to a signed dimension picked by
+    its hash. It has no weights to load, and texts sharing words get close
+    vectors.
+    """
+
+    def __init__(self, dims: int):
+        self.dims = dims
+
+    @staticmethod
+    def _hashes(text: str) -> list[int]:
+        return [
+            int.from_bytes(
+                hashlib.blake2b(token.encode(), digest_size=8).digest(),
+                "little",
+            )
+            for token in TOKEN_PATTERN.findall(text.lower())
+        ]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        hashes = [self._hashes(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(h) for h in hashes])
+        values = np.fromiter(
+            itertools.chain.from_iterable(hashes),
+            dtype=np.uint64,
+            count=len(rows),
+        )
+        columns = (values % np.uint64(self.dims)).astype(np.intp)
+        signs = np.where(values >> np.uint64(63), -1, 1).astype(np.float32)
+        vectors = np.zeros((len(texts), self.dims), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerModel:
+    def __init__(self, name: str, backend: str):
+        # Optional dependency, only needed when a model name is configured
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(name, device="cpu", backend=backend)
+        self.dims = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def load_embedding_model() -> EmbeddingModel:
+    if settings.EMBEDDING_MODEL_NAME:
+        model = SentenceTransformerModel(
+            settings.EMBEDDING_MODEL_NAME,
+            settings.EMBEDDING_MODEL_BACKEND.value,
+        )
+    else:
+        model = HashingEmbeddingModel(settings.ELASTIC_VECTOR_DIMS)
+    if model.dims != settings.ELASTIC_VECTOR_DIMS:
+        raise ValueError(
+            f"The model vectors have {model.dims} dimensions, the index "
+            f"expects {settings.ELASTIC_VECTOR_DIMS}"
+        )
+    return model
+
+
+async def queue_texts(
+    redis_client: Redis, documents: Sequence[ITextEmbeddingCreate]
+) -> int:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for document in documents:
+            pipe.xadd(
+                settings.EMBEDDING_STREAM,
+                {"document": document.model_dump_json()},
+                maxlen=settings.EMBEDDING_STREAM_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+    return len(documents)
+
+
+def _is_retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class EmbeddingPipeline:
+    """
+    Reads the queued texts in micro-batches, encodes every batch with a
+    single model call and bulk indexes the vectors. A batch is indexed
+    while the next one is encoded, and its texts are acknowledged once
+    indexed, so texts of a failed run are encoded again by a later one.
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        es: AsyncElasticsearch,
+        model: EmbeddingModel,
+    ):
+        self.redis_client = redis_client
+        self.es = es
+        self.model = model
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.indexed = 0
+        self.failed = 0
+
+    async def _create_consumer_group(self) -> None:
+        try:
+            await self.redis_client.xgroup_create(
+                settings.EMBEDDING_STREAM,
+                CONSUMER_GROUP,
+                id="0",
+                mkstream=True,
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _read_batch(self) -> list[Message]:
+        """
+        Texts left pending by a failed run first. New texts are read until
+        the batch is full or the batch window has passed since the first.
+        """
+        _, messages, *_ = await self.redis_client.xautoclaim(
+            settings.EMBEDDING_STREAM,
+            CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=settings.EMBEDDING_RETRY_IDLE * 1000,
+            count=settings.EMBEDDING_BATCH_SIZE,
+        )
+        # Entries trimmed from the stream are claimed without fields
+        messages = [message for message in messages if message[1]]
+        if messages:
+            return messages
+        deadline = None
+        block = settings.EMBEDDING_BATCH_WINDOW
+        while len(messages) < settings.EMBEDDING_BATCH_SIZE:
+            response = await self.redis_client.xreadgroup(
+                CONSUMER_GROUP,
+                self.consumer,
+                {settings.EMBEDDING_STREAM: ">"},
+                count=settings.EMBEDDING_BATCH_SIZE - len(messages),
+                block=block,
+            )
+            if not response:
+                break
+            messages.extend(response[0][1])
+            if deadline is None:
+                deadline = (
+                    time.monotonic() + settings.EMBEDDING_BATCH_WINDOW / 1000
+                )
+            block = int((deadline - time.monotonic()) * 1000)
+            # Redis blocks forever on 0
+            if block <= 0:
+                break
+        return messages
+
+    async def _ack(self, message_ids: list[str]) -> None:
+        if message_ids:
+            await self.redis_client.xack(
+                settings.EMBEDDING_STREAM, CONSUMER_GROUP, *message_ids
+            )
+
+    async def _encode(
+        self, messages: list[Message]
+    ) -> tuple[list[str], list[ITextVectorCreate]]:
+        """Stream ids and vectors of the valid texts of a batch"""
+        message_ids = []
+        documents = []
+        rejected = []
+        for message_id, fields in messages:
+            try:
+                documents.append(
+                    ITextEmbeddingCreate.model_validate_json(
+                        fields["document"]
+                    )
+                )
+                message_ids.append(message_id)
+            except (KeyError, ValidationError) as e:
+                logging.warning(f"Invalid embedding text {message_id}: {e}")
+                rejected.append(message_id)
+        if rejected:
+            self.failed += len(rejected)
+            embedding_texts.labels("invalid").inc(len(rejected))
+            await self._ack(rejected)
+        if not documents:
+            return [], []
+
+        start_time = time.perf_counter()
+        # Model libraries release the GIL, the previous batch is indexed
+        # meanwhile
+        vectors = await asyncify(self.model.encode)(
+            [document.text for document in documents]
+        )
+        seconds = time.perf_counter() - start_time
+        embedding_batch_size.observe(len(documents))
+        embedding_encode_latency.observe(seconds)
+        if seconds:
+            embedding_texts_per_second.set(len(documents) / seconds)
+
+        # Texts without words give zero vectors, which have no direction
+        valid = np.isfinite(vectors).all(axis=1) & vectors.any(axis=1)
+        if not valid.all():
+            empty = [
+                message_id
+                for message_id, is_valid in zip(message_ids, valid)
+                if not is_valid
+            ]
+            self.failed += len(empty)
+            embedding_texts.labels("empty").inc(len(empty))
+            await self._ack(empty)
+        return (
+            [
+                message_id
+                for message_id, is_valid in zip(message_ids, valid)
+                if is_valid
+            ],
+            [
+                ITextVectorCreate.model_construct(
+                    vector=vector,
+                    id=document.id,
+                    text=document.text,
+                    metadata=document.metadata,
+                )
+                for document, vector, is_valid in zip(
+                    documents, vectors, valid
+                )
+                if is_valid
+            ],
+        )
+
+    async def _index(
+        self, message_ids: list[str], text_vectors: list[ITextVectorCreate]
+    ) -> None:
+        loader = VectorBulkLoader(self.es, chunk_size=len(text_vectors))
+        result = await loader.load(iter_items(text_vectors))
+        # Rejected documents will not index on a retry, unlike the ones
+        # that failed on an unavailable or overloaded cluster
+        done = [
+            message_ids[item.position]
+            for item in result.items
+            if not _is_retryable(item.status)
+        ]
+        failed = sum(
+            item.error is not None and not _is_retryable(item.status)
+            for item in result.items
+        )
+        self.indexed += result.indexed
+        self.failed += failed
+        embedding_texts.labels("indexed").inc(result.indexed)
+        embedding_texts.labels("failed").inc(failed)
+        await self._ack(done)
+
+    async def run(self, max_seconds: float) -> tuple[int, int]:
+        """
+        Processes batches until the stream is drained or max_seconds have
+        passed, and returns the number of indexed and failed texts
+        """
+        await self._create_consumer_group()
+        deadline = time.monotonic() + max_seconds
+        indexing = None
+        try:
+            while time.monotonic() < deadline and (
+                messages := await self._read_batch()
+            ):
+                message_ids, text_vectors = await self._encode(messages)
+                if indexing is not None:
+                    await indexing
+                    indexing = None
+                if text_vectors:
+                    indexing = asyncio.create_task(
+                        self._index(message_ids, text_vectors)
+                    )
+            if indexing is not None:
+                await indexing
+        finally:
+            if indexing is not None and not indexing.done():
+                indexing.cancel()
+        return self.indexed, self.failed
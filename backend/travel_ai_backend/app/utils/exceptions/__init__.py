@@ -1,8 +1,12 @@
 from .common_exception import (
     ContentNoChangeException,
     IdNotFoundException,
+    InvalidCursorException,
+    InvalidVectorPayloadException,
     NameExistException,
     NameNotFoundException,
+    SearchBackendException,
+    ServiceBusyException,
 )
 from .user_exceptions import UserSelfDeleteException
 from .user_follow_exceptions import (
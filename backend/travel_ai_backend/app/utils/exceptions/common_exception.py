@@ -20,6 +20,72 @@ class ContentNoChangeException(HTTPException):
         )
 
 
+class InvalidCursorException(HTTPException):
+    def __init__(
+        self,
+        detail: Any = "Invalid pagination cursor",
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail,
+            headers=headers,
+        )
+
+
+class InvalidVectorPayloadException(HTTPException):
+    def __init__(
+        self,
+        detail: Any = "Invalid vector payload",
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail,
+            headers=headers,
+        )
+
+
+class ServiceBusyException(HTTPException):
+    def __init__(
+        self,
+        detail: Any = None,
+        retry_after: int = 1,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after), **(headers or {})},
+        )
+
+
+class SearchBackendException(HTTPException):
+    def __init__(
+        self,
+        error: Exception,
+        retry_after: int = 1,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        # Requests rejected by Elasticsearch are client errors, anything
+        # else, overload included, means the search backend is unavailable
+        error_status = getattr(getattr(error, "meta", None), "status", None)
+        if (
+            error_status is not None
+            and 400 <= error_status < 500
+            and error_status != status.HTTP_429_TOO_MANY_REQUESTS
+        ):
+            status_code = status.HTTP_400_BAD_REQUEST
+        else:
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            headers = {"Retry-After": str(retry_after), **(headers or {})}
+        super().__init__(
+            status_code=status_code,
+            detail=f"Search backend error: {error}",
+            headers=headers,
+        )
+
+
 class IdNotFoundException(HTTPException, Generic[ModelType]):
     def __init__(
         self,
@@ -0,0 +1,121 @@
+import logging
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import LockNotOwnedError, ResponseError
+from sqlalchemy import Integer, column, delete, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import FollowCounterModeEnum, settings
+from travel_ai_backend.app.models.user_follow_model import FollowerCountFlush
+from travel_ai_backend.app.models.user_model import User
+
+FOLLOWER_COUNT_KEY = "follow_counter:follower_count"
+# Deltas being written to the database, kept until the commit succeeds
+FOLLOWER_COUNT_FLUSHING_KEY = "follow_counter:follower_count:flushing"
+# Id of the flushing deltas, recorded in the database when they are applied
+FOLLOWER_COUNT_FLUSH_ID_KEY = "follow_counter:follower_count:flush_id"
+FLUSH_LOCK_KEY = "follow_counter:flush_lock"
+FLUSH_LOCK_TIMEOUT = 60
+# Applied flush ids are kept well past any flush that could still retry them
+FLUSH_ID_RETENTION = timedelta(days=1)
+
+
+def is_buffered(target_user: User) -> bool:
+    return (
+        settings.FOLLOW_COUNTER_MODE == FollowCounterModeEnum.buffered
+        and (target_user.follower_count or 0)
+        >= settings.FOLLOW_COUNTER_HOT_THRESHOLD
+    )
+
+
+async def buffer_follower_count(
+    redis_client: Redis, user_id: UUID, delta: int
+) -> None:
+    await redis_client.hincrby(FOLLOWER_COUNT_KEY, str(user_id), delta)
+
+
+async def flush_follower_counts(
+    redis_client: Redis, db_session: AsyncSession
+) -> int:
+    """
+    Applies the buffered deltas in a single UPDATE and returns the number
+    of updated users. A failed flush is retried first on the next run.
+    """
+    # Overlapping flushes would only wait for each other
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+    if not await lock.acquire(blocking=False):
+        return 0
+    try:
+        return await _flush_follower_counts(redis_client, db_session)
+    finally:
+        try:
+            await lock.release()
+        except LockNotOwnedError:
+            # The flush outlived the lock, the flush id keeps it idempotent
+            logging.warning("The follower count flush lock expired")
+
+
+async def _flush_follower_counts(
+    redis_client: Redis, db_session: AsyncSession
+) -> int:
+    if not await redis_client.exists(FOLLOWER_COUNT_FLUSHING_KEY):
+        try:
+            # New increments go to a fresh hash while this one is flushed
+            await redis_client.rename(
+                FOLLOWER_COUNT_KEY, FOLLOWER_COUNT_FLUSHING_KEY
+            )
+        except ResponseError:
+            return 0  # Nothing buffered
+    # Kept by the retries of a failed flush
+    await redis_client.set(FOLLOWER_COUNT_FLUSH_ID_KEY, uuid4().hex, nx=True)
+    flush_id = await redis_client.get(FOLLOWER_COUNT_FLUSH_ID_KEY)
+
+    deltas = {
+        UUID(user_id): int(delta)
+        for user_id, delta in (
+            await redis_client.hgetall(FOLLOWER_COUNT_FLUSHING_KEY)
+        ).items()
+        if int(delta)
+    }
+    if deltas:
+        now = datetime.utcnow()
+        await db_session.execute(
+            delete(FollowerCountFlush).where(
+                FollowerCountFlush.created_at < now - FLUSH_ID_RETENTION
+            )
+        )
+        response = await db_session.execute(
+            pg_insert(FollowerCountFlush)
+            .values(id=flush_id, created_at=now)
+            .on_conflict_do_nothing()
+            .returning(FollowerCountFlush.id)
+        )
+        if response.scalar_one_or_none() is None:
+            # Committed by an earlier run that failed before the cleanup
+            await db_session.rollback()
+            deltas = {}
+        else:
+            delta_values = values(
+                column("id", User.__table__.c.id.type),
+                column("delta", Integer),
+                name="deltas",
+            ).data(list(deltas.items()))
+            await db_session.execute(
+                update(User)
+                .where(User.id == delta_values.c.id)
+                .values(
+                    follower_count=func.coalesce(User.follower_count, 0)
+                    + delta_values.c.delta
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db_session.commit()
+    await redis_client.delete(
+        FOLLOWER_COUNT_FLUSHING_KEY, FOLLOWER_COUNT_FLUSH_ID_KEY
+    )
+    logging.info(f"Flushed the follower counts of {len(deltas)} users")
+    return len(deltas)
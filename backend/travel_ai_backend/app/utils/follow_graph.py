@@ -0,0 +1,213 @@
+import logging
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.crud.base_crud import chunked
+from travel_ai_backend.app.crud.user_crud import user
+from travel_ai_backend.app.crud.user_follow_crud import user_follow
+from travel_ai_backend.app.schemas.user_follow_schema import (
+    IFollowDirectionEnum,
+)
+from travel_ai_backend.app.utils.follow_graph_cache import (
+    adjacency_key,
+    follow_score,
+    get_version,
+    store_if_unchanged,
+    suggestions_key,
+    version_key,
+)
+from travel_ai_backend.app.utils.uuid6 import uuid7
+
+ZADD_CHUNK_SIZE = 10_000
+
+
+async def _get_cached_adjacency_key(
+    redis_client: Redis,
+    user_id: UUID,
+    direction: IFollowDirectionEnum,
+    edge_count: int,
+    db_session: AsyncSession | None = None,
+) -> str | None:
+    """
+    Key of the sorted set of neighbours scored by follow time, loaded on
+    first use for hot users. Small sets are cheaper to join in SQL, and a
+    set changed by a follow while it was loaded is dropped.
+    """
+    key = adjacency_key(user_id, direction)
+    if await redis_client.exists(key):
+        return key
+    if not (
+        settings.FOLLOW_GRAPH_HOT_THRESHOLD
+        <= edge_count
+        <= settings.FOLLOW_GRAPH_CACHE_MAX_SIZE
+    ):
+        return None
+
+    version = await get_version(redis_client, user_id, direction)
+    edges = await user_follow.get_adjacency(
+        user_id=user_id, direction=direction, db_session=db_session
+    )
+    if not edges:
+        return None
+    stored = await store_if_unchanged(
+        redis_client,
+        key,
+        version_key(user_id, direction),
+        version,
+        (
+            {
+                str(neighbour_id): follow_score(followed_at)
+                for neighbour_id, followed_at in chunk
+            }
+            for chunk in chunked(edges, ZADD_CHUNK_SIZE)
+        ),
+        settings.FOLLOW_GRAPH_CACHE_TTL,
+    )
+    return key if stored else None
+
+
+async def _intersect_cached(
+    redis_client: Redis,
+    edges: list[tuple[UUID, IFollowDirectionEnum]],
+    limit: int,
+    db_session: AsyncSession | None = None,
+) -> list[UUID] | None:
+    """
+    Intersects the cached sets of the edges, most recent follows first.
+    Returns None when one of them is not cached.
+    """
+    counts = await user.get_follow_counts(
+        user_ids=[user_id for user_id, _ in edges], db_session=db_session
+    )
+    keys = []
+    for edge in edges:
+        key = await _get_cached_adjacency_key(
+            redis_client, *edge, counts.get(edge, 0), db_session
+        )
+        if key is None:
+            return None
+        keys.append(key)
+
+    result_key = f"follow_graph:intersection:{uuid7()}"
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zinterstore(result_key, keys, aggregate="MAX")
+        pipe.zrange(result_key, 0, limit - 1, desc=True)
+        pipe.delete(result_key)
+        _, members, _ = await pipe.execute()
+    return [UUID(member) for member in members]
+
+
+async def get_common_following(
+    redis_client: Redis,
+    user_id: UUID,
+    other_user_id: UUID,
+    limit: int,
+    db_session: AsyncSession | None = None,
+) -> list[UUID]:
+    """Users followed by both users"""
+    try:
+        user_ids = await _intersect_cached(
+            redis_client,
+            [
+                (user_id, IFollowDirectionEnum.following),
+                (other_user_id, IFollowDirectionEnum.following),
+            ],
+            limit,
+            db_session,
+        )
+        if user_ids is not None:
+            return user_ids
+    except RedisError as e:
+        logging.warning(f"Follow graph cache unavailable: {e}")
+    return await user_follow.get_common_following_ids(
+        user_id=user_id,
+        other_user_id=other_user_id,
+        limit=limit,
+        db_session=db_session,
+    )
+
+
+async def get_known_followers(
+    redis_client: Redis,
+    user_id: UUID,
+    target_user_id: UUID,
+    limit: int,
+    db_session: AsyncSession | None = None,
+) -> list[UUID]:
+    """Users followed by user_id who follow target_user_id"""
+    try:
+        user_ids = await _intersect_cached(
+            redis_client,
+            [
+                (user_id, IFollowDirectionEnum.following),
+                (target_user_id, IFollowDirectionEnum.followers),
+            ],
+            limit,
+            db_session,
+        )
+        if user_ids is not None:
+            return user_ids
+    except RedisError as e:
+        logging.warning(f"Follow graph cache unavailable: {e}")
+    return await user_follow.get_known_follower_ids(
+        user_id=user_id,
+        target_user_id=target_user_id,
+        limit=limit,
+        db_session=db_session,
+    )
+
+
+async def get_suggestions(
+    redis_client: Redis,
+    user_id: UUID,
+    limit: int,
+    db_session: AsyncSession | None = None,
+) -> list[tuple[UUID, int]]:
+    """
+    Follow suggestions ranked by the number of followed users who follow
+    them, cached for FOLLOW_GRAPH_SUGGESTIONS_TTL. The follows of the user
+    drop the cached suggestions, the follows of the followed users do not.
+    """
+    key = suggestions_key(user_id)
+    version = "0"
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.exists(key)
+            pipe.zrange(key, 0, limit - 1, desc=True, withscores=True)
+            pipe.get(version_key(user_id, IFollowDirectionEnum.following))
+            cached, suggestions, version = await pipe.execute()
+        if cached:
+            return [
+                (UUID(member), int(score))
+                for member, score in suggestions
+                if member
+            ]
+    except RedisError as e:
+        logging.warning(f"Follow graph cache unavailable: {e}")
+
+    suggestions = await user_follow.get_suggestions(
+        user_id=user_id,
+        limit=settings.FOLLOW_GRAPH_MAX_RESULTS,
+        fanout=settings.FOLLOW_GRAPH_SUGGESTION_FANOUT,
+        db_session=db_session,
+    )
+    try:
+        await store_if_unchanged(
+            redis_client,
+            key,
+            version_key(user_id, IFollowDirectionEnum.following),
+            version or "0",
+            # An empty set is stored as a placeholder member
+            [
+                {str(member): score for member, score in suggestions}
+                or {"": -1}
+            ],
+            settings.FOLLOW_GRAPH_SUGGESTIONS_TTL,
+        )
+    except RedisError as e:
+        logging.warning(f"Follow graph cache update failed: {e}")
+    return suggestions[:limit]
@@ -0,0 +1,165 @@
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.user_follow_schema import (
+    IFollowDirectionEnum,
+)
+from travel_ai_backend.app.utils.uuid6 import uuid7
+
+# Cached sets are only kept up to date, never created, by follow writes
+ZADD_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+end
+return 0
+"""
+# A set loaded from the database replaces the cached one only when no
+# follow write changed the version while it was read
+RENAME_IF_VERSION = """
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def adjacency_key(user_id: UUID, direction: IFollowDirectionEnum) -> str:
+    return f"follow_graph:{direction.value}:{user_id}"
+
+
+def suggestions_key(user_id: UUID) -> str:
+    return f"follow_graph:suggestions:{user_id}"
+
+
+def version_key(user_id: UUID, direction: IFollowDirectionEnum) -> str:
+    return f"follow_graph:version:{direction.value}:{user_id}"
+
+
+async def get_version(
+    redis_client: Redis, user_id: UUID, direction: IFollowDirectionEnum
+) -> str:
+    """Read before the database so a follow written meanwhile is noticed"""
+    return await redis_client.get(version_key(user_id, direction)) or "0"
+
+
+async def store_if_unchanged(
+    redis_client: Redis,
+    key: str,
+    version_key: str,
+    version: str,
+    chunks: Iterable[dict[str, float]],
+    ttl: int,
+) -> bool:
+    """
+    Writes the sorted set to a temporary key and renames it to key unless
+    the version changed, returns whether it was stored
+    """
+    script = redis_client.register_script(RENAME_IF_VERSION)
+    temp_key = f"{key}:fill:{uuid7()}"
+    async with redis_client.pipeline(transaction=True) as pipe:
+        for chunk in chunks:
+            pipe.zadd(temp_key, chunk)
+        await script(
+            keys=[temp_key, key, version_key],
+            args=[version, ttl],
+            client=pipe,
+        )
+        *_, stored = await pipe.execute()
+    return bool(stored)
+
+
+def _bump_versions(
+    pipe: Pipeline, user_id: UUID, target_user_id: UUID
+) -> None:
+    for key in (
+        version_key(user_id, IFollowDirectionEnum.following),
+        version_key(target_user_id, IFollowDirectionEnum.followers),
+    ):
+        pipe.incr(key)
+        # Outlives any set loaded before the write
+        pipe.expire(key, settings.FOLLOW_GRAPH_CACHE_TTL)
+
+
+def follow_score(followed_at: datetime) -> float:
+    # Follow times are stored naive in UTC
+    return followed_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+async def add_follow_edge(
+    redis_client: Redis,
+    user_id: UUID,
+    target_user_id: UUID,
+    followed_at: datetime,
+) -> None:
+    script = redis_client.register_script(ZADD_IF_EXISTS)
+    score = follow_score(followed_at)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            await script(
+                keys=[
+                    adjacency_key(user_id, IFollowDirectionEnum.following)
+                ],
+                args=[score, str(target_user_id)],
+                client=pipe,
+            )
+            await script(
+                keys=[
+                    adjacency_key(
+                        target_user_id, IFollowDirectionEnum.followers
+                    )
+                ],
+                args=[score, str(user_id)],
+                client=pipe,
+            )
+            _bump_versions(pipe, user_id, target_user_id)
+            pipe.delete(suggestions_key(user_id))
+            await pipe.execute()
+    except RedisError as e:
+        logging.warning(f"Follow graph cache update failed: {e}")
+
+
+async def remove_follow_edge(
+    redis_client: Redis, user_id: UUID, target_user_id: UUID
+) -> None:
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zrem(
+                adjacency_key(user_id, IFollowDirectionEnum.following),
+                str(target_user_id),
+            )
+            pipe.zrem(
+                adjacency_key(target_user_id, IFollowDirectionEnum.followers),
+                str(user_id),
+            )
+            _bump_versions(pipe, user_id, target_user_id)
+            pipe.delete(suggestions_key(user_id))
+            await pipe.execute()
+    except RedisError as e:
+        logging.warning(f"Follow graph cache update failed: {e}")
+
+
+async def forget_user(redis_client: Redis, user_id: UUID) -> None:
+    """
+    Drops the cached sets of a removed user, its id may stay in the sets of
+    other users until they expire and is skipped when users are loaded
+    """
+    try:
+        await redis_client.delete(
+            *(
+                adjacency_key(user_id, direction)
+                for direction in IFollowDirectionEnum
+            ),
+            suggestions_key(user_id),
+        )
+    except RedisError as e:
+        logging.warning(f"Follow graph cache update failed: {e}")
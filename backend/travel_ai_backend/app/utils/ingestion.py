@@ -0,0 +1,509 @@
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import time
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, BinaryIO
+from uuid import UUID
+
+from asyncer import asyncify
+from pydantic import BaseModel, ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import Table, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.core.security import (
+    get_password_hash,
+    password_hash_executor,
+)
+from travel_ai_backend.app.db.session import SessionLocal
+from travel_ai_backend.app.models.hero_model import Hero
+from travel_ai_backend.app.models.role_model import Role
+from travel_ai_backend.app.models.team_model import Team
+from travel_ai_backend.app.models.user_model import User
+from travel_ai_backend.app.schemas.ingestion_schema import (
+    IHeroIngest,
+    IIngestionRead,
+    IIngestionRejectedRow,
+    IIngestionStatusEnum,
+    IngestionEntityEnum,
+    IngestionFormatEnum,
+    IUserIngest,
+)
+from travel_ai_backend.app.schemas.team_schema import ITeamCreate
+from travel_ai_backend.app.utils.minio_client import MinioClient
+from travel_ai_backend.app.utils.query_count import invalidate_counts
+from travel_ai_backend.app.utils.search_sync import record_changes
+from travel_ai_backend.app.utils.uuid6 import uuid7
+
+MEDIA_TYPES = {
+    IngestionFormatEnum.csv: "text/csv",
+    IngestionFormatEnum.ndjson: "application/x-ndjson",
+}
+INGEST_SCHEMAS: dict[IngestionEntityEnum, type[BaseModel]] = {
+    IngestionEntityEnum.users: IUserIngest,
+    IngestionEntityEnum.heroes: IHeroIngest,
+    IngestionEntityEnum.teams: ITeamCreate,
+}
+INGEST_MODELS = {
+    IngestionEntityEnum.users: User,
+    IngestionEntityEnum.heroes: Hero,
+    IngestionEntityEnum.teams: Team,
+}
+# Rows already stored with the same values are skipped, heroes and teams
+# have no unique index behind these columns so their merges are serialized
+# with a transaction level advisory lock
+DEDUPE_COLUMNS = {
+    IngestionEntityEnum.users: ["email"],
+    IngestionEntityEnum.heroes: ["name", "secret_name"],
+    IngestionEntityEnum.teams: ["name"],
+}
+
+# (line number, parsed record, parse error)
+SourceRow = tuple[int, dict[str, Any] | None, str | None]
+
+
+def _job_key(job_id: str) -> str:
+    return f"ingestion:job:{job_id}"
+
+
+def _rejected_key(job_id: str) -> str:
+    return f"ingestion:job:{job_id}:rejected"
+
+
+def iter_source_rows(
+    stream: BinaryIO, file_format: IngestionFormatEnum
+) -> Iterator[SourceRow]:
+    """Parses the file lazily, one line at a time"""
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if file_format == IngestionFormatEnum.csv:
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            # Empty cells fall back to the schema defaults
+            yield reader.line_num, {
+                key: value
+                for key, value in row.items()
+                if key is not None and value not in ("", None)
+            }, None
+        return
+
+    for line_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        "{}: {}".format(".".join(map(str, item["loc"])), item["msg"])
+        for item in error.errors()
+    )
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+def create_hash_executor() -> tuple[Executor, bool]:
+    """
+    Returns the executor used to hash passwords and whether it is owned by
+    the caller. Daemonic processes cannot start children so they share the
+    password hash threads instead. The prefork Celery workers running the
+    ingestion jobs are daemonic, the process pool is only used when a job
+    runs outside of them (scripts, the solo or threads Celery pools).
+    """
+    if multiprocessing.current_process().daemon:
+        return password_hash_executor, False
+    return (
+        ProcessPoolExecutor(
+            max_workers=settings.INGESTION_HASH_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        ),
+        True,
+    )
+
+
+async def hash_passwords_async(
+    executor: Executor, passwords: list[str]
+) -> list[str]:
+    # One task per worker keeps the inter-process traffic low
+    if not passwords:
+        return []
+    chunk_size = -(-len(passwords) // settings.INGESTION_HASH_PROCESSES)
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                executor,
+                hash_passwords,
+                passwords[start : start + chunk_size],
+            )
+            for start in range(0, len(passwords), chunk_size)
+        )
+    )
+    return list(itertools.chain.from_iterable(chunks))
+
+
+def _copy_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def get_copy_columns(table: Table) -> list[str]:
+    # Columns with a server default are filled by the staging table
+    return [
+        column.name
+        for column in table.columns
+        if column.server_default is None
+    ]
+
+
+async def create_ingestion_job(
+    redis_client: Redis,
+    entity: IngestionEntityEnum,
+    file_format: IngestionFormatEnum,
+    object_name: str,
+    created_by_id: UUID,
+) -> str:
+    job_id = str(uuid7())
+    job_key = _job_key(job_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(
+            job_key,
+            mapping={
+                "entity": entity.value,
+                "file_format": file_format.value,
+                "object_name": object_name,
+                "created_by_id": str(created_by_id),
+                "status": IIngestionStatusEnum.pending.value,
+                "rows_read": 0,
+                "rows_rejected": 0,
+                "rows_inserted": 0,
+                "rows_skipped": 0,
+            },
+        )
+        pipe.expire(job_key, settings.INGESTION_JOB_TTL)
+        await pipe.execute()
+    return job_id
+
+
+async def get_ingestion_job(
+    redis_client: Redis, job_id: str
+) -> IIngestionRead | None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hgetall(_job_key(job_id))
+        pipe.lrange(_rejected_key(job_id), 0, -1)
+        job, rejected = await pipe.execute()
+    if not job:
+        return None
+
+    elapsed_seconds = job.get("elapsed_seconds")
+    rows_per_second = job.get("rows_per_second")
+    return IIngestionRead(
+        id=job_id,
+        entity=job["entity"],
+        file_format=job["file_format"],
+        status=job["status"],
+        rows_read=int(job["rows_read"]),
+        rows_rejected=int(job["rows_rejected"]),
+        rows_inserted=int(job["rows_inserted"]),
+        rows_skipped=int(job["rows_skipped"]),
+        elapsed_seconds=float(elapsed_seconds) if elapsed_seconds else None,
+        rows_per_second=float(rows_per_second) if rows_per_second else None,
+        rejected=[
+            IIngestionRejectedRow.model_validate_json(item)
+            for item in rejected
+        ],
+        error=job.get("error"),
+    )
+
+
+class IngestionLoader:
+    """
+    Loads one entity from a parsed file: every batch is validated, copied
+    into a staging table with COPY and merged into the target table in a
+    single transaction.
+    """
+
+    def __init__(
+        self,
+        entity: IngestionEntityEnum,
+        created_by_id: UUID,
+        hash_executor: Executor,
+    ):
+        self.entity = entity
+        self.schema = INGEST_SCHEMAS[entity]
+        self.model = INGEST_MODELS[entity]
+        self.table: Table = self.model.__table__
+        self.columns = get_copy_columns(self.table)
+        self.created_by_id = created_by_id
+        self.hash_executor = hash_executor
+        self.role_ids: dict[str, UUID] | None = None
+        self.team_ids: dict[str, UUID] = {}
+
+    async def _resolve_roles(self, db_session: AsyncSession) -> None:
+        if self.role_ids is None:
+            response = await db_session.execute(select(Role.name, Role.id))
+            self.role_ids = dict(response.all())
+
+    async def _resolve_teams(
+        self, db_session: AsyncSession, names: set[str]
+    ) -> None:
+        missing = names - self.team_ids.keys()
+        if missing:
+            response = await db_session.execute(
+                select(Team.name, Team.id).where(Team.name.in_(missing))
+            )
+            self.team_ids.update(response.all())
+
+    async def _to_models(
+        self, db_session: AsyncSession, items: list[tuple[int, Any]]
+    ) -> tuple[list[Any], list[IIngestionRejectedRow]]:
+        """Resolves names to ids and builds the table models"""
+        rejected = []
+        values = []
+        if self.entity == IngestionEntityEnum.users:
+            await self._resolve_roles(db_session)
+            hashed_passwords = await hash_passwords_async(
+                self.hash_executor, [item.password for _, item in items]
+            )
+            for (line, item), hashed_password in zip(items, hashed_passwords):
+                role_id = item.role_id
+                if item.role is not None:
+                    role_id = self.role_ids.get(item.role)
+                    if role_id is None:
+                        rejected.append(
+                            IIngestionRejectedRow(
+                                line=line, error=f"Unknown role {item.role}"
+                            )
+                        )
+                        continue
+                values.append(
+                    item.model_dump(exclude={"password", "role"})
+                    | {"hashed_password": hashed_password, "role_id": role_id}
+                )
+        elif self.entity == IngestionEntityEnum.heroes:
+            await self._resolve_teams(
+                db_session,
+                {item.team for _, item in items if item.team is not None},
+            )
+            for line, item in items:
+                team_id = item.team_id
+                if item.team is not None:
+                    team_id = self.team_ids.get(item.team)
+                    if team_id is None:
+                        rejected.append(
+                            IIngestionRejectedRow(
+                                line=line, error=f"Unknown team {item.team}"
+                            )
+                        )
+                        continue
+                values.append(
+                    item.model_dump(exclude={"team"})
+                    | {"team_id": team_id, "created_by_id": self.created_by_id}
+                )
+        else:
+            values = [
+                item.model_dump() | {"created_by_id": self.created_by_id}
+                for _, item in items
+            ]
+        # Validating through the model fills the defaults (id, created_at)
+        return [self.model.model_validate(value) for value in values], rejected
+
+    def _merge_statement(self, staging_table: str) -> str:
+        table_name = self.table.name
+        columns = ", ".join(
+            f'"{column.name}"'
+            for column in self.table.columns
+            if column.computed is None
+        )
+        dedupe_columns = DEDUPE_COLUMNS[self.entity]
+        distinct_on = ", ".join(f'"{column}"' for column in dedupe_columns)
+        statement = (
+            f'INSERT INTO "{table_name}" ({columns}) '
+            f"SELECT DISTINCT ON ({distinct_on}) {columns} "
+            f"FROM {staging_table} AS staging "
+        )
+        if self.entity == IngestionEntityEnum.users:
+            # email has a unique index
+            return (
+                f"{statement}ORDER BY {distinct_on} "
+                "ON CONFLICT (email) DO NOTHING RETURNING id"
+            )
+        matches = " AND ".join(
+            f'stored."{column}" = staging."{column}"'
+            for column in dedupe_columns
+        )
+        return (
+            f"{statement}WHERE NOT EXISTS ("
+            f'SELECT 1 FROM "{table_name}" AS stored WHERE {matches}) '
+            f"ORDER BY {distinct_on} RETURNING id"
+        )
+
+    async def load(
+        self, db_session: AsyncSession, items: list[tuple[int, Any]]
+    ) -> tuple[int, int, list[IIngestionRejectedRow]]:
+        """Returns the inserted and skipped counts and the rejected rows"""
+        db_objs, rejected = await self._to_models(db_session, items)
+        if not db_objs:
+            return 0, 0, rejected
+
+        staging_table = f"ingestion_{self.table.name.lower()}"
+        await db_session.execute(
+            text(
+                f"CREATE TEMP TABLE {staging_table} "
+                f'(LIKE "{self.table.name}" INCLUDING DEFAULTS) '
+                "ON COMMIT DROP"
+            )
+        )
+        # COPY runs on the driver connection inside the same transaction
+        connection = await db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            staging_table,
+            records=[
+                tuple(
+                    _copy_value(getattr(db_obj, column))
+                    for column in self.columns
+                )
+                for db_obj in db_objs
+            ],
+            columns=self.columns,
+        )
+        if self.entity != IngestionEntityEnum.users:
+            # Held until the commit, a concurrent merge of the same entity
+            # waits and then sees the rows inserted here
+            await db_session.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"ingestion:{self.table.name}"},
+            )
+        response = await db_session.execute(
+            text(self._merge_statement(staging_table))
+        )
+        inserted_ids = response.scalars().all()
+        record_changes(db_session, self.model, inserted_ids)
+        await db_session.commit()
+        inserted = len(inserted_ids)
+        return inserted, len(db_objs) - inserted, rejected
+
+
+def _read_batch(rows: Iterator[SourceRow]) -> list[SourceRow]:
+    return list(itertools.islice(rows, settings.INGESTION_BATCH_SIZE))
+
+
+async def run_ingestion_job(redis_client: Redis, job_id: str) -> None:
+    """
+    Streams the source object from MinIO in batches of
+    INGESTION_BATCH_SIZE rows, rows failing validation are counted and the
+    first INGESTION_MAX_REPORTED_ERRORS are kept on the job
+    """
+    job_key = _job_key(job_id)
+    rejected_key = _rejected_key(job_id)
+    job = await redis_client.hgetall(job_key)
+    entity = IngestionEntityEnum(job["entity"])
+    file_format = IngestionFormatEnum(job["file_format"])
+    schema = INGEST_SCHEMAS[entity]
+
+    await redis_client.hset(
+        job_key, "status", IIngestionStatusEnum.running.value
+    )
+    hash_executor, owns_executor = create_hash_executor()
+    loader = IngestionLoader(
+        entity, UUID(job["created_by_id"]), hash_executor
+    )
+    minio_client = MinioClient.get_instance()
+    source = await asyncify(minio_client.client.get_object)(
+        bucket_name=minio_client.bucket_name, object_name=job["object_name"]
+    )
+    start_time = time.perf_counter()
+    rows_read = rows_rejected = 0
+    try:
+        rows = iter_source_rows(source, file_format)
+        async with SessionLocal() as session:
+            while batch := await asyncify(_read_batch)(rows):
+                items = []
+                rejected = []
+                for line, record, error in batch:
+                    if error is None:
+                        try:
+                            items.append((line, schema.model_validate(record)))
+                            continue
+                        except ValidationError as e:
+                            error = format_validation_error(e)
+                    rejected.append(
+                        IIngestionRejectedRow(line=line, error=error)
+                    )
+
+                inserted, skipped, load_rejected = await loader.load(
+                    session, items
+                )
+                rejected.extend(load_rejected)
+                rows_read += len(batch)
+                reported = max(
+                    settings.INGESTION_MAX_REPORTED_ERRORS - rows_rejected, 0
+                )
+                rows_rejected += len(rejected)
+                elapsed_seconds = time.perf_counter() - start_time
+                async with redis_client.pipeline(transaction=True) as pipe:
+                    pipe.hincrby(job_key, "rows_read", len(batch))
+                    pipe.hincrby(job_key, "rows_rejected", len(rejected))
+                    pipe.hincrby(job_key, "rows_inserted", inserted)
+                    pipe.hincrby(job_key, "rows_skipped", skipped)
+                    pipe.hset(
+                        job_key,
+                        mapping={
+                            "elapsed_seconds": round(elapsed_seconds, 3),
+                            "rows_per_second": round(
+                                rows_read / elapsed_seconds, 1
+                            ),
+                        },
+                    )
+                    if rejected[:reported]:
+                        pipe.rpush(
+                            rejected_key,
+                            *(
+                                row.model_dump_json()
+                                for row in rejected[:reported]
+                            ),
+                        )
+                        pipe.expire(rejected_key, settings.INGESTION_JOB_TTL)
+                    await pipe.execute()
+        await redis_client.hset(
+            job_key, "status", IIngestionStatusEnum.success.value
+        )
+    except Exception as e:
+        logging.exception(f"Ingestion {job_id} failed")
+        await redis_client.hset(
+            job_key,
+            mapping={
+                "status": IIngestionStatusEnum.failure.value,
+                "error": str(e),
+            },
+        )
+        raise
+    finally:
+        source.close()
+        source.release_conn()
+        if owns_executor:
+            hash_executor.shutdown()
+        if rows_read:
+            await invalidate_counts([loader.table.name])
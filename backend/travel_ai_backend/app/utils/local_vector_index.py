@@ -0,0 +1,480 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+from asyncer import asyncify
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from prometheus_client import Counter
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.text_vector_schema import (
+    ITextVectorSearch,
+    ITextVectorSearchRead,
+)
+from travel_ai_backend.app.utils.ttl_cache import TTLCache
+from travel_ai_backend.app.utils.uuid6 import uuid7
+from travel_ai_backend.app.utils.vector_engine import VectorEngine
+
+FETCH_PAGE_SIZE = 1000
+PIT_KEEP_ALIVE = "1m"
+SNAPSHOT_LINK = "current"
+
+local_vector_searches = Counter(
+    "local_vector_search_total",
+    "Neighbor searches answered by the in-process vector index",
+    ["result"],
+)
+
+# id -> (text, metadata, updated_at)
+Documents = dict[str, tuple[str | None, dict | None, str | None]]
+
+
+def _snapshot_options() -> dict[str, Any]:
+    return {
+        "dims": settings.ELASTIC_VECTOR_DIMS,
+        "similarity": settings.ELASTIC_VECTOR_SIMILARITY.value,
+        "quantized": settings.VECTOR_LOCAL_INDEX_QUANTIZED,
+        "ivf_lists": settings.VECTOR_LOCAL_INDEX_IVF_LISTS,
+    }
+
+
+class LocalVectorIndex:
+    """
+    In-process copy of the Elasticsearch vector index for small and hot
+    embedding sets. The vectors are memory mapped from a snapshot shared
+    by the workers of the host, documents changed since the snapshot are
+    read incrementally into a small delta searched next to it, and the
+    results are cached per query vector. Filtered searches and searches
+    returning vectors are left to Elasticsearch. Deletions, a recreated
+    index and snapshots older than VECTOR_LOCAL_INDEX_REBUILD_INTERVAL
+    lead to a new snapshot read from Elasticsearch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ready = False
+        self.base: VectorEngine | None = None
+        self.base_ids: list[str] = []
+        self.base_rows: dict[str, int] = {}
+        self.delta: dict[str, list[float]] = {}
+        self.delta_engine: VectorEngine | None = None
+        self.delta_ids: list[str] = []
+        self.documents: Documents = {}
+        # Latest updated_at read from the index
+        self.updated_at: str | None = None
+        # Elasticsearch index the base snapshot was read from, and when
+        self.index_uuid: str | None = None
+        self.built_at = 0.0
+        self.cache = TTLCache(
+            maxsize=settings.VECTOR_LOCAL_INDEX_CACHE_SIZE,
+            ttl=settings.VECTOR_LOCAL_INDEX_CACHE_TTL,
+        )
+        self._task: asyncio.Task | None = None
+
+    async def start(self, es: AsyncElasticsearch) -> None:
+        self._task = asyncio.create_task(self._run(es))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.ready = False
+
+    async def _run(self, es: AsyncElasticsearch) -> None:
+        while True:
+            try:
+                if self.base is None:
+                    await self._open(es)
+                else:
+                    await self._refresh(es)
+                self.ready = self.base is not None
+            except asyncio.CancelledError:
+                raise
+            except (ApiError, TransportError, OSError, ValueError) as e:
+                logging.warning(f"Local vector index error: {e}")
+            await asyncio.sleep(settings.VECTOR_LOCAL_INDEX_REFRESH_INTERVAL)
+
+    @asynccontextmanager
+    async def _snapshot_lock(self) -> AsyncIterator[None]:
+        """Only one worker of the host writes a snapshot at a time"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock_file:
+            await asyncify(fcntl.flock)(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _load_snapshot(
+        self, index_uuid: str
+    ) -> tuple[VectorEngine, list[list[Any]], dict[str, Any]] | None:
+        """None when there is no snapshot of the index usable as is"""
+        link = os.path.join(self.path, SNAPSHOT_LINK)
+        if not os.path.exists(link):
+            return None
+        # A concurrent swap of the link does not affect the loaded files
+        path = os.path.realpath(link)
+        with open(os.path.join(path, "state.json")) as state_file:
+            state = json.load(state_file)
+        if (
+            state["options"] != _snapshot_options()
+            or state.get("index_uuid") != index_uuid
+            or time.time() - state.get("built_at", 0)
+            > settings.VECTOR_LOCAL_INDEX_REBUILD_INTERVAL
+        ):
+            return None
+        with open(os.path.join(path, "documents.json")) as documents_file:
+            documents = json.load(documents_file)
+        return VectorEngine.load(path), documents, state
+
+    def _write_snapshot(
+        self,
+        vectors: np.ndarray,
+        documents: list[list[Any]],
+        updated_at: str | None,
+        index_uuid: str,
+        built_at: float,
+    ) -> None:
+        version = f"snapshot-{uuid7().hex}"
+        path = os.path.join(self.path, version)
+        os.makedirs(path)
+        options = _snapshot_options()
+        VectorEngine.build(
+            options["similarity"],
+            vectors,
+            options["quantized"],
+            options["ivf_lists"],
+        ).save(path)
+        with open(os.path.join(path, "documents.json"), "w") as documents_file:
+            json.dump(documents, documents_file)
+        with open(os.path.join(path, "state.json"), "w") as state_file:
+            json.dump(
+                {
+                    "options": options,
+                    "updated_at": updated_at,
+                    "index_uuid": index_uuid,
+                    "count": len(documents),
+                    # Kept by compactions, which do not see deletions
+                    "built_at": built_at,
+                },
+                state_file,
+            )
+        link = os.path.join(self.path, f".{version}")
+        os.symlink(path, link)
+        os.replace(link, os.path.join(self.path, SNAPSHOT_LINK))
+        # Workers still using an old snapshot keep their mapped files
+        for name in os.listdir(self.path):
+            if name.startswith("snapshot-") and name != version:
+                shutil.rmtree(
+                    os.path.join(self.path, name), ignore_errors=True
+                )
+
+    def _set_base(
+        self,
+        engine: VectorEngine,
+        documents: list[list[Any]],
+        state: dict[str, Any],
+    ) -> None:
+        self.base = engine
+        self.base_ids = [document[0] for document in documents]
+        self.base_rows = {id: row for row, id in enumerate(self.base_ids)}
+        self.documents = {
+            document[0]: tuple(document[1:]) for document in documents
+        }
+        self.delta = {}
+        self.delta_engine = None
+        self.delta_ids = []
+        self.updated_at = state["updated_at"]
+        self.index_uuid = state["index_uuid"]
+        self.built_at = state["built_at"]
+        self.cache.clear()
+
+    async def _index_uuid(self, es: AsyncElasticsearch) -> str:
+        """Changes when the index, or the one behind an alias, is recreated"""
+        response = await es.indices.get_settings(
+            index=settings.ELASTIC_VECTOR_INDEX, name="index.uuid"
+        )
+        return ",".join(
+            sorted(
+                index["settings"]["index"]["uuid"]
+                for index in response.body.values()
+            )
+        )
+
+    async def _fetch(
+        self, es: AsyncElasticsearch, since: str | None
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Pages of the documents updated since the given time"""
+        query = (
+            {"match_all": {}}
+            if since is None
+            else {"range": {"updated_at": {"gte": since}}}
+        )
+        pit = await es.open_point_in_time(
+            index=settings.ELASTIC_VECTOR_INDEX, keep_alive=PIT_KEEP_ALIVE
+        )
+        pit_id = pit["id"]
+        search_after = None
+        try:
+            while True:
+                response = await es.search(
+                    pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                    query=query,
+                    sort=[
+                        {
+                            "updated_at": {
+                                "order": "asc",
+                                "missing": "_first",
+                                "unmapped_type": "date",
+                            }
+                        }
+                    ],
+                    size=FETCH_PAGE_SIZE,
+                    search_after=search_after,
+                    source_includes=[
+                        "text",
+                        "metadata",
+                        "vector",
+                        "updated_at",
+                    ],
+                    track_total_hits=False,
+                )
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+                pit_id = response.get("pit_id", pit_id)
+                yield hits
+                search_after = hits[-1]["sort"]
+        finally:
+            await es.close_point_in_time(id=pit_id)
+
+    async def _build(self, es: AsyncElasticsearch, index_uuid: str) -> bool:
+        count = await es.count(index=settings.ELASTIC_VECTOR_INDEX)
+        if count["count"] > settings.VECTOR_LOCAL_INDEX_MAX_SIZE:
+            logging.warning(
+                f"{settings.ELASTIC_VECTOR_INDEX} has {count['count']} "
+                "vectors, too many for the local vector index"
+            )
+            return False
+        pages = []
+        documents = []
+        updated_at = None
+        async for hits in self._fetch(es, None):
+            pages.append(
+                np.asarray(
+                    [hit["_source"]["vector"] for hit in hits],
+                    dtype=np.float32,
+                )
+            )
+            for hit in hits:
+                source = hit["_source"]
+                documents.append(
+                    [
+                        hit["_id"],
+                        source.get("text"),
+                        source.get("metadata"),
+                        source.get("updated_at"),
+                    ]
+                )
+                updated_at = source.get("updated_at") or updated_at
+        vectors = (
+            np.concatenate(pages)
+            if pages
+            else np.empty((0, settings.ELASTIC_VECTOR_DIMS), np.float32)
+        )
+        await asyncify(self._write_snapshot)(
+            vectors, documents, updated_at, index_uuid, time.time()
+        )
+        return True
+
+    async def _open(self, es: AsyncElasticsearch) -> None:
+        index_uuid = await self._index_uuid(es)
+        snapshot = await asyncify(self._load_snapshot)(index_uuid)
+        if snapshot is None:
+            async with self._snapshot_lock():
+                # Another worker may have written it in the meantime
+                snapshot = await asyncify(self._load_snapshot)(index_uuid)
+                if snapshot is None:
+                    if not await self._build(es, index_uuid):
+                        return
+                    snapshot = await asyncify(self._load_snapshot)(
+                        index_uuid
+                    )
+        self._set_base(*snapshot)
+        await self._refresh(es)
+
+    async def _rebuild(self, es: AsyncElasticsearch, index_uuid: str) -> None:
+        async with self._snapshot_lock():
+            snapshot = await asyncify(self._load_snapshot)(index_uuid)
+            # Unless another worker already read a newer one
+            if snapshot is None or snapshot[2]["built_at"] <= self.built_at:
+                if not await self._build(es, index_uuid):
+                    self.base = None
+                    self.ready = False
+                    self.cache.clear()
+                    return
+                snapshot = await asyncify(self._load_snapshot)(index_uuid)
+        self._set_base(*snapshot)
+
+    async def _compact(self) -> None:
+        """Writes the base and the delta into a new snapshot"""
+        async with self._snapshot_lock():
+            snapshot = await asyncify(self._load_snapshot)(self.index_uuid)
+            if snapshot is not None and (snapshot[2]["updated_at"] or "") >= (
+                self.updated_at or ""
+            ):
+                # Another worker already merged the same changes
+                self._set_base(*snapshot)
+                return
+            live_rows = np.flatnonzero(self.base.live)
+            vectors = np.concatenate(
+                [
+                    self.base.dequantize(live_rows),
+                    np.asarray(list(self.delta.values()), dtype=np.float32),
+                ]
+            )
+            ids = [self.base_ids[row] for row in live_rows] + list(self.delta)
+            documents = [[id, *self.documents[id]] for id in ids]
+            await asyncify(self._write_snapshot)(
+                vectors,
+                documents,
+                self.updated_at,
+                self.index_uuid,
+                self.built_at,
+            )
+            snapshot = await asyncify(self._load_snapshot)(self.index_uuid)
+            if snapshot is not None:
+                self._set_base(*snapshot)
+
+    async def _refresh(self, es: AsyncElasticsearch) -> None:
+        index_uuid = await self._index_uuid(es)
+        if (
+            index_uuid != self.index_uuid
+            or time.time() - self.built_at
+            > settings.VECTOR_LOCAL_INDEX_REBUILD_INTERVAL
+        ):
+            await self._rebuild(es, index_uuid)
+            return
+        since = None
+        if self.updated_at is not None:
+            overlap = timedelta(
+                seconds=settings.VECTOR_LOCAL_INDEX_REFRESH_OVERLAP
+            )
+            since = (
+                datetime.fromisoformat(self.updated_at) - overlap
+            ).isoformat()
+        changes = {}
+        async for hits in self._fetch(es, since):
+            for hit in hits:
+                source = hit["_source"]
+                known = self.documents.get(hit["_id"])
+                # Documents read again because of the overlap are skipped
+                if known is None or known[2] != source.get("updated_at"):
+                    changes[hit["_id"]] = source
+        if changes:
+            self._apply(changes)
+            if len(self.delta) >= settings.VECTOR_LOCAL_INDEX_COMPACT_SIZE:
+                await self._compact()
+
+        # Fewer documents in the index than read means some were deleted
+        count = await es.count(index=settings.ELASTIC_VECTOR_INDEX)
+        if count["count"] < len(self.documents):
+            await self._rebuild(es, index_uuid)
+
+    def _apply(self, changes: dict[str, dict[str, Any]]) -> None:
+        # Applied at once so searches never see a partial refresh
+        for id, source in changes.items():
+            self.delta[id] = source["vector"]
+            self.documents[id] = (
+                source.get("text"),
+                source.get("metadata"),
+                source.get("updated_at"),
+            )
+            row = self.base_rows.get(id)
+            if row is not None:
+                self.base.live[row] = False
+            if source.get("updated_at") is not None:
+                self.updated_at = max(
+                    self.updated_at or "", source["updated_at"]
+                )
+        self.delta_ids = list(self.delta)
+        self.delta_engine = VectorEngine.build(
+            settings.ELASTIC_VECTOR_SIMILARITY.value,
+            np.asarray(list(self.delta.values()), dtype=np.float32),
+        )
+        self.cache.clear()
+
+    def _search(
+        self,
+        engines: tuple[tuple[VectorEngine | None, list[str]], ...],
+        documents: Documents,
+        query: np.ndarray,
+        k: int,
+    ) -> list[ITextVectorSearchRead]:
+        candidates = []
+        for engine, ids in engines:
+            if engine is None:
+                continue
+            rows, scores = engine.search(
+                query, k, settings.VECTOR_LOCAL_INDEX_IVF_PROBES
+            )
+            candidates.extend(
+                (float(score), ids[row]) for row, score in zip(rows, scores)
+            )
+        candidates.sort(key=lambda candidate: -candidate[0])
+        neighbors = []
+        for score, id in candidates[:k]:
+            text, metadata, _ = documents[id]
+            neighbors.append(
+                ITextVectorSearchRead(
+                    id=id, score=score, text=text, metadata=metadata
+                )
+            )
+        return neighbors
+
+    async def search(
+        self, text_vector: ITextVectorSearch
+    ) -> list[ITextVectorSearchRead] | None:
+        """None when the search has to be sent to Elasticsearch"""
+        if (
+            not self.ready
+            or text_vector.filter
+            or text_vector.include_vector
+        ):
+            local_vector_searches.labels("fallback").inc()
+            return None
+        query = self.base.prepare(text_vector.vector)
+        key = (hashlib.sha256(query.tobytes()).hexdigest(), text_vector.k)
+        neighbors = self.cache.get(key)
+        if neighbors is None:
+            local_vector_searches.labels("search").inc()
+            # Scanning the vectors would block the event loop. The engines
+            # are read here as a refresh may replace them meanwhile.
+            neighbors = await asyncify(self._search)(
+                (
+                    (self.base, self.base_ids),
+                    (self.delta_engine, self.delta_ids),
+                ),
+                self.documents,
+                query,
+                text_vector.k,
+            )
+            self.cache.set(key, neighbors)
+        else:
+            local_vector_searches.labels("cache").inc()
+        return neighbors
+
+
+local_vector_index = LocalVectorIndex(settings.VECTOR_LOCAL_INDEX_PATH)
@@ -1,10 +1,18 @@
 # https://github.com/Longdh57/fastapi-minio
 
-from datetime import timedelta
+import threading
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO
 
+import certifi
+import urllib3
+from asyncer import asyncify
 from minio import Minio
 from pydantic import BaseModel
 
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.utils.ttl_cache import TTLCache
 from travel_ai_backend.app.utils.uuid6 import uuid7
 
 
@@ -15,6 +23,14 @@ class IMinioResponse(BaseModel):
 
 
 class MinioClient:
+    """
+    The Minio SDK is blocking, every network call has an async counterpart
+    which runs it in a worker thread. A single instance is shared per
+    process so the urllib3 connection pool is reused between requests.
+    """
+
+    _instance: "MinioClient | None" = None
+
     def __init__(
         self,
         minio_url: str,
@@ -31,23 +47,92 @@ class MinioClient:
             access_key=self.access_key,
             secret_key=self.secret_key,
             secure=False,
-            # region="my-region"
+            region=settings.MINIO_REGION,
+            http_client=urllib3.PoolManager(
+                maxsize=settings.MINIO_POOL_MAXSIZE,
+                timeout=urllib3.Timeout(
+                    connect=settings.MINIO_CONNECT_TIMEOUT,
+                    read=settings.MINIO_READ_TIMEOUT,
+                ),
+                cert_reqs="CERT_REQUIRED",
+                ca_certs=certifi.where(),
+                retries=urllib3.Retry(
+                    total=5,
+                    backoff_factor=0.2,
+                    status_forcelist=[500, 502, 503, 504],
+                ),
+            ),
+        )
+        # Presigned URLs are valid for MINIO_PRESIGNED_URL_EXPIRES, a cached
+        # one is always returned with most of its lifetime left
+        self.presigned_urls = TTLCache(
+            maxsize=settings.MINIO_PRESIGNED_URL_CACHE_MAXSIZE,
+            ttl=settings.MINIO_PRESIGNED_URL_CACHE_TTL,
         )
-        self.make_bucket()
+        # Uploads presign from worker threads
+        self._presigned_urls_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "MinioClient":
+        if cls._instance is None:
+            cls._instance = cls(
+                access_key=settings.MINIO_ROOT_USER,
+                secret_key=settings.MINIO_ROOT_PASSWORD,
+                bucket_name=settings.MINIO_BUCKET,
+                minio_url=settings.MINIO_URL,
+            )
+        return cls._instance
+
+    @classmethod
+    def close_instance(cls) -> None:
+        if cls._instance is not None:
+            cls._instance.client._http.clear()
+            cls._instance = None
 
     def make_bucket(self) -> str:
         if not self.client.bucket_exists(self.bucket_name):
             self.client.make_bucket(self.bucket_name)
         return self.bucket_name
 
-    def presigned_get_object(self, bucket_name, object_name):
-        # Request URL expired after 7 days
-        url = self.client.presigned_get_object(
-            bucket_name=bucket_name,
-            object_name=object_name,
-            expires=timedelta(days=7),
-        )
-        return url
+    async def make_bucket_async(self) -> str:
+        return await asyncify(self.make_bucket)()
+
+    def presigned_get_object(self, bucket_name: str, object_name: str) -> str:
+        return self.presigned_get_objects(bucket_name, [object_name])[
+            object_name
+        ]
+
+    def presigned_get_objects(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> dict[str, str]:
+        """
+        Presigns several objects at once, every missing URL is signed with
+        the same request date. The signature is computed locally.
+        """
+        urls: dict[str, str] = {}
+        missing: list[str] = []
+        with self._presigned_urls_lock:
+            for object_name in object_names:
+                url = self.presigned_urls.get((bucket_name, object_name))
+                if url is None:
+                    missing.append(object_name)
+                else:
+                    urls[object_name] = url
+            if not missing:
+                return urls
+            request_date = datetime.now(timezone.utc)
+            for object_name in missing:
+                url = self.client.presigned_get_object(
+                    bucket_name=bucket_name,
+                    object_name=object_name,
+                    expires=timedelta(
+                        seconds=settings.MINIO_PRESIGNED_URL_EXPIRES
+                    ),
+                    request_date=request_date,
+                )
+                self.presigned_urls.set((bucket_name, object_name), url)
+                urls[object_name] = url
+        return urls
 
     def check_file_name_exists(self, bucket_name, file_name):
         try:
@@ -59,23 +144,30 @@ class MinioClient:
             print(f"[x] Exception: {e}")
             return False
 
-    def put_object(self, file_data, file_name, content_type):
-        try:
-            object_name = f"{uuid7()}{file_name}"
-            self.client.put_object(
-                bucket_name=self.bucket_name,
-                object_name=object_name,
-                data=file_data,
-                content_type=content_type,
-                length=-1,
-                part_size=10 * 1024 * 1024,
-            )
-            url = self.presigned_get_object(
-                bucket_name=self.bucket_name, object_name=object_name
-            )
-            data_file = IMinioResponse(
-                bucket_name=self.bucket_name, file_name=object_name, url=url
-            )
-            return data_file
-        except Exception as e:
-            raise e
+    def put_object(
+        self, file_data: BinaryIO, file_name: str, content_type: str
+    ) -> IMinioResponse:
+        # With an unknown length the file is sent as a multipart upload,
+        # one part_size chunk at a time
+        object_name = f"{uuid7()}{file_name}"
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            data=file_data,
+            content_type=content_type,
+            length=-1,
+            part_size=settings.MINIO_PART_SIZE,
+        )
+        url = self.presigned_get_object(
+            bucket_name=self.bucket_name, object_name=object_name
+        )
+        return IMinioResponse(
+            bucket_name=self.bucket_name, file_name=object_name, url=url
+        )
+
+    async def put_object_async(
+        self, file_data: BinaryIO, file_name: str, content_type: str
+    ) -> IMinioResponse:
+        return await asyncify(self.put_object)(
+            file_data=file_data, file_name=file_name, content_type=content_type
+        )
@@ -0,0 +1,89 @@
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.db.session import RedisClient
+from travel_ai_backend.app.schemas.user_schema import IUserPrincipal
+from travel_ai_backend.app.utils.ttl_cache import TTLCache
+
+# Short-lived per worker tier, other workers see an invalidation once their
+# local entry expires
+local_principals = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_LOCAL_MAXSIZE,
+    ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+)
+
+
+def _principal_key(user_id: UUID | str) -> str:
+    return f"user:{user_id}:principal"
+
+
+def _version_key(user_id: UUID | str) -> str:
+    return f"user:{user_id}:principal_version"
+
+
+async def get_principal(
+    redis_client: Redis,
+    user_id: UUID | str,
+    loader: Callable[[UUID | str], Awaitable[IUserPrincipal | None]],
+) -> IUserPrincipal | None:
+    """
+    Resolves a user principal from the local tier, then from Redis and
+    finally from the database through `loader`. An entry stored in Redis is
+    only trusted if its version matches the current version counter of the
+    user, so a value loaded concurrently with an invalidation is discarded.
+    """
+    principal = local_principals.get(str(user_id))
+    if principal is not None:
+        return principal
+
+    cached, version = await redis_client.mget(
+        _principal_key(user_id), _version_key(user_id)
+    )
+    version = int(version or 0)
+    if cached is not None:
+        principal = IUserPrincipal.model_validate_json(cached)
+        if principal.version == version:
+            local_principals.set(str(user_id), principal)
+            return principal
+
+    principal = await loader(user_id)
+    if principal is None:
+        return None
+    principal.version = version
+    await redis_client.set(
+        _principal_key(user_id),
+        principal.model_dump_json(),
+        ex=settings.PRINCIPAL_CACHE_TTL,
+    )
+    local_principals.set(str(user_id), principal)
+    return principal
+
+
+async def invalidate_principals(
+    user_ids: list[UUID | str], redis_client: Redis | None = None
+) -> None:
+    """
+    Must be called after the change has been committed, otherwise a
+    concurrent request could cache the old row under the new version.
+    """
+    if not user_ids:
+        return
+    redis_client = redis_client or RedisClient.get_instance()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            local_principals.pop(str(user_id))
+            pipe.incr(_version_key(user_id))
+            pipe.expire(
+                _version_key(user_id), settings.PRINCIPAL_CACHE_TTL * 2
+            )
+            pipe.delete(_principal_key(user_id))
+        await pipe.execute()
+
+
+async def invalidate_principal(
+    user_id: UUID | str, redis_client: Redis | None = None
+) -> None:
+    await invalidate_principals([user_id], redis_client=redis_client)
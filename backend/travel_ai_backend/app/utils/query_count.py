@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import Select, Table, bindparam, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.util import find_tables
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import CountStrategyEnum, settings
+from travel_ai_backend.app.db.session import RedisClient
+
+# Renders the query with :name parameters so it can be wrapped in text()
+_named_dialect = postgresql.dialect(paramstyle="named")
+
+
+def _generation_key(table_name: str) -> str:
+    return f"count:generation:{table_name}"
+
+
+def _query_tables(query: Select) -> list[str]:
+    tables = find_tables(query, check_columns=True, include_joins=True)
+    return sorted(
+        {table.name for table in tables if isinstance(table, Table)}
+    )
+
+
+def _query_fingerprint(query: Select) -> str:
+    compiled = query.compile(dialect=_named_dialect)
+    payload = json.dumps(
+        [str(compiled), sorted(compiled.params.items())], default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def get_generation(
+    table_names: Iterable[str], redis_client: Redis | None = None
+) -> str:
+    """
+    Write generation of the tables, it changes on every write through the
+    CRUD classes so it can be part of cache keys
+    """
+    redis_client = redis_client or RedisClient.get_instance()
+    table_names = sorted(set(table_names))
+    if not table_names:
+        return ""
+    generations = await redis_client.mget(
+        [_generation_key(table_name) for table_name in table_names]
+    )
+    return ".".join(generation or "0" for generation in generations)
+
+
+async def count_exact(db_session: AsyncSession, query: Select) -> int:
+    response = await db_session.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+    return response.scalar_one()
+
+
+async def count_estimated(db_session: AsyncSession, query: Select) -> int:
+    """
+    Planner estimate of the number of rows: pg_class.reltuples for a whole
+    table, the EXPLAIN row estimate of the query otherwise
+    """
+    query = query.order_by(None)
+    froms = query.get_final_froms()
+    if (
+        query.whereclause is None
+        and len(froms) == 1
+        and isinstance(froms[0], Table)
+        and not query._group_by_clauses
+        and not query._distinct
+    ):
+        response = await db_session.execute(
+            text(
+                "SELECT reltuples FROM pg_class "
+                "WHERE oid = to_regclass(:name)"
+            ),
+            {"name": f'"{froms[0].name}"'},
+        )
+        estimate = response.scalar_one_or_none()
+        # -1 when the table was never analyzed
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+
+    compiled = query.compile(dialect=_named_dialect)
+    explain = text(f"EXPLAIN (FORMAT JSON) {compiled}").bindparams(
+        *(
+            bindparam(key, value, type_=compiled.binds[key].type)
+            for key, value in compiled.params.items()
+        )
+    )
+    response = await db_session.execute(explain)
+    plan = response.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_cached(
+    db_session: AsyncSession, query: Select, redis_client: Redis
+) -> int:
+    """
+    Exact count cached per query fingerprint. The key contains the write
+    generation of every table of the query, so any write through the CRUD
+    classes makes the cached counts of that table unreachable.
+    """
+    key = "count:{}:{}".format(
+        _query_fingerprint(query),
+        await get_generation(_query_tables(query), redis_client),
+    )
+    total = await redis_client.get(key)
+    if total is not None:
+        return int(total)
+    total = await count_exact(db_session, query)
+    await redis_client.set(key, total, ex=settings.PAGINATION_COUNT_CACHE_TTL)
+    return total
+
+
+async def count_query(
+    db_session: AsyncSession,
+    query: Select,
+    strategy: CountStrategyEnum | None = None,
+) -> tuple[int, bool]:
+    """Returns the total and whether it is exact"""
+    strategy = strategy or settings.PAGINATION_COUNT_STRATEGY
+    if strategy == CountStrategyEnum.estimated:
+        estimate = await count_estimated(db_session, query)
+        # Small results are cheap to count exactly
+        if estimate > settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            return estimate, False
+    elif strategy == CountStrategyEnum.cached:
+        try:
+            return (
+                await count_cached(
+                    db_session, query, RedisClient.get_instance()
+                ),
+                True,
+            )
+        except RedisError as e:
+            logging.warning(f"Count cache unavailable: {e}")
+    return await count_exact(db_session, query), True
+
+
+async def invalidate_counts(
+    table_names: Iterable[str], redis_client: Redis | None = None
+) -> None:
+    redis_client = redis_client or RedisClient.get_instance()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for table_name in set(table_names):
+                pipe.incr(_generation_key(table_name))
+            await pipe.execute()
+    except RedisError as e:
+        logging.warning(f"Count cache invalidation failed: {e}")
@@ -0,0 +1,242 @@
+import csv
+import os
+import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from datetime import datetime, timezone
+from enum import Enum
+from io import StringIO
+from typing import Any
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from asyncer import asyncify
+from openpyxl import Workbook
+from sqlalchemy import ColumnElement, DateTime, Select
+from sqlmodel import select
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.db.session import SessionLocal
+from travel_ai_backend.app.models.hero_model import Hero
+from travel_ai_backend.app.models.role_model import Role
+from travel_ai_backend.app.models.team_model import Team
+from travel_ai_backend.app.models.user_model import User
+from travel_ai_backend.app.schemas.report_schema import (
+    FileExtensionEnum,
+    ReportEnum,
+)
+
+XLSX_MEDIA_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+MEDIA_TYPES = {
+    FileExtensionEnum.csv: "text/csv",
+    FileExtensionEnum.xls: XLSX_MEDIA_TYPE,
+    FileExtensionEnum.parquet: "application/vnd.apache.parquet",
+}
+FILE_SUFFIXES = {
+    FileExtensionEnum.csv: "csv",
+    FileExtensionEnum.xls: "xlsx",
+    FileExtensionEnum.parquet: "parquet",
+}
+FILE_CHUNK_SIZE = 64 * 1024
+
+OnBatch = Callable[[int], Awaitable[None]]
+
+
+def get_report_query(report: ReportEnum) -> Select:
+    """Flat rows only, relationships are never loaded"""
+    if report == ReportEnum.heroes:
+        return (
+            select(
+                Hero.id,
+                Hero.name,
+                Hero.secret_name,
+                Hero.age,
+                Team.name.label("team"),
+                Hero.created_by_id,
+                Hero.created_at,
+                Hero.updated_at,
+            )
+            .outerjoin(Team, Hero.team_id == Team.id)
+            .order_by(Hero.id)
+        )
+    return (
+        select(
+            User.id,
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.is_active,
+            User.is_superuser,
+            User.birthdate,
+            User.phone,
+            User.gender,
+            User.state,
+            User.country,
+            User.address,
+            Role.name.label("role"),
+            User.follower_count,
+            User.following_count,
+            User.created_at,
+            User.updated_at,
+        )
+        .outerjoin(Role, User.role_id == Role.id)
+        .order_by(User.id)
+    )
+
+
+def get_report_header(query: Select) -> list[str]:
+    return [column.key for column in query.selected_columns]
+
+
+def _format_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _format_xlsx_value(value: Any) -> Any:
+    value = _format_value(value)
+    # Excel has no time zones
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parquet_type(column: ColumnElement) -> pa.DataType:
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return pa.string()
+    if python_type is bool:
+        return pa.bool_()
+    if python_type is int:
+        return pa.int64()
+    if python_type is float:
+        return pa.float64()
+    # Uuids and enums are exported as text
+    return pa.string()
+
+
+async def iter_report_rows(
+    query: Select, on_batch: OnBatch | None = None
+) -> AsyncIterator[Sequence[Any]]:
+    """
+    Yields the rows in batches of REPORT_EXPORT_BATCH_SIZE read through a
+    server-side cursor, so only one batch is held in memory
+    """
+    async with SessionLocal() as session:
+        result = await session.stream(
+            query.execution_options(
+                yield_per=settings.REPORT_EXPORT_BATCH_SIZE
+            )
+        )
+        async for rows in result.partitions():
+            yield rows
+            if on_batch is not None:
+                await on_batch(len(rows))
+
+
+async def iter_csv(
+    query: Select, on_batch: OnBatch | None = None
+) -> AsyncIterator[str]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(get_report_header(query))
+    async for rows in iter_report_rows(query, on_batch):
+        writer.writerows(
+            [_format_value(value) for value in row] for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def write_csv(
+    query: Select, file_path: str, on_batch: OnBatch | None = None
+) -> None:
+    with open(file_path, "w", newline="") as file:
+        async for chunk in iter_csv(query, on_batch):
+            await asyncify(file.write)(chunk)
+
+
+async def write_xlsx(
+    query: Select, file_path: str, on_batch: OnBatch | None = None
+) -> None:
+    # A write-only workbook flushes every row to a temporary file
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(get_report_header(query))
+
+    def append_rows(rows: Sequence[Any]) -> None:
+        for row in rows:
+            sheet.append([_format_xlsx_value(value) for value in row])
+
+    async for rows in iter_report_rows(query, on_batch):
+        await asyncify(append_rows)(rows)
+    await asyncify(workbook.save)(file_path)
+
+
+async def write_parquet(
+    query: Select, file_path: str, on_batch: OnBatch | None = None
+) -> None:
+    # Every batch is written as its own row group
+    schema = pa.schema(
+        [
+            (column.key, _parquet_type(column))
+            for column in query.selected_columns
+        ]
+    )
+    with pq.ParquetWriter(file_path, schema) as writer:
+        async for rows in iter_report_rows(query, on_batch):
+            table = pa.Table.from_pylist(
+                [
+                    dict(zip(schema.names, map(_format_value, row)))
+                    for row in rows
+                ],
+                schema=schema,
+            )
+            await asyncify(writer.write_table)(table)
+
+
+async def write_report_file(
+    query: Select,
+    file_extension: FileExtensionEnum,
+    file_path: str,
+    on_batch: OnBatch | None = None,
+) -> None:
+    if file_extension == FileExtensionEnum.xls:
+        await write_xlsx(query, file_path, on_batch)
+    elif file_extension == FileExtensionEnum.parquet:
+        await write_parquet(query, file_path, on_batch)
+    else:
+        await write_csv(query, file_path, on_batch)
+
+
+async def iter_file(file_path: str) -> AsyncIterator[bytes]:
+    with open(file_path, "rb") as file:
+        while chunk := await asyncify(file.read)(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+async def iter_report_file(
+    query: Select, file_extension: FileExtensionEnum
+) -> AsyncIterator[bytes]:
+    """Binary formats are written to a temporary file and then streamed"""
+    file_descriptor, file_path = tempfile.mkstemp(
+        suffix=f".{FILE_SUFFIXES[file_extension]}"
+    )
+    os.close(file_descriptor)
+    try:
+        await write_report_file(query, file_extension, file_path)
+        async for chunk in iter_file(file_path):
+            yield chunk
+    finally:
+        os.remove(file_path)
@@ -0,0 +1,179 @@
+import logging
+import os
+import tempfile
+from typing import Any
+
+from asyncer import asyncify
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.db.session import SessionLocal
+from travel_ai_backend.app.schemas.report_schema import (
+    FileExtensionEnum,
+    IReportExportRead,
+    IReportExportStatusEnum,
+    ReportEnum,
+)
+from travel_ai_backend.app.utils.minio_client import MinioClient
+from travel_ai_backend.app.utils.report_export import (
+    FILE_SUFFIXES,
+    MEDIA_TYPES,
+    get_report_query,
+    write_report_file,
+)
+from travel_ai_backend.app.utils.uuid6 import uuid7
+
+
+def _job_key(job_id: str) -> str:
+    return f"report_export:job:{job_id}"
+
+
+def _dedupe_key(report: ReportEnum, file_extension: FileExtensionEnum) -> str:
+    return f"report_export:dedupe:{report.value}:{file_extension.value}"
+
+
+async def create_export_job(
+    redis_client: Redis,
+    report: ReportEnum,
+    file_extension: FileExtensionEnum,
+) -> tuple[str, bool]:
+    """
+    Returns the job id and whether the job is new. While an identical
+    export is pending or running its job id is returned instead.
+    """
+    dedupe_key = _dedupe_key(report, file_extension)
+    job_id = str(uuid7())
+    # The job exists before its id can be handed to an identical request
+    job_key = _job_key(job_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(
+            job_key,
+            mapping={
+                "report": report.value,
+                "file_extension": file_extension.value,
+                "status": IReportExportStatusEnum.pending.value,
+                "rows_exported": 0,
+            },
+        )
+        pipe.expire(job_key, settings.REPORT_EXPORT_JOB_TTL)
+        await pipe.execute()
+
+    while True:
+        created = await redis_client.set(
+            dedupe_key,
+            job_id,
+            nx=True,
+            ex=settings.REPORT_EXPORT_JOB_TIMEOUT,
+        )
+        if created:
+            break
+        running_job_id = await redis_client.get(dedupe_key)
+        if running_job_id is not None:
+            await redis_client.delete(job_key)
+            return running_job_id, False
+    return job_id, True
+
+
+async def get_export_job(
+    redis_client: Redis, job_id: str
+) -> IReportExportRead | None:
+    job = await redis_client.hgetall(_job_key(job_id))
+    if not job:
+        return None
+
+    url = None
+    if job["status"] == IReportExportStatusEnum.success:
+        url = MinioClient.get_instance().presigned_get_object(
+            bucket_name=settings.MINIO_BUCKET, object_name=job["object_name"]
+        )
+    rows_total = int(job["rows_total"]) if "rows_total" in job else None
+    rows_exported = int(job["rows_exported"])
+    progress = None
+    if rows_total is not None:
+        progress = min(rows_exported / rows_total, 1.0) if rows_total else 1.0
+    return IReportExportRead(
+        id=job_id,
+        report=job["report"],
+        file_extension=job["file_extension"],
+        status=job["status"],
+        rows_total=rows_total,
+        rows_exported=rows_exported,
+        progress=progress,
+        url=url,
+        error=job.get("error"),
+    )
+
+
+async def _update_export_job(
+    redis_client: Redis, job_id: str, **fields: Any
+) -> None:
+    await redis_client.hset(_job_key(job_id), mapping=fields)
+
+
+async def _release_dedupe_keys(redis_client: Redis, job_id: str) -> None:
+    for report in ReportEnum:
+        for file_extension in FileExtensionEnum:
+            dedupe_key = _dedupe_key(report, file_extension)
+            if await redis_client.get(dedupe_key) == job_id:
+                await redis_client.delete(dedupe_key)
+
+
+async def run_export_job(redis_client: Redis, job_id: str) -> None:
+    """Writes the report to a temporary file and uploads it to MinIO"""
+    job_key = _job_key(job_id)
+    job = await redis_client.hgetall(job_key)
+    if not job:
+        # Expired before the task ran, its dedupe key would block identical
+        # exports until the timeout
+        logging.warning(f"Report export {job_id} not found")
+        await _release_dedupe_keys(redis_client, job_id)
+        return
+    report = ReportEnum(job["report"])
+    file_extension = FileExtensionEnum(job["file_extension"])
+    query = get_report_query(report)
+
+    async with SessionLocal() as session:
+        rows_total = await session.scalar(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+    await _update_export_job(
+        redis_client,
+        job_id,
+        status=IReportExportStatusEnum.running.value,
+        rows_total=rows_total,
+    )
+
+    async def on_batch(rows_count: int) -> None:
+        await redis_client.hincrby(job_key, "rows_exported", rows_count)
+
+    suffix = FILE_SUFFIXES[file_extension]
+    file_descriptor, file_path = tempfile.mkstemp(suffix=f".{suffix}")
+    os.close(file_descriptor)
+    try:
+        await write_report_file(query, file_extension, file_path, on_batch)
+        with open(file_path, "rb") as file:
+            # Sent as a multipart upload, the file is never fully in memory
+            data_file = await MinioClient.get_instance().put_object_async(
+                file_data=file,
+                file_name=f"_{report.value}.{suffix}",
+                content_type=MEDIA_TYPES[file_extension],
+            )
+        await _update_export_job(
+            redis_client,
+            job_id,
+            status=IReportExportStatusEnum.success.value,
+            object_name=data_file.file_name,
+        )
+    except Exception as e:
+        logging.exception(f"Report export {job_id} failed")
+        await _update_export_job(
+            redis_client,
+            job_id,
+            status=IReportExportStatusEnum.failure.value,
+            error=str(e),
+        )
+        raise
+    finally:
+        await asyncify(os.remove)(file_path)
+        await redis_client.delete(_dedupe_key(report, file_extension))
@@ -1,5 +1,5 @@
 from io import BytesIO
-from typing import Any
+from typing import Any, BinaryIO
 
 from PIL import Image
 from pydantic import BaseModel
@@ -31,3 +31,21 @@ def modify_image(image: BytesIO):
         file_format=file_format,
         file_data=in_mem_file.getvalue(),
     )
+
+
+class IImageInfo(BaseModel):
+    width: int
+    height: int
+    file_format: str
+
+
+def read_image_info(image: BinaryIO) -> IImageInfo:
+    # Image.open only parses the header, the pixel data is never loaded
+    with Image.open(image) as pil_image:
+        image_info = IImageInfo(
+            width=pil_image.width,
+            height=pil_image.height,
+            file_format=pil_image.format,
+        )
+    image.seek(0)
+    return image_info
@@ -0,0 +1,222 @@
+import logging
+from collections.abc import AsyncIterator, Iterable, Sequence
+from typing import Any, TypeVar
+from uuid import UUID
+
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import Select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.models.hero_model import Hero
+from travel_ai_backend.app.models.team_model import Team
+from travel_ai_backend.app.models.user_model import User
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
+
+T = TypeVar("T")
+
+SEARCH_MODELS = {
+    SearchEntityEnum.heroes: Hero,
+    SearchEntityEnum.teams: Team,
+    SearchEntityEnum.users: User,
+}
+# Text fields matched by the name query, the first one weighs the most
+SEARCH_FIELDS = {
+    SearchEntityEnum.heroes: ["name", "secret_name"],
+    SearchEntityEnum.teams: ["name", "headquarters"],
+    SearchEntityEnum.users: ["full_name"],
+}
+REINDEX_BATCH_SIZE = 1000
+
+
+def search_index_name(entity: SearchEntityEnum) -> str:
+    return f"{settings.ELASTIC_SEARCH_INDEX_PREFIX}_{entity.value}"
+
+
+def _document_query(entity: SearchEntityEnum) -> Select:
+    if entity == SearchEntityEnum.heroes:
+        return select(
+            Hero.id,
+            Hero.name,
+            Hero.secret_name,
+            Hero.age,
+            Hero.team_id,
+            Team.name.label("team_name"),
+            Hero.created_at,
+        ).outerjoin(Team, Team.id == Hero.team_id)
+    if entity == SearchEntityEnum.teams:
+        return select(Team.id, Team.name, Team.headquarters, Team.created_at)
+    return select(
+        User.id,
+        User.full_name,
+        User.email,
+        User.is_active,
+        User.role_id,
+        User.created_at,
+    )
+
+
+def _index_action(
+    entity: SearchEntityEnum, row: dict[str, Any]
+) -> dict[str, Any]:
+    return {
+        "_op_type": "index",
+        "_index": search_index_name(entity),
+        "_id": str(row["id"]),
+        "_source": {key: value for key, value in row.items() if key != "id"},
+    }
+
+
+async def get_documents(
+    entity: SearchEntityEnum,
+    ids: Iterable[UUID],
+    db_session: AsyncSession,
+) -> dict[UUID, dict[str, Any]]:
+    """Current documents of the rows, deleted rows are missing"""
+    model = SEARCH_MODELS[entity]
+    response = await db_session.execute(
+        _document_query(entity).where(model.id.in_(list(ids)))
+    )
+    return {row["id"]: dict(row) for row in response.mappings().all()}
+
+
+def sync_actions(
+    entity: SearchEntityEnum,
+    ids: Iterable[UUID],
+    documents: dict[UUID, dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Indexes the stored rows and deletes the documents of removed ones"""
+    actions = []
+    for id in ids:
+        if id in documents:
+            actions.append(_index_action(entity, documents[id]))
+        else:
+            actions.append(
+                {
+                    "_op_type": "delete",
+                    "_index": search_index_name(entity),
+                    "_id": str(id),
+                }
+            )
+    return actions
+
+
+async def bulk_index(
+    es: AsyncElasticsearch,
+    actions: Iterable[dict[str, Any]] | AsyncIterator[dict[str, Any]],
+) -> tuple[int, int]:
+    """
+    Sends the actions with the bulk API and returns the successful and
+    failed counts. Deleting a missing document is not a failure.
+    """
+    success, errors = await async_bulk(
+        es,
+        actions,
+        chunk_size=settings.SEARCH_SYNC_BATCH_SIZE,
+        raise_on_error=False,
+        stats_only=False,
+    )
+    failed = [
+        error
+        for error in errors
+        if error.get("delete", {}).get("status") != 404
+    ]
+    for error in failed[:10]:
+        logging.warning(f"Search index update failed: {error}")
+    return success, len(failed)
+
+
+async def reindex(
+    es: AsyncElasticsearch,
+    entity: SearchEntityEnum,
+    db_session: AsyncSession,
+) -> tuple[int, int]:
+    """Streams every row of the entity into its index"""
+
+    async def actions() -> AsyncIterator[dict[str, Any]]:
+        response = await db_session.stream(
+            _document_query(entity).execution_options(
+                yield_per=REINDEX_BATCH_SIZE
+            )
+        )
+        async for row in response.mappings():
+            yield _index_action(entity, dict(row))
+
+    return await bulk_index(es, actions())
+
+
+def build_name_query(
+    entity: SearchEntityEnum, name: str
+) -> dict[str, Any]:
+    """
+    Matches misspelled names, names starting with the query and names
+    sharing a stem in one of the supported languages
+    """
+    fields = SEARCH_FIELDS[entity]
+    weighted = [f"{fields[0]}^2", *fields[1:]]
+    query: dict[str, Any] = {
+        "bool": {
+            "should": [
+                {
+                    "multi_match": {
+                        "query": name,
+                        "fields": weighted,
+                        "fuzziness": "AUTO",
+                        "prefix_length": 1,
+                    }
+                },
+                {
+                    "multi_match": {
+                        "query": name,
+                        "fields": [f"{field}.prefix" for field in weighted],
+                        "operator": "and",
+                    }
+                },
+                {
+                    "multi_match": {
+                        "query": name,
+                        "fields": [
+                            f"{field}.{language}"
+                            for field in fields
+                            for language in ("english", "russian")
+                        ],
+                    }
+                },
+            ],
+            "minimum_should_match": 1,
+        }
+    }
+    if entity == SearchEntityEnum.users:
+        query["bool"]["filter"] = [{"term": {"is_active": True}}]
+    return query
+
+
+async def search_ids(
+    es: AsyncElasticsearch,
+    entity: SearchEntityEnum,
+    name: str,
+    limit: int,
+) -> list[UUID] | None:
+    """Ids of the best matches, None when the index is unavailable"""
+    try:
+        response = await es.search(
+            index=search_index_name(entity),
+            query=build_name_query(entity, name),
+            size=limit,
+            source=False,
+            track_total_hits=False,
+        )
+    except (ApiError, TransportError) as e:
+        logging.warning(f"Search index unavailable: {e}")
+        return None
+    return [UUID(hit["_id"]) for hit in response["hits"]["hits"]]
+
+
+def order_by_ids(objs: Sequence[T], ids: list[UUID]) -> list[T]:
+    """Orders the objects loaded by id as ranked by the search"""
+    rank = {id: position for position, id in enumerate(ids)}
+    return sorted(
+        (obj for obj in objs if obj.id in rank), key=lambda obj: rank[obj.id]
+    )
@@ -0,0 +1,247 @@
+import logging
+import os
+import socket
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+from uuid import UUID
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockNotOwnedError, ResponseError
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.db.session import AppSession
+from travel_ai_backend.app.models.hero_model import Hero
+from travel_ai_backend.app.models.search_change_model import SearchChange
+from travel_ai_backend.app.schemas.search_schema import SearchEntityEnum
+from travel_ai_backend.app.utils.search_index import (
+    SEARCH_MODELS,
+    bulk_index,
+    get_documents,
+    sync_actions,
+)
+
+SEARCH_ENTITIES = {model: entity for entity, model in SEARCH_MODELS.items()}
+CHANGES_KEY = "search_changes"
+CONSUMER_GROUP = "search_indexer"
+SYNC_LOCK_KEY = "search_sync:lock"
+# Renewed after every batch
+SYNC_LOCK_TIMEOUT = 60
+
+
+def record_changes(
+    db_session: Session | AsyncSession, model: type, ids: Iterable[UUID]
+) -> None:
+    """
+    Queues rows changed by bulk statements, which the session does not
+    track, for the outbox written on commit
+    """
+    entity = SEARCH_ENTITIES.get(model)
+    if entity is not None:
+        changes = db_session.info.setdefault(CHANGES_KEY, set())
+        changes.update((entity, id) for id in ids)
+
+
+@event.listens_for(AppSession, "after_flush")
+def _collect_changes(session: Session, flush_context: Any) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        entity = SEARCH_ENTITIES.get(type(obj))
+        if entity is not None:
+            session.info.setdefault(CHANGES_KEY, set()).add((entity, obj.id))
+
+
+@event.listens_for(AppSession, "before_commit")
+def _write_changes(session: Session) -> None:
+    """
+    The changes are stored in the committed transaction, so they reach the
+    stream even when Redis is down at commit time
+    """
+    # Pending objects are otherwise flushed after this hook
+    session.flush()
+    changes = session.info.pop(CHANGES_KEY, None)
+    if changes:
+        session.execute(
+            insert(SearchChange),
+            [
+                {"entity": entity.value, "entity_id": id}
+                for entity, id in changes
+            ],
+        )
+
+
+@event.listens_for(AppSession, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(CHANGES_KEY, None)
+
+
+async def publish_changes(
+    redis_client: Redis, changes: Iterable[tuple[SearchEntityEnum, UUID]]
+) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for entity, id in changes:
+            pipe.xadd(
+                settings.SEARCH_SYNC_STREAM,
+                {"entity": entity.value, "id": str(id)},
+                maxlen=settings.SEARCH_SYNC_STREAM_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+
+
+def _consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def _create_consumer_group(redis_client: Redis) -> None:
+    try:
+        await redis_client.xgroup_create(
+            settings.SEARCH_SYNC_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def relay_changes(redis_client: Redis, db_session: AsyncSession) -> int:
+    """
+    Moves the committed changes from the outbox to the stream and returns
+    their number. The rows are deleted once published, a failed publish
+    rolls back and leaves them for the next run.
+    """
+    relayed = 0
+    while True:
+        batch = (
+            select(SearchChange.id)
+            .order_by(SearchChange.id)
+            .limit(settings.SEARCH_SYNC_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        response = await db_session.execute(
+            delete(SearchChange)
+            .where(SearchChange.id.in_(batch))
+            .returning(SearchChange.entity, SearchChange.entity_id)
+        )
+        changes = response.all()
+        if not changes:
+            await db_session.rollback()
+            return relayed
+        await publish_changes(
+            redis_client,
+            ((SearchEntityEnum(entity), id) for entity, id in changes),
+        )
+        # Changes published again after a failed commit index the same
+        # rows twice
+        await db_session.commit()
+        relayed += len(changes)
+
+
+async def _read_changes(
+    redis_client: Redis, consumer: str
+) -> list[tuple[str, dict[str, str]]]:
+    """
+    Changes left pending by a failed run first, then new ones
+    """
+    _, messages, *_ = await redis_client.xautoclaim(
+        settings.SEARCH_SYNC_STREAM,
+        CONSUMER_GROUP,
+        consumer,
+        min_idle_time=settings.SEARCH_SYNC_RETRY_IDLE * 1000,
+        count=settings.SEARCH_SYNC_BATCH_SIZE,
+    )
+    # Entries trimmed from the stream are claimed without fields
+    messages = [message for message in messages if message[1]]
+    if messages:
+        return messages
+    response = await redis_client.xreadgroup(
+        CONSUMER_GROUP,
+        consumer,
+        {settings.SEARCH_SYNC_STREAM: ">"},
+        count=settings.SEARCH_SYNC_BATCH_SIZE,
+    )
+    return response[0][1] if response else []
+
+
+async def _index_changes(
+    es: AsyncElasticsearch,
+    messages: list[tuple[str, dict[str, str]]],
+    db_session: AsyncSession,
+) -> tuple[int, int]:
+    """
+    Reads the current rows so repeated or reordered changes converge to
+    the stored state
+    """
+    ids = defaultdict(set)
+    for _, fields in messages:
+        ids[SearchEntityEnum(fields["entity"])].add(UUID(fields["id"]))
+    # Hero documents contain the team name
+    if ids[SearchEntityEnum.teams]:
+        response = await db_session.execute(
+            select(Hero.id).where(
+                Hero.team_id.in_(ids[SearchEntityEnum.teams])
+            )
+        )
+        ids[SearchEntityEnum.heroes].update(response.scalars().all())
+
+    actions = []
+    for entity, entity_ids in ids.items():
+        if entity_ids:
+            documents = await get_documents(entity, entity_ids, db_session)
+            actions.extend(sync_actions(entity, entity_ids, documents))
+    # Releases the connection while the bulk request runs
+    await db_session.rollback()
+    return await bulk_index(es, actions)
+
+
+async def sync_search_index(
+    redis_client: Redis,
+    es: AsyncElasticsearch,
+    db_session: AsyncSession,
+) -> int:
+    """
+    Relays the outbox to the change stream, then consumes the stream in
+    batches until it is drained and returns the number of processed
+    changes. A batch is acknowledged once its bulk request completes.
+    """
+    # A concurrent run could index a row read before a change after the
+    # run that indexed the changed row
+    lock = redis_client.lock(SYNC_LOCK_KEY, timeout=SYNC_LOCK_TIMEOUT)
+    if not await lock.acquire(blocking=False):
+        return 0
+    try:
+        return await _sync_search_index(redis_client, es, db_session, lock)
+    finally:
+        try:
+            await lock.release()
+        except LockNotOwnedError:
+            logging.warning("The search sync lock expired")
+
+
+async def _sync_search_index(
+    redis_client: Redis,
+    es: AsyncElasticsearch,
+    db_session: AsyncSession,
+    lock: Lock,
+) -> int:
+    await _create_consumer_group(redis_client)
+    await relay_changes(redis_client, db_session)
+    consumer = _consumer_name()
+    processed = 0
+    while messages := await _read_changes(redis_client, consumer):
+        _, failed = await _index_changes(es, messages, db_session)
+        if failed:
+            logging.warning(f"{failed} search documents failed to index")
+        await redis_client.xack(
+            settings.SEARCH_SYNC_STREAM,
+            CONSUMER_GROUP,
+            *[message_id for message_id, _ in messages],
+        )
+        processed += len(messages)
+        await lock.reacquire()
+    return processed
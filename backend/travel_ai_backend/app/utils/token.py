@@ -1,10 +1,24 @@
 from datetime import timedelta
+from typing import Any
 from uuid import UUID
 
 from redis.asyncio import Redis
 
+from travel_ai_backend.app.core.config import TokenValidationModeEnum, settings
+from travel_ai_backend.app.core.security import decode_token
 from travel_ai_backend.app.models.user_model import User
 from travel_ai_backend.app.schemas.common_schema import TokenType
+from travel_ai_backend.app.utils.token_revocation import (
+    get_token_type,
+    is_token_revoked,
+    revoke_token,
+    revoke_user_tokens,
+)
+
+
+def _token_member(payload: dict[str, Any], token: str) -> str:
+    # Tokens issued before the jti claim was added are stored as they are
+    return payload.get("jti", token)
 
 
 async def add_token_to_redis(
@@ -14,25 +28,57 @@ async def add_token_to_redis(
     token_type: TokenType,
     expire_time: int | None = None,
 ):
+    if settings.TOKEN_VALIDATION_MODE != TokenValidationModeEnum.allowlist:
+        return
     token_key = f"user:{user.id}:{token_type}"
-    valid_tokens = await get_valid_tokens(redis_client, user.id, token_type)
-    await redis_client.sadd(token_key, token)
-    if not valid_tokens:
-        await redis_client.expire(token_key, timedelta(minutes=expire_time))
+    member = _token_member(decode_token(token), token)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(token_key, member)
+        pipe.expire(token_key, timedelta(minutes=expire_time), nx=True)
+        await pipe.execute()
 
 
-async def get_valid_tokens(
+async def has_valid_tokens(
     redis_client: Redis, user_id: UUID, token_type: TokenType
-):
+) -> bool:
     token_key = f"user:{user_id}:{token_type}"
-    valid_tokens = await redis_client.smembers(token_key)
-    return valid_tokens
+    return await redis_client.exists(token_key) > 0
+
+
+async def is_valid_token(
+    redis_client: Redis, payload: dict[str, Any], token: str
+) -> bool:
+    """
+    O(1) check of a decoded token. In allowlist mode a token is valid when
+    the user has no stored tokens or when its id is stored, in revocation
+    mode when its id or the tokens of its user have not been revoked.
+    """
+    if settings.TOKEN_VALIDATION_MODE == TokenValidationModeEnum.revocation:
+        return not await is_token_revoked(redis_client, payload)
+
+    token_key = f"user:{payload['sub']}:{get_token_type(payload)}"
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.exists(token_key)
+        pipe.sismember(token_key, _token_member(payload, token))
+        exists, is_member = await pipe.execute()
+    return not exists or bool(is_member)
+
+
+async def invalidate_token(
+    redis_client: Redis, payload: dict[str, Any], token: str
+) -> None:
+    if settings.TOKEN_VALIDATION_MODE == TokenValidationModeEnum.revocation:
+        await revoke_token(redis_client, payload)
+        return
+    token_key = f"user:{payload['sub']}:{get_token_type(payload)}"
+    await redis_client.srem(token_key, _token_member(payload, token))
 
 
 async def delete_tokens(
     redis_client: Redis, user: User, token_type: TokenType
 ):
+    if settings.TOKEN_VALIDATION_MODE == TokenValidationModeEnum.revocation:
+        await revoke_user_tokens(redis_client, user.id, token_type)
+        return
     token_key = f"user:{user.id}:{token_type}"
-    valid_tokens = await redis_client.smembers(token_key)
-    if valid_tokens is not None:
-        await redis_client.delete(token_key)
+    await redis_client.delete(token_key)
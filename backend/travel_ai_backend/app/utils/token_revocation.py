@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.common_schema import TokenType
+from travel_ai_backend.app.utils.bloom_filter import BloomFilter
+
+# Sorted set of revoked token ids scored by their expiration timestamp
+REVOKED_TOKENS_KEY = "token:revoked"
+# Hash of "{user_id}:{token_type}" -> tokens issued before are revoked
+REVOKED_BEFORE_KEY = "token:revoked_before"
+REVOCATIONS_CHANNEL = "token:revocations"
+
+
+def get_token_type(payload: dict[str, Any]) -> TokenType:
+    if payload.get("type") == "refresh":
+        return TokenType.REFRESH
+    return TokenType.ACCESS
+
+
+def _revoked_before_field(user_id: Any, token_type: TokenType) -> str:
+    return f"{user_id}:{token_type.value}"
+
+
+class TokenRevocationListener:
+    """
+    Keeps an in-process copy of the revocation list: a bloom filter of the
+    revoked token ids and the per user "revoked before" timestamps. It is
+    loaded from Redis on start and kept in sync through Redis pub/sub, so a
+    token that was never revoked is validated without any Redis call.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.revoked_before: dict[str, float] = {}
+        self.ready = False
+        self._task: asyncio.Task | None = None
+
+    async def start(self, redis_client: Redis) -> None:
+        self._task = asyncio.create_task(self._run(redis_client))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.ready = False
+
+    async def _load(self, redis_client: Redis) -> None:
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        revoked_ids = await redis_client.zrangebyscore(
+            REVOKED_TOKENS_KEY, time.time(), "+inf"
+        )
+        for token_id in revoked_ids:
+            bloom.add(token_id)
+        self.bloom = bloom
+        revoked_before = await redis_client.hgetall(REVOKED_BEFORE_KEY)
+        self.revoked_before = {
+            field: float(value) for field, value in revoked_before.items()
+        }
+
+    def _apply(self, message: str) -> bool:
+        """Returns True when the bloom filter has to be rebuilt"""
+        kind, _, value = message.partition(":")
+        if kind == "jti":
+            self.bloom.add(value)
+            return self.bloom.is_full
+        if kind == "user":
+            field, _, revoked_at = value.rpartition(":")
+            self.revoked_before[field] = float(revoked_at)
+        return False
+
+    async def _run(self, redis_client: Redis) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Subscribe before loading so no revocation is missed
+                await pubsub.subscribe(REVOCATIONS_CHANNEL)
+                await self._load(redis_client)
+                self.ready = True
+                async for message in pubsub.listen():
+                    if self._apply(message["data"]):
+                        await self._load(redis_client)
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                self.ready = False
+                logging.warning(f"Token revocation listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    def might_be_revoked(self, payload: dict[str, Any]) -> bool | None:
+        """
+        Returns False when the token is surely valid, True when it has to
+        be checked against Redis and None when the listener is not in sync
+        """
+        if not self.ready:
+            return None
+        field = _revoked_before_field(payload["sub"], get_token_type(payload))
+        revoked_before = self.revoked_before.get(field)
+        if revoked_before is not None:
+            if payload.get("iat", 0) < revoked_before:
+                return True
+        token_id = payload.get("jti")
+        return token_id is not None and self.bloom.might_contain(token_id)
+
+
+revocation_listener = TokenRevocationListener(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+)
+
+
+async def revoke_token(redis_client: Redis, payload: dict[str, Any]) -> None:
+    token_id = payload.get("jti")
+    if token_id is None:
+        return
+    now = time.time()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zadd(REVOKED_TOKENS_KEY, {token_id: payload["exp"]})
+        pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+        pipe.publish(REVOCATIONS_CHANNEL, f"jti:{token_id}")
+        await pipe.execute()
+
+
+async def revoke_user_tokens(
+    redis_client: Redis, user_id: Any, token_type: TokenType
+) -> None:
+    field = _revoked_before_field(user_id, token_type)
+    now = time.time()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(REVOKED_BEFORE_KEY, field, now)
+        pipe.publish(REVOCATIONS_CHANNEL, f"user:{field}:{now}")
+        await pipe.execute()
+
+
+async def is_token_revoked(
+    redis_client: Redis, payload: dict[str, Any]
+) -> bool:
+    if settings.TOKEN_REVOCATION_BLOOM_ENABLED:
+        if revocation_listener.might_be_revoked(payload) is False:
+            return False
+
+    field = _revoked_before_field(payload["sub"], get_token_type(payload))
+    token_id = payload.get("jti")
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hget(REVOKED_BEFORE_KEY, field)
+        if token_id is not None:
+            pipe.zscore(REVOKED_TOKENS_KEY, token_id)
+        result = await pipe.execute()
+
+    revoked_before = result[0]
+    # Tokens issued before the jti/iat claims were added have no "iat"
+    if revoked_before is not None:
+        if payload.get("iat", 0) < float(revoked_before):
+            return True
+    return token_id is not None and result[1] is not None
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import ColumnElement, func, or_
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.models.user_model import User
+from travel_ai_backend.app.utils.query_count import get_generation
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def escape_like(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+
+
+def name_matches(name: str) -> ColumnElement[bool]:
+    """
+    Similar names or names containing the query, both served by the
+    trigram index on full_name
+    """
+    return or_(
+        User.full_name.op("%")(name),
+        User.full_name.ilike(f"%{escape_like(name)}%", escape="\\"),
+    )
+
+
+def name_prefix_matches(prefix: str) -> ColumnElement[bool]:
+    """Names where a word starts with the prefix"""
+    pattern = escape_like(prefix)
+    return or_(
+        User.full_name.ilike(f"{pattern}%", escape="\\"),
+        User.full_name.ilike(f"% {pattern}%", escape="\\"),
+    )
+
+
+def name_score(name: str) -> ColumnElement[float]:
+    return func.similarity(User.full_name, name)
+
+
+async def get_cached_search(
+    redis_client: Redis,
+    kind: str,
+    query: str,
+    limit: int,
+    offset: int,
+    search: Callable[[str], Awaitable[list[dict[str, Any]]]],
+) -> list[dict[str, Any]]:
+    """
+    Results are cached per normalized query, the key contains the write
+    generation of the User table so any user write invalidates them
+    """
+    query = normalize_query(query)
+    try:
+        key = "user_search:{}:{}:{}:{}:{}".format(
+            kind,
+            await get_generation([User.__table__.name], redis_client),
+            hashlib.sha256(query.encode()).hexdigest(),
+            limit,
+            offset,
+        )
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return json.loads(cached)
+    except RedisError as e:
+        logging.warning(f"User search cache unavailable: {e}")
+        return await search(query)
+
+    results = await search(query)
+    try:
+        await redis_client.set(
+            key,
+            json.dumps(results, default=str),
+            ex=settings.USER_SEARCH_CACHE_TTL,
+        )
+    except RedisError as e:
+        logging.warning(f"User search cache update failed: {e}")
+    return results
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from typing import Any
+
+import numpy as np
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_streaming_bulk
+from prometheus_client import Counter, Gauge
+from pydantic import ValidationError
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.text_vector_schema import (
+    IRefreshPolicyEnum,
+    ITextVectorBulkItemRead,
+    ITextVectorBulkRead,
+    ITextVectorCreate,
+)
+from travel_ai_backend.app.utils.vector_codec import VECTOR_DTYPE
+
+vector_bulk_documents = Counter(
+    "elastic_bulk_documents_total",
+    "Vectors sent to Elasticsearch with the bulk API",
+    ["result"],
+)
+vector_bulk_docs_per_second = Gauge(
+    "elastic_bulk_docs_per_second",
+    "Throughput of the last bulk vector load",
+)
+
+# (position, vector or validation error)
+VectorItem = tuple[int, ITextVectorCreate | str]
+
+
+def vector_action(text_vector: ITextVectorCreate) -> dict[str, Any]:
+    action = {
+        "_op_type": "index",
+        "_index": settings.ELASTIC_VECTOR_INDEX,
+        "_source": {
+            "text": text_vector.text,
+            "metadata": text_vector.metadata,
+            "vector": text_vector.vector.tolist(),
+            # Read by the incremental refresh of the local vector index
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+    if text_vector.id is not None:
+        action["_id"] = text_vector.id
+    return action
+
+
+async def iter_items(
+    text_vectors: Iterable[ITextVectorCreate],
+) -> AsyncIterator[VectorItem]:
+    for position, text_vector in enumerate(text_vectors):
+        yield position, text_vector
+
+
+async def iter_ndjson_items(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[VectorItem]:
+    """
+    Parses an ndjson body as it is received, invalid lines are returned
+    as errors so the rest of the upload is still loaded
+    """
+    buffer = b""
+    line_number = 0
+
+    def parse(line: bytes) -> ITextVectorCreate | str:
+        try:
+            return ITextVectorCreate.model_validate(json.loads(line))
+        except ValidationError as e:
+            return "; ".join(error["msg"] for error in e.errors())
+        except ValueError as e:
+            return f"Invalid JSON: {e}"
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, parse(line)
+    if buffer.strip():
+        yield line_number + 1, parse(buffer)
+
+
+async def iter_binary_items(
+    chunks: AsyncIterable[bytes], dims: int
+) -> AsyncIterator[VectorItem]:
+    """
+    Splits an application/octet-stream body of concatenated little-endian
+    float32 vectors into rows as it is received. Rows are views of the
+    received chunks, and their values are checked a chunk at a time.
+    """
+    row_size = dims * VECTOR_DTYPE.itemsize
+    remainder = b""
+    position = 0
+    async for chunk in chunks:
+        data = remainder + chunk if remainder else chunk
+        complete = len(data) - len(data) % row_size
+        remainder = data[complete:]
+        if not complete:
+            continue
+        vectors = np.frombuffer(
+            data, dtype=VECTOR_DTYPE, count=complete // VECTOR_DTYPE.itemsize
+        ).reshape(-1, dims)
+        finite = np.isfinite(vectors).all(axis=1)
+        for vector, is_finite in zip(vectors, finite):
+            if is_finite:
+                item = ITextVectorCreate.model_construct(vector=vector)
+                yield position, item
+            else:
+                yield position, "The vector values must be finite numbers"
+            position += 1
+    if remainder:
+        yield position, (
+            f"Incomplete vector of {len(remainder)} bytes, "
+            f"expected {row_size}"
+        )
+
+
+class VectorBulkLoader:
+    """
+    Indexes vectors with concurrent async_streaming_bulk workers fed from
+    a bounded queue, so an upload is never held in memory
+    """
+
+    def __init__(
+        self,
+        es: AsyncElasticsearch,
+        chunk_size: int = settings.ELASTIC_BULK_CHUNK_SIZE,
+        concurrency: int = settings.ELASTIC_BULK_CONCURRENCY,
+        refresh: IRefreshPolicyEnum = IRefreshPolicyEnum.false,
+        report_all: bool = True,
+    ):
+        self.es = es
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.refresh = refresh
+        # Only failures are reported otherwise, up to a limit
+        self.report_all = report_all
+        self.indexed = 0
+        self.failed = 0
+        self.items: list[ITextVectorBulkItemRead] = []
+
+    def _record(
+        self,
+        position: int,
+        status: int,
+        id: str | None = None,
+        error: Any = None,
+    ) -> None:
+        if error is None:
+            self.indexed += 1
+        else:
+            self.failed += 1
+        if self.report_all or (
+            error is not None
+            and len(self.items) < settings.ELASTIC_BULK_MAX_REPORTED_ERRORS
+        ):
+            self.items.append(
+                ITextVectorBulkItemRead(
+                    position=position,
+                    id=id,
+                    status=status,
+                    error=None if error is None else str(error),
+                )
+            )
+
+    async def _produce(
+        self,
+        items: AsyncIterable[VectorItem],
+        queue: asyncio.Queue,
+    ) -> None:
+        async for position, item in items:
+            if isinstance(item, str):
+                self._record(position, 400, error=item)
+            else:
+                await queue.put((position, vector_action(item)))
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _consume(self, queue: asyncio.Queue) -> None:
+        # Results of a worker come back in the order of its actions
+        positions = deque()
+
+        async def actions() -> AsyncIterator[dict[str, Any]]:
+            while (entry := await queue.get()) is not None:
+                position, action = entry
+                positions.append(position)
+                yield action
+
+        async for ok, result in async_streaming_bulk(
+            self.es,
+            actions(),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=settings.ELASTIC_BULK_MAX_CHUNK_BYTES,
+            raise_on_error=False,
+            raise_on_exception=False,
+            refresh=self.refresh.value,
+        ):
+            item = result["index"]
+            self._record(
+                positions.popleft(),
+                item.get("status", 503),
+                item.get("_id"),
+                None if ok else item.get("error", "Request failed"),
+            )
+
+    async def load(
+        self, items: AsyncIterable[VectorItem]
+    ) -> ITextVectorBulkRead:
+        start_time = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.chunk_size * self.concurrency)
+        tasks = [
+            asyncio.create_task(self._produce(items, queue)),
+            *[
+                asyncio.create_task(self._consume(queue))
+                for _ in range(self.concurrency)
+            ],
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        seconds = time.perf_counter() - start_time
+        docs_per_second = self.indexed / seconds if seconds else 0.0
+        vector_bulk_documents.labels("indexed").inc(self.indexed)
+        vector_bulk_documents.labels("failed").inc(self.failed)
+        vector_bulk_docs_per_second.set(docs_per_second)
+        return ITextVectorBulkRead(
+            index=settings.ELASTIC_VECTOR_INDEX,
+            indexed=self.indexed,
+            failed=self.failed,
+            seconds=round(seconds, 3),
+            docs_per_second=round(docs_per_second, 1),
+            items=sorted(self.items, key=lambda item: item.position),
+        )
@@ -0,0 +1,65 @@
+import base64
+import binascii
+from typing import Any
+
+import numpy as np
+
+# Vectors travel as little-endian float32, whatever the host byte order
+VECTOR_DTYPE = np.dtype("<f4")
+OCTET_STREAM = "application/octet-stream"
+
+
+def check_vectors(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Checks the shape and values of a matrix of vectors at once"""
+    if vectors.ndim != 2 or vectors.shape[1] != dims:
+        raise ValueError(f"The length of the array must be {dims}!")
+    if not np.isfinite(vectors).all():
+        raise ValueError("The vector values must be finite numbers")
+    return vectors
+
+
+def decode_vectors(data: bytes | bytearray | memoryview, dims: int):
+    """
+    Matrix of the concatenated float32 vectors of a binary payload. The
+    matrix is a read-only view of the payload, nothing is copied.
+    """
+    row_size = dims * VECTOR_DTYPE.itemsize
+    if len(data) % row_size:
+        raise ValueError(
+            f"The payload size must be a multiple of {row_size} bytes"
+        )
+    vectors = np.frombuffer(data, dtype=VECTOR_DTYPE).reshape(-1, dims)
+    return check_vectors(vectors, dims)
+
+
+def decode_base64_vector(value: str, dims: int) -> np.ndarray:
+    try:
+        data = base64.b64decode(value, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 vector: {e}")
+    vectors = decode_vectors(data, dims)
+    if len(vectors) != 1:
+        raise ValueError(f"The length of the array must be {dims}!")
+    return vectors[0]
+
+
+def to_vector(value: Any, dims: int) -> np.ndarray:
+    """Float32 vector from a list of numbers or a base64 string"""
+    if isinstance(value, str):
+        return decode_base64_vector(value, dims)
+    try:
+        vector = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("The vector must be a list of numbers")
+    if vector.ndim != 1:
+        raise ValueError("The vector must be a list of numbers")
+    return check_vectors(vector.reshape(1, -1), dims)[0]
+
+
+def encode_vector(vector: Any, as_base64: bool = False) -> list[float] | str:
+    if as_base64:
+        data = np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+        return base64.b64encode(data).decode()
+    if isinstance(vector, np.ndarray):
+        return vector.tolist()
+    return vector
@@ -0,0 +1,231 @@
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+# Rows scored at once by a brute force search, bounds the temporary memory
+BLOCK_ROWS = 65_536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_SIZE = 100_000
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 quantization with one scale per vector"""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def kmeans(vectors: np.ndarray, n_lists: int, seed: int = 0) -> np.ndarray:
+    """Centroids of a sample of the vectors, by Lloyd's algorithm"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > KMEANS_SAMPLE_SIZE:
+        vectors = vectors[rng.choice(len(vectors), KMEANS_SAMPLE_SIZE)]
+    n_lists = min(n_lists, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = nearest_centroids(vectors, centroids)
+        for list_id in range(n_lists):
+            members = vectors[assignments == list_id]
+            if len(members):
+                centroids[list_id] = members.mean(axis=0)
+    return centroids
+
+
+def nearest_centroids(
+    vectors: np.ndarray, centroids: np.ndarray
+) -> np.ndarray:
+    # argmin |x - c|^2 == argmax 2 x.c - |c|^2
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    centroid_norms = (centroids**2).sum(axis=1)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = vectors[start : start + BLOCK_ROWS]
+        assignments[start : start + BLOCK_ROWS] = np.argmax(
+            2 * block @ centroids.T - centroid_norms, axis=1
+        )
+    return assignments
+
+
+def prepare_vectors(vectors: np.ndarray, similarity: str) -> np.ndarray:
+    """Float32 vectors, normalized for the cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if similarity == "cosine":
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+    return vectors
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k best scores, best first"""
+    if k < len(scores):
+        positions = np.argpartition(-scores, k)[:k]
+    else:
+        positions = np.arange(len(scores))
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+class VectorEngine:
+    """
+    Nearest neighbor search over a float32 or int8 matrix, exact or over
+    the closest inverted lists (IVF). Scores match the ones Elasticsearch
+    computes for the same similarity, so results can be mixed.
+    """
+
+    def __init__(
+        self,
+        similarity: str,
+        vectors: np.ndarray,
+        scales: np.ndarray | None = None,
+        sq_norms: np.ndarray | None = None,
+        centroids: np.ndarray | None = None,
+        order: np.ndarray | None = None,
+        offsets: np.ndarray | None = None,
+    ):
+        self.similarity = similarity
+        self.vectors = vectors
+        self.scales = scales
+        self.sq_norms = sq_norms
+        self.centroids = centroids
+        # Rows sorted by inverted list and the start of every list
+        self.order = order
+        self.offsets = offsets
+        # Rows replaced by newer versions are skipped
+        self.live = np.ones(len(vectors), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def dims(self) -> int:
+        return self.vectors.shape[1]
+
+    def prepare(self, vectors: np.ndarray) -> np.ndarray:
+        return prepare_vectors(vectors, self.similarity)
+
+    @classmethod
+    def build(
+        cls,
+        similarity: str,
+        vectors: np.ndarray,
+        quantized: bool = False,
+        n_lists: int = 0,
+    ) -> "VectorEngine":
+        vectors = prepare_vectors(vectors, similarity)
+        scales = None
+        sq_norms = None
+        centroids = order = offsets = None
+        if n_lists and len(vectors) > n_lists:
+            centroids = kmeans(vectors, n_lists)
+            assignments = nearest_centroids(vectors, centroids)
+            order = np.argsort(assignments, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(
+                assignments[order], np.arange(len(centroids) + 1)
+            )
+        if quantized:
+            vectors, scales = quantize(vectors)
+        if similarity == "l2_norm":
+            decoded = vectors if scales is None else vectors * scales[:, None]
+            sq_norms = (decoded.astype(np.float32) ** 2).sum(axis=1)
+        return cls(
+            similarity, vectors, scales, sq_norms, centroids, order, offsets
+        )
+
+    def dequantize(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def _score(self, rows: np.ndarray | slice, query: np.ndarray):
+        raw = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        if self.scales is not None:
+            raw *= self.scales[rows]
+        if self.similarity in ("cosine", "dot_product"):
+            scores = (1 + raw) / 2
+        elif self.similarity == "max_inner_product":
+            scores = np.where(raw < 0, 1 / (1 - raw), raw + 1)
+        else:
+            distances = self.sq_norms[rows] - 2 * raw + query @ query
+            scores = 1 / (1 + np.maximum(distances, 0))
+        return np.where(self.live[rows], scores, -np.inf)
+
+    def _probed_rows(self, query: np.ndarray, n_probes: int) -> np.ndarray:
+        if self.similarity == "l2_norm":
+            centroid_scores = -((self.centroids - query) ** 2).sum(axis=1)
+        else:
+            centroid_scores = self.centroids @ query
+        lists = top_k(centroid_scores, n_probes)
+        rows = np.concatenate(
+            [
+                self.order[self.offsets[list_id] : self.offsets[list_id + 1]]
+                for list_id in lists
+            ]
+        )
+        # Sorted rows are read sequentially from a memory mapped matrix
+        rows.sort()
+        return rows
+
+    def search(
+        self, query: np.ndarray, k: int, n_probes: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the k best live vectors for a prepared query"""
+        if self.centroids is not None:
+            rows = self._probed_rows(query, n_probes)
+            scores = self._score(rows, query)
+        else:
+            rows = []
+            scores = []
+            # The k best of every block, merged below
+            for start in range(0, len(self), BLOCK_ROWS):
+                block_scores = self._score(
+                    slice(start, start + BLOCK_ROWS), query
+                )
+                best = top_k(block_scores, k)
+                rows.append(best + start)
+                scores.append(block_scores[best])
+            if not rows:
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            rows = np.concatenate(rows)
+            scores = np.concatenate(scores)
+        best = top_k(scores, k)
+        best = best[np.isfinite(scores[best])]
+        return rows[best], scores[best]
+
+    def save(self, path: str) -> None:
+        arrays = {
+            "vectors": self.vectors,
+            "scales": self.scales,
+            "sq_norms": self.sq_norms,
+            "centroids": self.centroids,
+            "order": self.order,
+            "offsets": self.offsets,
+        }
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(os.path.join(path, f"{name}.npy"), array)
+        with open(os.path.join(path, "engine.json"), "w") as engine_file:
+            json.dump({"similarity": self.similarity}, engine_file)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorEngine":
+        """The matrix and the list order are memory mapped, not read"""
+        with open(os.path.join(path, "engine.json")) as engine_file:
+            options: dict[str, Any] = json.load(engine_file)
+        arrays = {}
+        for name in (
+            "vectors",
+            "scales",
+            "sq_norms",
+            "centroids",
+            "order",
+            "offsets",
+        ):
+            file_name = os.path.join(path, f"{name}.npy")
+            if os.path.exists(file_name):
+                arrays[name] = np.load(
+                    file_name,
+                    mmap_mode="r" if name in ("vectors", "order") else None,
+                )
+        return cls(options["similarity"], **arrays)
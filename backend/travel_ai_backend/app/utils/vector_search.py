@@ -0,0 +1,137 @@
+import time
+from typing import Any
+
+from elasticsearch import AsyncElasticsearch
+from prometheus_client import Counter, Histogram
+
+from travel_ai_backend.app.core.config import settings
+from travel_ai_backend.app.schemas.text_vector_schema import (
+    ITextVectorBatchSearchRead,
+    ITextVectorSearch,
+    ITextVectorSearchRead,
+    IVectorFormatEnum,
+)
+from travel_ai_backend.app.utils.vector_codec import encode_vector
+
+vector_msearch_latency = Histogram(
+    "elastic_msearch_seconds",
+    "Latency of a batch of kNN searches sent with _msearch",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+vector_msearch_queries = Counter(
+    "elastic_msearch_queries_total",
+    "kNN searches sent with _msearch",
+    ["result"],
+)
+
+
+def build_metadata_filter(
+    filters: dict[str, Any] | None,
+) -> list[dict[str, Any]]:
+    clauses = []
+    for key, value in (filters or {}).items():
+        query = "terms" if isinstance(value, list) else "term"
+        clauses.append({query: {f"metadata.{key}": value}})
+    return clauses
+
+
+def build_knn_search(text_vector: ITextVectorSearch) -> dict[str, Any]:
+    """
+    Search body of an approximate kNN query. Filters are applied while
+    the HNSW graph is explored so k neighbors are returned when enough
+    documents match, and the vectors are left out of the hits unless
+    requested.
+    """
+    knn = {
+        "field": "vector",
+        "query_vector": text_vector.vector.tolist(),
+        "k": text_vector.k,
+        "num_candidates": text_vector.num_candidates,
+    }
+    metadata_filter = build_metadata_filter(text_vector.filter)
+    if metadata_filter:
+        knn["filter"] = metadata_filter
+    body = {
+        "knn": knn,
+        "size": text_vector.k,
+        "track_total_hits": False,
+    }
+    if not text_vector.include_vector:
+        body["_source"] = {"excludes": ["vector"]}
+    return body
+
+
+def read_hits(
+    response: dict[str, Any],
+    vector_format: IVectorFormatEnum = IVectorFormatEnum.json,
+) -> list[ITextVectorSearchRead]:
+    neighbors = []
+    for hit in response["hits"]["hits"]:
+        source = hit.get("_source", {})
+        if source.get("vector") is not None:
+            source["vector"] = encode_vector(
+                source["vector"], vector_format == IVectorFormatEnum.base64
+            )
+        neighbors.append(
+            ITextVectorSearchRead(id=hit["_id"], score=hit["_score"], **source)
+        )
+    return neighbors
+
+
+async def search_neighbors(
+    es: AsyncElasticsearch,
+    text_vector: ITextVectorSearch,
+    vector_format: IVectorFormatEnum = IVectorFormatEnum.json,
+) -> list[ITextVectorSearchRead]:
+    response = await es.search(
+        index=settings.ELASTIC_VECTOR_INDEX,
+        body=build_knn_search(text_vector),
+    )
+    return read_hits(response, vector_format)
+
+
+async def msearch_neighbors(
+    es: AsyncElasticsearch,
+    text_vectors: list[ITextVectorSearch],
+    vector_format: IVectorFormatEnum = IVectorFormatEnum.json,
+) -> list[ITextVectorBatchSearchRead]:
+    """
+    Runs the searches in a single _msearch request. Results keep the
+    order of the queries, a failed search only fails its own entry.
+    """
+    searches = []
+    for text_vector in text_vectors:
+        searches.extend([{}, build_knn_search(text_vector)])
+    start_time = time.perf_counter()
+    response = await es.msearch(
+        index=settings.ELASTIC_VECTOR_INDEX,
+        searches=searches,
+        max_concurrent_searches=settings.ELASTIC_VECTOR_MSEARCH_CONCURRENCY,
+    )
+    vector_msearch_latency.observe(time.perf_counter() - start_time)
+
+    results = []
+    for position, item in enumerate(response["responses"]):
+        error = item.get("error")
+        if error is not None:
+            if isinstance(error, dict):
+                error = error.get("reason", error)
+            results.append(
+                ITextVectorBatchSearchRead(
+                    position=position,
+                    status=item.get("status", 500),
+                    error=str(error),
+                )
+            )
+        else:
+            results.append(
+                ITextVectorBatchSearchRead(
+                    position=position,
+                    status=item.get("status", 200),
+                    neighbors=read_hits(item, vector_format),
+                )
+            )
+    failed = sum(result.error is not None for result in results)
+    vector_msearch_queries.labels("failed").inc(failed)
+    vector_msearch_queries.labels("success").inc(len(results) - failed)
+    return results